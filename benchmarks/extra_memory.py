@@ -0,0 +1,90 @@
+import argparse
+import gc
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyStateView.timeline.state_model import StateTimelineModel
+from soak_retention import current_rss
+
+
+SCHEMA = {"temperature": float, "counter": int, "interlock": bool, "operator": str, "recipe": str}
+OPERATORS = ["op-%02d" % index for index in range(8)]
+RECIPES = ["R-100", "R-200", "R-300", "R-400"]
+STATES = ["STOP", "LOW", "HIGH", "FAULT"]
+
+
+def feed(model, events, batch):
+    # five fields per event, like a PLC snapshot; every tenth event carries an undeclared key
+    rng = random.Random(11)
+    timestamp = 0.0
+    state = "STOP"
+    counter = 0
+    for first in range(0, events, batch):
+        timestamps = []
+        state_ids = []
+        extras = []
+        for index in range(first, min(events, first + batch)):
+            timestamp += rng.expovariate(200.0)
+            if rng.random() < 0.2:
+                state = rng.choice(STATES)
+            counter += 1
+            extra = {
+                "temperature": round(40.0 + rng.random() * 30.0, 2),
+                "counter": counter,
+                "interlock": rng.random() < 0.05,
+                "operator": OPERATORS[index // 100_000 % len(OPERATORS)],
+                "recipe": RECIPES[index // 1_000_000 % len(RECIPES)],
+            }
+            if index % 10 == 0:
+                extra["source"] = "line-a"
+            timestamps.append(timestamp)
+            state_ids.append(state)
+            extras.append(extra)
+        model.append_events(timestamps=timestamps, state_ids=state_ids, extras=extras)
+
+
+def measure(events, schema, batch):
+    gc.collect()
+    baseline = current_rss()
+    model = StateTimelineModel("columnar", extra_schema=SCHEMA if schema else None)
+    started = time.perf_counter()
+    feed(model, events, batch)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    grown = current_rss() - baseline
+    # a read pass, as a table scrolling through every row would do
+    started = time.perf_counter()
+    store = model.store
+    for index in range(0, events, max(1, events // 100_000)):
+        store.extra(index)["temperature"]
+    read = time.perf_counter() - started
+    label = "schema" if schema else "dicts"
+    print(f"{label:>8} {events:>12} {grown / 1e6:>10.1f} {grown / events:>10.1f} {elapsed:>10.1f} {read * 1e3:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare RSS of plain dict extras and schema-backed extra columns.")
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--mode", choices=("both", "dicts", "schema"), default="both")
+    args = parser.parse_args()
+    if args.mode != "both":
+        measure(args.events, args.mode == "schema", args.batch)
+        return
+    print(f"{'mode':>8} {'events':>12} {'rss_mb':>10} {'bytes/evt':>10} {'feed_s':>10} {'read_ms':>10}")
+    sys.stdout.flush()
+    # each mode in its own process so freed memory of one run cannot hide the other's
+    for mode in ("dicts", "schema"):
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--events", str(args.events), "--batch", str(args.batch), "--mode", mode],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import random
+from typing import List, Tuple
+
+
+FAN_STATES = ["STOP", "LOW", "MID", "HIGH"]
+INVERTER_STATES = ["IDLE", "PRECHARGE", "GRID_SYNC", "RUN", "DERATE", "ALARM_OVERTEMP", "FAULT_OVERCURRENT"]
+STORM_STATES = ["RUN", "ALARM_VOLTAGE", "FAULT_GROUND", "ERROR_COMM", "RECOVER"]
+
+
+def fan_events(count: int, seed: int = 1) -> Tuple[List[float], List[str]]:
+    # slow ramp machine: steps up and down one speed at a time, long dwell
+    rng = random.Random(seed)
+    timestamps = []
+    state_ids = []
+    timestamp = 0.0
+    level = 0
+    for _ in range(count):
+        timestamps.append(timestamp)
+        state_ids.append(FAN_STATES[level])
+        step = rng.choice((-1, 1)) if 0 < level < len(FAN_STATES) - 1 else (1 if level == 0 else -1)
+        level += step
+        timestamp += rng.uniform(0.5, 5.0)
+    return timestamps, state_ids
+
+
+def inverter_events(count: int, seed: int = 2) -> Tuple[List[float], List[str]]:
+    # startup sequence, long RUN stretches with derating, occasional alarm/fault and restart
+    rng = random.Random(seed)
+    follow = {
+        "IDLE": ["PRECHARGE"],
+        "PRECHARGE": ["GRID_SYNC"],
+        "GRID_SYNC": ["RUN"],
+        "RUN": ["DERATE"] * 6 + ["ALARM_OVERTEMP"] * 2 + ["FAULT_OVERCURRENT"],
+        "DERATE": ["RUN"],
+        "ALARM_OVERTEMP": ["DERATE", "RUN"],
+        "FAULT_OVERCURRENT": ["IDLE"],
+    }
+    dwell = {"IDLE": 2.0, "PRECHARGE": 0.3, "GRID_SYNC": 0.8, "RUN": 20.0, "DERATE": 4.0, "ALARM_OVERTEMP": 1.5, "FAULT_OVERCURRENT": 5.0}
+    timestamps = []
+    state_ids = []
+    timestamp = 0.0
+    state = "IDLE"
+    for _ in range(count):
+        timestamps.append(timestamp)
+        state_ids.append(state)
+        timestamp += rng.expovariate(1.0 / dwell[state])
+        state = rng.choice(follow[state])
+    return timestamps, state_ids
+
+
+def fault_storm_events(count: int, seed: int = 3) -> Tuple[List[float], List[str]]:
+    # high-churn burst: millisecond-scale toggling between alarm, fault and recovery
+    rng = random.Random(seed)
+    timestamps = []
+    state_ids = []
+    timestamp = 0.0
+    for _ in range(count):
+        timestamps.append(timestamp)
+        state_ids.append(rng.choice(STORM_STATES))
+        timestamp += rng.expovariate(1000.0)
+    return timestamps, state_ids
+
+
+GENERATORS = {
+    "fan": fan_events,
+    "inverter": inverter_events,
+    "fault_storm": fault_storm_events,
+}
@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each probe runs in a fresh interpreter; the import itself is timed inside the child
+PROBES = {
+    "core": "from pyStateView import StateTimelineModel, TimelineStatistics",
+    "core_without_qt": "import sys; sys.modules['PyQt5'] = None\nfrom pyStateView import StateTimelineModel, TimelineStatistics",
+    "widgets": "from pyStateView import PhaseFlow, StateIndicator, StateDistributionBar, StateTransitionTable, EventLogView",
+}
+
+_CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+qt = sorted(name for name, module in sys.modules.items() if name.startswith("PyQt5") and module is not None)
+print(elapsed, len(qt))
+"""
+
+
+def run_probe(statement: str):
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(root=ROOT, statement=statement)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen")),
+    ).stdout.split()
+    return float(output[0]), int(output[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the Qt-free core and the widget layer.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'probe':<18} {'median_ms':>10} {'min_ms':>8} {'qt_modules':>11}")
+    for name, statement in PROBES.items():
+        samples = []
+        qt_modules = 0
+        for _ in range(args.repeat):
+            elapsed, qt_modules = run_probe(statement)
+            samples.append(elapsed * 1e3)
+        results[name] = {"median_ms": statistics.median(samples), "min_ms": min(samples), "qt_modules": qt_modules}
+        print(f"{name:<18} {results[name]['median_ms']:>10.2f} {results[name]['min_ms']:>8.2f} {qt_modules:>11}")
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
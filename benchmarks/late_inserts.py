@@ -0,0 +1,59 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyStateView.timeline.state_model import StateTimelineModel
+
+
+SCHEMA = {"temperature": float, "counter": int}
+STATES = ["STOP", "LOW", "HIGH", "FAULT"]
+BACKENDS = (("list", None), ("columnar", None), ("columnar", SCHEMA))
+
+
+def build(storage, schema, events):
+    # every event carries an extra, so any per-insert work over the stored extras shows up
+    model = StateTimelineModel(storage, extra_schema=schema)
+    timestamps = [float(index) for index in range(events)]
+    state_ids = [STATES[index % len(STATES)] for index in range(events)]
+    extras = [{"temperature": 40.0 + index % 30, "counter": index, "source": "line-a"} for index in range(events)]
+    model.append_events(timestamps=timestamps, state_ids=state_ids, extras=extras)
+    return model
+
+
+def measure(storage, schema, events, inserts, batch):
+    rng = random.Random(5)
+    model = build(storage, schema, events)
+    # late events land in the newest tenth of the recording, as a reorder window would deliver them
+    late = [events * (0.9 + 0.1 * rng.random()) for _ in range(inserts)]
+    started = time.perf_counter()
+    for timestamp in late:
+        model.insert_event(timestamp, "LOW", {"temperature": 55.5, "counter": -1})
+    single = (time.perf_counter() - started) / inserts
+    # one out-of-order batch goes through the merge path
+    timestamps = [events * (0.9 + 0.1 * rng.random()) for _ in range(batch)]
+    started = time.perf_counter()
+    model.append_events(
+        timestamps=timestamps, state_ids=["HIGH"] * batch, extras=[{"temperature": 60.0, "counter": -2}] * batch
+    )
+    merged = time.perf_counter() - started
+    label = storage + ("+schema" if schema else "")
+    print(f"{label:>16} {events:>10} {single * 1e6:>12.1f} {merged * 1e3:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time late inserts into a model whose events all carry extras.")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--inserts", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    print(f"{'store':>16} {'events':>10} {'insert_us':>12} {'merge_ms':>12}")
+    for storage, schema in BACKENDS:
+        measure(storage, schema, args.events, args.inserts, args.batch)
+
+
+if __name__ == "__main__":
+    main()
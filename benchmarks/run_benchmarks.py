@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR, QPoint
+from PyQt5.QtWidgets import QApplication
+
+from generators import GENERATORS
+from pyStateView.timeline.phase_flow import PhaseFlow
+from pyStateView.timeline import vectorized
+from pyStateView.timeline.state_model import StateTimelineModel
+from pyStateView.widgets.event_log_view import EventLogView
+from pyStateView.widgets.state_distribution import StateDistributionBar
+from pyStateView.widgets.state_transition_table import StateTransitionTable
+
+
+HIGHER = "higher"
+LOWER = "lower"
+ZOOM_LEVELS = (10.0, 120.0, 1000.0)
+RENDER_MODES = ("items", "viewport")
+# throughput runs are long single passes; best-of-N keeps scheduler noise out of the baseline
+APPEND_PASSES = 3
+
+
+class Suite:
+    def __init__(self, app, events: int, repeat: int, scenarios):
+        self.app = app
+        self.events = events
+        self.repeat = repeat
+        self.scenarios = scenarios
+        self.results = {}
+        self._data = {name: GENERATORS[name](events) for name in scenarios}
+
+    def record(self, name: str, value: float, unit: str, better: str):
+        self.results[name] = {"value": value, "unit": unit, "better": better}
+        print(f"  {name:<60} {value:>14.4f} {unit}")
+
+    def timed(self, func, repeat=None, best=False) -> float:
+        samples = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return min(samples) if best else statistics.median(samples)
+
+    def model_with(self, scenario: str, storage: str = "columnar") -> StateTimelineModel:
+        timestamps, state_ids = self._data[scenario]
+        model = StateTimelineModel(storage)
+        model.append_events(timestamps=timestamps, state_ids=state_ids)
+        return model
+
+    def flow_with(self, scenario: str, mode: str) -> PhaseFlow:
+        flow = PhaseFlow()
+        flow.set_render_mode(mode)
+        flow.resize(1200, 320)
+        flow.show()
+        flow.set_model(self.model_with(scenario))
+        self.app.processEvents()
+        return flow
+
+    def run(self):
+        for scenario in self.scenarios:
+            print(f"[{scenario}] {self.events} events")
+            self.bench_model_append(scenario)
+            self.bench_flow_append(scenario)
+            self.bench_bytes_per_event(scenario)
+            for mode in RENDER_MODES:
+                flow = self.flow_with(scenario, mode)
+                self.bench_repaint(scenario, mode, flow)
+                self.bench_zoom(scenario, mode, flow)
+                self.bench_hover(scenario, mode, flow)
+                flow.close()
+                flow.deleteLater()
+                self.app.processEvents()
+            self.bench_widgets(scenario)
+            self.bench_vectorized(scenario)
+        return self.results
+
+    def bench_model_append(self, scenario):
+        timestamps, state_ids = self._data[scenario]
+        for storage in ("list", "columnar"):
+            def append():
+                model = StateTimelineModel(storage)
+                for timestamp, state_id in zip(timestamps, state_ids):
+                    model.append_event(timestamp, state_id)
+
+            elapsed = self.timed(append, repeat=APPEND_PASSES, best=True)
+            self.record(f"model.append_event.{storage}.{scenario}", len(timestamps) / elapsed, "events/s", HIGHER)
+
+    def bench_flow_append(self, scenario):
+        timestamps, state_ids = self._data[scenario]
+        for mode in RENDER_MODES:
+            samples = []
+            for _ in range(APPEND_PASSES):
+                flow = PhaseFlow()
+                flow.set_render_mode(mode)
+                flow.set_model(StateTimelineModel("columnar"))
+                flow.resize(1200, 320)
+                flow.show()
+                started = time.perf_counter()
+                for timestamp, state_id in zip(timestamps, state_ids):
+                    flow.append_event(timestamp, state_id)
+                flow.flush()
+                self.app.processEvents()
+                samples.append(time.perf_counter() - started)
+                flow.close()
+                flow.deleteLater()
+                self.app.processEvents()
+            self.record(f"flow.append_event.{mode}.{scenario}", len(timestamps) / min(samples), "events/s", HIGHER)
+
+    def bench_bytes_per_event(self, scenario):
+        for storage in ("list", "columnar"):
+            self.record(f"model.bytes_per_event.{storage}.{scenario}", self.model_with(scenario, storage).bytes_per_event(), "B", LOWER)
+
+    def bench_repaint(self, scenario, mode, flow):
+        bar = flow.horizontalScrollBar()
+        for scale in ZOOM_LEVELS:
+            flow.set_time_scale(scale)
+            flow.flush()
+            bar.setValue(bar.maximum() // 2)
+            self.app.processEvents()
+            elapsed = self.timed(flow.viewport().repaint)
+            self.record(f"flow.repaint.{mode}.{scale:g}pps.{scenario}", elapsed * 1e3, "ms", LOWER)
+
+    def bench_zoom(self, scenario, mode, flow):
+        flow.set_time_scale(ZOOM_LEVELS[1])
+        self.app.processEvents()
+        anchor = flow.viewport().width() / 2.0
+
+        def zoom():
+            flow.zoom_by(1.25, anchor)
+            flow.zoom_by(0.8, anchor)
+            self.app.processEvents()
+
+        self.record(f"flow.zoom.{mode}.{scenario}", self.timed(zoom) / 2 * 1e3, "ms", LOWER)
+
+    def bench_hover(self, scenario, mode, flow):
+        viewport = flow.viewport()
+        lanes = max(1, len(flow._state_labels))
+        positions = [
+            QPoint(int(viewport.width() * (0.2 + 0.6 * k / 64)), flow._top_padding + (k % lanes) * flow._row_height + 4)
+            for k in range(64)
+        ]
+
+        def hover():
+            for pos in positions:
+                flow._hover_pos = (pos, viewport.mapToGlobal(pos))
+                flow._update_hover()
+
+        self.record(f"flow.hover.{mode}.{scenario}", self.timed(hover) / len(positions) * 1e6, "us", LOWER)
+
+    def bench_widgets(self, scenario):
+        events = self.model_with(scenario).events
+        for name, widget_type in (
+            ("state_distribution", StateDistributionBar),
+            ("state_transition_table", StateTransitionTable),
+            ("event_log_view", EventLogView),
+        ):
+            widget = widget_type()
+            widget.resize(600, 300)
+            widget.show()
+
+            def refresh():
+                widget.update_from_events(events)
+                widget.repaint()
+
+            self.record(f"widget.update_from_events.{name}.{scenario}", self.timed(refresh) * 1e3, "ms", LOWER)
+            widget.close()
+            widget.deleteLater()
+        self.app.processEvents()
+
+
+    def bench_vectorized(self, scenario):
+        model = self.model_with(scenario)
+        backends = ("numpy", "python") if vectorized.HAVE_NUMPY else ("python",)
+        for backend in backends:
+            vectorized.set_numpy_enabled(backend == "numpy")
+
+            def analyze():
+                timestamps, codes, states = vectorized.state_columns(model)
+                vectorized.dwell_totals(timestamps, codes, states)
+                vectorized.transition_counts(codes, states)
+
+            self.record(f"analytics.dwell_transitions.{backend}.{scenario}", self.timed(analyze) * 1e3, "ms", LOWER)
+        vectorized.set_numpy_enabled(True)
+
+
+def compare(results, baseline, tolerance: float):
+    regressions = []
+    for name, entry in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None or not reference["value"]:
+            continue
+        ratio = entry["value"] / reference["value"]
+        worse = ratio < 1.0 - tolerance if entry["better"] == HIGHER else ratio > 1.0 + tolerance
+        if worse:
+            regressions.append((name, reference["value"], entry["value"], entry["unit"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks for pyStateView models and widgets.")
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scenario", action="append", choices=sorted(GENERATORS), help="repeatable; default: all")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previously written results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    suite = Suite(app, args.events, args.repeat, args.scenario or sorted(GENERATORS))
+    results = suite.run()
+    report = {
+        "meta": {
+            "events": args.events,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline.get("meta", {}).get("events") != args.events:
+            print(f"warning: baseline was recorded with {baseline.get('meta', {}).get('events')} events")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for name, before, after, unit in regressions:
+                print(f"  {name:<60} {before:>12.4f} -> {after:>12.4f} {unit}")
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyStateView.timeline.state_model import StateTimelineModel
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append events under a retention policy and report RSS over time.")
+    parser.add_argument("--events", type=int, default=5_000_000)
+    parser.add_argument("--max-events", type=int, default=200_000)
+    parser.add_argument("--max-age", type=float, default=None)
+    parser.add_argument("--storage", choices=("list", "columnar"), default="columnar")
+    parser.add_argument("--widget", choices=("none", "items", "viewport"), default="none")
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+
+    flow = None
+    app = None
+    if args.widget != "none":
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        from pyStateView.timeline.phase_flow import PhaseFlow
+
+        app = QApplication.instance() or QApplication([])
+        flow = PhaseFlow()
+        flow.set_render_mode(args.widget)
+        flow.set_model(StateTimelineModel(args.storage))
+        flow.set_retention(max_events=args.max_events, max_age=args.max_age)
+        flow.resize(1200, 300)
+        flow.show()
+        model = flow.model
+    else:
+        model = StateTimelineModel(args.storage)
+        model.set_retention(max_events=args.max_events, max_age=args.max_age)
+
+    rng = random.Random(7)
+    states = ["STOP", "LOW", "HIGH", "FAULT"]
+    state = "STOP"
+    timestamp = 0.0
+    interval = max(1, args.events // args.samples)
+    batch = []
+    started = time.perf_counter()
+    print(f"{'events':>12} {'retained':>10} {'rss_mb':>9} {'elapsed_s':>10}")
+    for count in range(1, args.events + 1):
+        timestamp += rng.expovariate(200.0)
+        if rng.random() < 0.2:
+            state = rng.choice(states)
+        if flow is None:
+            model.append_event(timestamp, state)
+        else:
+            batch.append((timestamp, state))
+            if len(batch) >= 1000:
+                flow.append_events(batch)
+                batch = []
+                flow.flush()
+                app.processEvents()
+        if count % interval == 0:
+            print(f"{count:>12} {model.event_count():>10} {current_rss() / 1e6:>9.1f} {time.perf_counter() - started:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,81 @@
 from .timeline.state_model import Event, StateTimelineModel
-from .timeline.phase_flow import PhaseFlow
-from .widgets.state_indicator import StateIndicator
-from .widgets.state_distribution import StateDistributionBar
-from .widgets.state_transition_table import StateTransitionTable
-from .widgets.event_log_view import EventLogView
+from .timeline.event_store import ListEventStore, ColumnarEventStore, ExtraView
+from .timeline.ingest import IngestBuffer
+from .timeline.reorder import ReorderBuffer
+from .timeline.statistics import TimelineStatistics
+from .timeline.recording import RecordingWriter, MappedEventStore, open_recording, load_recording
+from .timeline.importer import import_log
+from .timeline.perf import PerfMonitor
+from .timeline.summary import SummaryPyramid
 
 __all__ = [
     "Event",
     "StateTimelineModel",
+    "ListEventStore",
+    "ColumnarEventStore",
+    "ExtraView",
+    "IngestBuffer",
+    "ReorderBuffer",
+    "TimelineStatistics",
+    "RecordingWriter",
+    "MappedEventStore",
+    "open_recording",
+    "load_recording",
+    "LogImporter",
+    "import_log",
+    "PerfMonitor",
+    "SummaryPyramid",
+    "ArchiveReport",
+    "analyze_recording",
+    "analyze_model",
     "PhaseFlow",
+    "SignalDashboard",
+    "TimelineOverview",
+    "TimelineRenderer",
+    "export_timeline",
+    "export_timelines",
+    "StyleTable",
+    "shared_style_table",
     "StateIndicator",
+    "IndicatorBank",
     "StateDistributionBar",
     "StateTransitionTable",
     "EventLogView",
 ]
+
+# everything below needs PyQt5 (or pulls in NumPy) and is imported on first attribute access (PEP 562),
+# so `from pyStateView import StateTimelineModel` works on machines without Qt
+_LAZY = {
+    "ArchiveReport": ".timeline.analytics",
+    "analyze_recording": ".timeline.analytics",
+    "analyze_model": ".timeline.analytics",
+    "LogImporter": ".timeline.log_importer",
+    "PhaseFlow": ".timeline.phase_flow",
+    "SignalDashboard": ".timeline.dashboard",
+    "TimelineOverview": ".timeline.overview",
+    "TimelineRenderer": ".timeline.export",
+    "export_timeline": ".timeline.export",
+    "export_timelines": ".timeline.export",
+    "StyleTable": ".utils.style_table",
+    "shared_style_table": ".utils.style_table",
+    "StateIndicator": ".widgets.state_indicator",
+    "IndicatorBank": ".widgets.indicator_bank",
+    "StateDistributionBar": ".widgets.state_distribution",
+    "StateTransitionTable": ".widgets.state_transition_table",
+    "EventLogView": ".widgets.event_log_view",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,4 +1,66 @@
 from .state_model import Event, StateTimelineModel
-from .phase_flow import PhaseFlow
+from .event_store import ListEventStore, ColumnarEventStore, ExtraView
+from .ingest import IngestBuffer
+from .reorder import ReorderBuffer
+from .statistics import TimelineStatistics
+from .recording import RecordingWriter, MappedEventStore, open_recording, load_recording
+from .importer import import_log
+from .perf import PerfMonitor
+from .summary import SummaryPyramid
 
-__all__ = ["Event", "StateTimelineModel", "PhaseFlow"]
+__all__ = [
+    "Event",
+    "StateTimelineModel",
+    "ListEventStore",
+    "ColumnarEventStore",
+    "ExtraView",
+    "IngestBuffer",
+    "ReorderBuffer",
+    "TimelineStatistics",
+    "RecordingWriter",
+    "MappedEventStore",
+    "open_recording",
+    "load_recording",
+    "import_log",
+    "PerfMonitor",
+    "SummaryPyramid",
+    "ArchiveReport",
+    "analyze_recording",
+    "analyze_model",
+    "LogImporter",
+    "PhaseFlow",
+    "SignalDashboard",
+    "TimelineOverview",
+    "TimelineRenderer",
+    "export_timeline",
+    "export_timelines",
+]
+
+# Qt-backed classes (and the NumPy-backed analytics) load on first access so the model imports without them
+_LAZY = {
+    "ArchiveReport": ".analytics",
+    "analyze_recording": ".analytics",
+    "analyze_model": ".analytics",
+    "LogImporter": ".log_importer",
+    "PhaseFlow": ".phase_flow",
+    "SignalDashboard": ".dashboard",
+    "TimelineOverview": ".overview",
+    "TimelineRenderer": ".export",
+    "export_timeline": ".export",
+    "export_timelines": ".export",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,335 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from .recording import MappedEventStore
+from .vectorized import np, numpy_enabled, state_columns
+from .state_model import StateTimelineModel
+from ..utils.color_map import is_alarm_state
+
+
+SHIFT_HOURS = 8.0
+
+
+class PartialAggregate:
+    # aggregates over one contiguous index span; spans merge left to right
+    __slots__ = (
+        "count",
+        "first_time",
+        "first_code",
+        "last_time",
+        "last_code",
+        "dwell",
+        "transitions",
+        "fault_entries",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.first_time = 0.0
+        self.first_code = -1
+        self.last_time = 0.0
+        self.last_code = -1
+        self.dwell: Dict[int, float] = {}
+        self.transitions: Dict[Tuple[int, int], int] = {}
+        self.fault_entries: Dict[int, int] = {}
+
+    def merge(self, other: "PartialAggregate", shift_length: float, shift_origin: float, fault_codes: FrozenSet[int]) -> None:
+        if not other.count:
+            return
+        if not self.count:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return
+        # the segment open at the end of self is closed by the first event of other
+        boundary_dwell = other.first_time - self.last_time
+        self.dwell[self.last_code] = self.dwell.get(self.last_code, 0.0) + boundary_dwell
+        key = (self.last_code, other.first_code)
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        if other.first_code in fault_codes and other.first_code != self.last_code:
+            shift = int((other.first_time - shift_origin) // shift_length)
+            self.fault_entries[shift] = self.fault_entries.get(shift, 0) + 1
+        for code, seconds in other.dwell.items():
+            self.dwell[code] = self.dwell.get(code, 0.0) + seconds
+        for key, count in other.transitions.items():
+            self.transitions[key] = self.transitions.get(key, 0) + count
+        for shift, count in other.fault_entries.items():
+            self.fault_entries[shift] = self.fault_entries.get(shift, 0) + count
+        self.count += other.count
+        self.last_time = other.last_time
+        self.last_code = other.last_code
+
+
+def aggregate_columns(
+    timestamps: Sequence[float],
+    codes: Sequence[int],
+    shift_length: float = SHIFT_HOURS * 3600.0,
+    shift_origin: float = 0.0,
+    fault_codes: FrozenSet[int] = frozenset(),
+) -> PartialAggregate:
+    if numpy_enabled():
+        return _aggregate_arrays(np.asarray(timestamps, dtype=np.float64), np.asarray(codes).astype(np.int64), shift_length, shift_origin, fault_codes)
+    partial = PartialAggregate()
+    count = len(timestamps)
+    if not count:
+        return partial
+    dwell = partial.dwell
+    transitions = partial.transitions
+    fault_entries = partial.fault_entries
+    prev_time = timestamps[0]
+    prev_code = codes[0]
+    for index in range(1, count):
+        timestamp = timestamps[index]
+        code = codes[index]
+        dwell[prev_code] = dwell.get(prev_code, 0.0) + (timestamp - prev_time)
+        key = (prev_code, code)
+        transitions[key] = transitions.get(key, 0) + 1
+        if code != prev_code and code in fault_codes:
+            shift = int((timestamp - shift_origin) // shift_length)
+            fault_entries[shift] = fault_entries.get(shift, 0) + 1
+        prev_time = timestamp
+        prev_code = code
+    partial.count = count
+    partial.first_time = timestamps[0]
+    partial.first_code = codes[0]
+    partial.last_time = prev_time
+    partial.last_code = prev_code
+    return partial
+
+
+def _aggregate_arrays(timestamps, codes, shift_length: float, shift_origin: float, fault_codes: FrozenSet[int]) -> PartialAggregate:
+    partial = PartialAggregate()
+    count = len(timestamps)
+    if not count:
+        return partial
+    previous = codes[:-1]
+    following = codes[1:]
+    sums = np.bincount(previous, weights=np.diff(timestamps))
+    partial.dwell = {code: float(sums[code]) for code in np.flatnonzero(sums).tolist()}
+    size = int(codes.max()) + 1
+    keys, counts = np.unique(previous * size + following, return_counts=True)
+    partial.transitions = {(key // size, key % size): count for key, count in zip(keys.tolist(), counts.tolist())}
+    if fault_codes:
+        entering = (following != previous) & np.isin(following, list(fault_codes))
+        shifts = np.floor((timestamps[1:][entering] - shift_origin) / shift_length).astype(np.int64)
+        keys, counts = np.unique(shifts, return_counts=True)
+        partial.fault_entries = dict(zip(keys.tolist(), counts.tolist()))
+    partial.count = count
+    partial.first_time = float(timestamps[0])
+    partial.first_code = int(codes[0])
+    partial.last_time = float(timestamps[-1])
+    partial.last_code = int(codes[-1])
+    return partial
+
+
+def _aggregate_chunk(store: MappedEventStore, chunk: int, start: int, stop: int, shift_length, shift_origin, fault_codes) -> PartialAggregate:
+    # the column views point into the map; keeping them local lets close() release it
+    first = store.chunk_span(chunk)[0]
+    timestamps, codes = store.chunk_columns(chunk)
+    return aggregate_columns(
+        timestamps[start - first : stop - first],
+        codes[start - first : stop - first],
+        shift_length,
+        shift_origin,
+        fault_codes,
+    )
+
+
+def _aggregate_recording_span(path, lo: int, hi: int, shift_length: float, shift_origin: float, fault_codes: FrozenSet[int]) -> PartialAggregate:
+    # runs in a worker process; the recording is mapped, so only the aggregate travels back
+    store = MappedEventStore(path)
+    try:
+        result = PartialAggregate()
+        for chunk in range(store.chunk_count):
+            first, count, _, _ = store.chunk_span(chunk)
+            if first >= hi:
+                break
+            start = max(lo, first)
+            stop = min(hi, first + count)
+            if start < stop:
+                partial = _aggregate_chunk(store, chunk, start, stop, shift_length, shift_origin, fault_codes)
+                result.merge(partial, shift_length, shift_origin, fault_codes)
+        return result
+    finally:
+        store.close()
+
+
+class ArchiveReport:
+    def __init__(self, states: List[Any], aggregate: PartialAggregate, start_time: float, end_time: float, shift_length: float, shift_origin: float):
+        self._states = states
+        self._shift_length = shift_length
+        self._shift_origin = shift_origin
+        self.start_time = start_time
+        self.end_time = end_time
+        self.event_count = aggregate.count
+        self.dwell_totals: Dict[Any, float] = {
+            states[code]: seconds for code, seconds in aggregate.dwell.items() if seconds > 0
+        }
+        self.transition_counts: Dict[Tuple[Any, Any], int] = {
+            (states[src], states[dst]): count for (src, dst), count in aggregate.transitions.items()
+        }
+        self.fault_counts_by_shift: Dict[int, int] = dict(sorted(aggregate.fault_entries.items()))
+
+    def states(self) -> List[Any]:
+        seen = set(self.dwell_totals)
+        for src, dst in self.transition_counts:
+            seen.add(src)
+            seen.add(dst)
+        return [state for state in self._states if state in seen]
+
+    def transition_matrix(self) -> Tuple[List[Any], List[List[int]]]:
+        states = self.states()
+        lookup = {state_id: idx for idx, state_id in enumerate(states)}
+        matrix = [[0] * len(states) for _ in states]
+        for (src, dst), count in self.transition_counts.items():
+            matrix[lookup[src]][lookup[dst]] = count
+        return states, matrix
+
+    def shift_start(self, shift: int) -> float:
+        return self._shift_origin + shift * self._shift_length
+
+    def distribution(self) -> Dict[Any, float]:
+        total = sum(self.dwell_totals.values())
+        if total <= 0:
+            return {}
+        return {state_id: seconds / total for state_id, seconds in self.dwell_totals.items()}
+
+
+def _fault_codes(states: List[Any], alarm_keywords) -> FrozenSet[int]:
+    return frozenset(code for code, state_id in enumerate(states) if is_alarm_state(state_id, alarm_keywords=alarm_keywords))
+
+
+def _split_span(store: MappedEventStore, lo: int, hi: int, tasks: int) -> List[Tuple[int, int]]:
+    # split on recording chunk boundaries so each task reads whole mapped columns
+    if hi <= lo:
+        return []
+    target = max(1, math.ceil((hi - lo) / max(1, tasks)))
+    spans = []
+    start = lo
+    for chunk in range(store.chunk_count):
+        first, count, _, _ = store.chunk_span(chunk)
+        end = min(hi, first + count)
+        if end <= start:
+            continue
+        if end - start >= target or end == hi:
+            spans.append((start, end))
+            start = end
+        if start >= hi:
+            break
+    if start < hi:
+        spans.append((start, hi))
+    return spans
+
+
+def _clip(store, fault_codes, aggregate: PartialAggregate, lo: int, start_time, end_time, shift_length, shift_origin) -> Tuple[float, float]:
+    # the first event may begin before start_time; it only contributes from start_time on
+    first_time = aggregate.first_time
+    window_start = first_time if start_time is None else max(start_time, first_time)
+    if first_time < window_start:
+        next_time = store.timestamp(lo + 1) if aggregate.count > 1 else None
+        cut = window_start - first_time
+        if next_time is not None:
+            cut = min(cut, next_time - first_time)
+        aggregate.dwell[aggregate.first_code] = aggregate.dwell.get(aggregate.first_code, 0.0) - cut
+    elif aggregate.first_code in fault_codes:
+        previous = store.state_code(lo - 1) if lo > 0 else -1
+        if previous != aggregate.first_code:
+            shift = int((first_time - shift_origin) // shift_length)
+            aggregate.fault_entries[shift] = aggregate.fault_entries.get(shift, 0) + 1
+    window_end = aggregate.last_time if end_time is None else max(end_time, window_start)
+    if window_end > aggregate.last_time:
+        tail_start = max(aggregate.last_time, window_start)
+        aggregate.dwell[aggregate.last_code] = aggregate.dwell.get(aggregate.last_code, 0.0) + (window_end - tail_start)
+    return window_start, window_end
+
+
+def analyze_recording(
+    path,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    workers: Optional[int] = None,
+    tasks: Optional[int] = None,
+    shift_hours: float = SHIFT_HOURS,
+    shift_origin: float = 0.0,
+    alarm_keywords=None,
+    executor=None,
+) -> ArchiveReport:
+    store = MappedEventStore(path)
+    try:
+        states = store.state_table
+        fault_codes = _fault_codes(states, alarm_keywords)
+        shift_length = shift_hours * 3600.0
+        total = len(store)
+        lo = 0 if start_time is None else max(0, store.bisect_right(start_time) - 1)
+        hi = total if end_time is None else store.bisect_right(end_time)
+        if hi <= lo:
+            return ArchiveReport(states, PartialAggregate(), start_time or 0.0, end_time or 0.0, shift_length, shift_origin)
+
+        workers = workers or os.cpu_count() or 1
+        spans = _split_span(store, lo, hi, tasks or workers * 4)
+        arguments = [(path, start, stop, shift_length, shift_origin, fault_codes) for start, stop in spans]
+        if executor is not None:
+            partials = list(executor.map(_aggregate_recording_span, *zip(*arguments)))
+        elif workers <= 1 or len(spans) <= 1:
+            partials = [_aggregate_recording_span(*args) for args in arguments]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                partials = list(pool.map(_aggregate_recording_span, *zip(*arguments)))
+
+        # partial results are ordered by time; merging restores the segments cut at span edges
+        aggregate = PartialAggregate()
+        for partial in partials:
+            aggregate.merge(partial, shift_length, shift_origin, fault_codes)
+        window_start, window_end = _clip(store, fault_codes, aggregate, lo, start_time, end_time, shift_length, shift_origin)
+        return ArchiveReport(states, aggregate, window_start, window_end, shift_length, shift_origin)
+    finally:
+        store.close()
+
+
+def analyze_model(
+    model: StateTimelineModel,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    shift_hours: float = SHIFT_HOURS,
+    shift_origin: float = 0.0,
+    alarm_keywords=None,
+) -> ArchiveReport:
+    # in-process variant over a live model, same aggregation and clipping rules
+    store = model.store
+    total = len(store)
+    shift_length = shift_hours * 3600.0
+    lo = 0 if start_time is None else max(0, store.bisect_right(start_time) - 1)
+    hi = total if end_time is None else store.bisect_right(end_time)
+    if hi <= lo:
+        return ArchiveReport([], PartialAggregate(), start_time or 0.0, end_time or 0.0, shift_length, shift_origin)
+    # whole columns at once: the columnar store's arrays, or one pass over a list store
+    timestamps, codes, states = state_columns(store, lo, hi)
+    fault_codes = _fault_codes(states, alarm_keywords)
+    aggregate = aggregate_columns(timestamps, codes, shift_length, shift_origin, fault_codes)
+    previous = -1
+    if lo > 0:
+        previous_state = store.state_id(lo - 1)
+        previous = next((code for code, state_id in enumerate(states) if state_id == previous_state), -1)
+    view = _WindowColumns(timestamps, codes, previous)
+    window_start, window_end = _clip(view, fault_codes, aggregate, 1, start_time, end_time, shift_length, shift_origin)
+    return ArchiveReport(states, aggregate, window_start, window_end, shift_length, shift_origin)
+
+
+class _WindowColumns:
+    # the (timestamp, state_code) access _clip expects: index 0 is the event before the
+    # window, so _clip sees the same predecessor as analyze_recording
+    __slots__ = ("_timestamps", "_codes", "_previous")
+
+    def __init__(self, timestamps, codes, previous: int):
+        self._timestamps = timestamps
+        self._codes = codes
+        self._previous = previous
+
+    def timestamp(self, index: int) -> float:
+        return float(self._timestamps[index - 1])
+
+    def state_code(self, index: int) -> int:
+        if index == 0:
+            return self._previous
+        return int(self._codes[index - 1])
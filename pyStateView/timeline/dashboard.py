@@ -0,0 +1,543 @@
+import math
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer, QEvent
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF, QPainter, QPalette, QPen
+from PyQt5.QtWidgets import QAbstractScrollArea, QFrame, QSizePolicy, QToolTip
+
+from .perf import PerfMonitor
+from .runs import compute_runs
+from .state_model import StateTimelineModel
+from .update_scheduler import UpdateScheduler
+from ..utils.color_map import CURRENT_OUTLINE
+from ..utils.style_table import StyleTable, shared_style_table
+from ..utils.time_utils import format_duration, format_timestamp
+
+
+class _Signal:
+    __slots__ = ("name", "model")
+
+    def __init__(self, name: str, model: StateTimelineModel):
+        self.name = name
+        self.model = model
+
+
+class SignalDashboard(QAbstractScrollArea):
+    _MIN_SCALE = 1e-3
+    _MAX_SCALE = 1e5
+    _AXIS_HEIGHT = 24
+    _MAX_TICK_LABELS = 4096
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMinimumHeight(120)
+        self.setObjectName("psvSignalDashboard")
+        self.viewport().setMouseTracking(True)
+
+        self._signals: List[_Signal] = []
+        self._by_name: Dict[str, _Signal] = {}
+        self._row_height = 20
+        self._row_gap = 4
+        self._label_width = 120
+        self._time_scale = 120.0
+        self._start_time = None
+        self._end_time = 0.0
+        self._time_label_mode = "relative"
+        self._follow_tail = True
+        self._dirty = False
+        self._drag_origin = None
+        self._perf = None
+        self._tick_labels = {}
+        self._tick_key = None
+        self._styles = None
+        self._scheduler = None
+
+        self._hover_pos = None
+        self._hover_key = None
+        self._hover_timer = QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.timeout.connect(self._update_hover)
+
+        self._label_font = QFont("Consolas", 9)
+        self._tick_font = QFont("Consolas", 8)
+        self._background = None
+        self._grid_color = None
+        self._text_color = None
+        self._axis_color = None
+        self._update_palette()
+        self.horizontalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+        self.set_style_table(shared_style_table())
+        self.set_update_scheduler(UpdateScheduler(parent=self))
+
+    # signals
+
+    def add_signal(self, name: str, model: Optional[StateTimelineModel] = None, storage: str = "columnar") -> StateTimelineModel:
+        if name in self._by_name:
+            raise ValueError(f"signal {name!r} already exists")
+        if model is None:
+            model = StateTimelineModel(storage)
+        signal = _Signal(name, model)
+        self._signals.append(signal)
+        self._by_name[name] = signal
+        model.add_listener(self._on_model_changed)
+        self._update_label_width()
+        self._schedule()
+        return model
+
+    def remove_signal(self, name: str) -> None:
+        signal = self._by_name.pop(name)
+        self._signals.remove(signal)
+        signal.model.remove_listener(self._on_model_changed)
+        self._update_label_width()
+        self._schedule()
+
+    def clear(self) -> None:
+        for signal in self._signals:
+            signal.model.remove_listener(self._on_model_changed)
+        self._signals.clear()
+        self._by_name.clear()
+        self._start_time = None
+        self._end_time = 0.0
+        self._schedule()
+
+    def signal_names(self) -> List[str]:
+        return [signal.name for signal in self._signals]
+
+    def signal_model(self, name: str) -> StateTimelineModel:
+        return self._by_name[name].model
+
+    def signal_count(self) -> int:
+        return len(self._signals)
+
+    def append_event(self, name: str, timestamp: float, state_id: str, extra: Optional[dict] = None):
+        return self._by_name[name].model.append_event(timestamp, state_id, extra=extra)
+
+    def append_events(self, name: str, events=None, timestamps=None, state_ids=None, extras=None) -> int:
+        return self._by_name[name].model.append_events(events, timestamps=timestamps, state_ids=state_ids, extras=extras)
+
+    def _on_model_changed(self, kind, start, count):
+        # appends to any number of signals fold into the next frame
+        self._schedule()
+
+    # scheduling
+
+    def set_update_scheduler(self, scheduler: UpdateScheduler):
+        if self._scheduler is not None:
+            self._scheduler.frame.disconnect(self._flush_layout)
+        self._scheduler = scheduler
+        scheduler.frame.connect(self._flush_layout)
+
+    @property
+    def update_scheduler(self) -> UpdateScheduler:
+        return self._scheduler
+
+    def set_max_refresh_rate(self, fps: float):
+        self._scheduler.set_max_fps(fps)
+
+    def flush(self):
+        self._flush_layout()
+
+    def _schedule(self):
+        self._dirty = True
+        self._scheduler.request()
+
+    def _flush_layout(self):
+        if not self._dirty:
+            return
+        perf = self._perf
+        started = perf.clock() if perf is not None else 0.0
+        self._dirty = False
+        start_time = None
+        end_time = None
+        for signal in self._signals:
+            model = signal.model
+            count = model.event_count()
+            if not count:
+                continue
+            first = model.timestamp_at(0)
+            last = model.timestamp_at(count - 1)
+            start_time = first if start_time is None else min(start_time, first)
+            end_time = last if end_time is None else max(end_time, last)
+        self._start_time = start_time
+        self._end_time = end_time if end_time is not None else 0.0
+        self._update_scroll_ranges()
+        self.viewport().update()
+        if perf is not None:
+            perf.add_duration("layout", perf.clock() - started)
+            perf.set_gauge("signals", len(self._signals))
+
+    # time axis
+
+    @property
+    def time_scale(self) -> float:
+        return self._time_scale
+
+    def _plot_width(self) -> float:
+        return max(1.0, self.viewport().width() - self._label_width)
+
+    def _view_start(self) -> float:
+        origin = self._start_time if self._start_time is not None else 0.0
+        return origin + self.horizontalScrollBar().value() / self._time_scale
+
+    def visible_time_range(self):
+        start = self._view_start()
+        return start, start + self._plot_width() / self._time_scale
+
+    def _time_to_x(self, timestamp: float, view_start: float) -> float:
+        return self._label_width + (timestamp - view_start) * self._time_scale
+
+    def _update_scroll_ranges(self):
+        bar = self.horizontalScrollBar()
+        at_end = bar.value() >= bar.maximum()
+        span = 0.0
+        if self._start_time is not None:
+            span = self._end_time - self._start_time
+        maximum = max(0, int(math.ceil(span * self._time_scale - self._plot_width())))
+        bar.blockSignals(True)
+        bar.setRange(0, maximum)
+        bar.setPageStep(int(self._plot_width()))
+        bar.setSingleStep(max(1, int(self._plot_width() / 20)))
+        if self._follow_tail and at_end:
+            bar.setValue(maximum)
+        bar.blockSignals(False)
+
+        rows_height = len(self._signals) * self._row_height
+        available = max(0, self.viewport().height() - self._AXIS_HEIGHT)
+        vbar = self.verticalScrollBar()
+        vbar.setRange(0, max(0, rows_height - available))
+        vbar.setPageStep(available)
+        vbar.setSingleStep(self._row_height)
+
+    def set_time_scale(self, pixels_per_second: float, anchor_x: Optional[float] = None):
+        scale = min(self._MAX_SCALE, max(self._MIN_SCALE, pixels_per_second))
+        if scale == self._time_scale:
+            return
+        if anchor_x is None:
+            anchor_x = self._label_width + self._plot_width() / 2.0
+        view_start = self._view_start()
+        anchor_time = view_start + (anchor_x - self._label_width) / self._time_scale
+        self._time_scale = scale
+        self._update_scroll_ranges()
+        origin = self._start_time if self._start_time is not None else 0.0
+        bar = self.horizontalScrollBar()
+        bar.blockSignals(True)
+        bar.setValue(int(round((anchor_time - origin) * scale - (anchor_x - self._label_width))))
+        bar.blockSignals(False)
+        self.viewport().update()
+
+    def zoom_by(self, factor: float, anchor_x: Optional[float] = None):
+        if factor > 0:
+            self.set_time_scale(self._time_scale * factor, anchor_x)
+
+    def zoom_in(self):
+        self.zoom_by(1.25)
+
+    def zoom_out(self):
+        self.zoom_by(0.8)
+
+    def zoom_to_fit(self):
+        if self._start_time is None or self._end_time <= self._start_time:
+            return
+        self.set_time_scale(self._plot_width() / (self._end_time - self._start_time))
+        self.horizontalScrollBar().setValue(0)
+
+    def scroll_to_time(self, timestamp: float):
+        origin = self._start_time if self._start_time is not None else 0.0
+        self.horizontalScrollBar().setValue(int(round((timestamp - origin) * self._time_scale)))
+
+    def set_follow_tail(self, enabled: bool):
+        self._follow_tail = bool(enabled)
+        if enabled:
+            bar = self.horizontalScrollBar()
+            bar.setValue(bar.maximum())
+
+    def set_time_label_mode(self, mode: str):
+        if mode not in ("relative", "absolute", "auto"):
+            return
+        self._time_label_mode = mode
+        self.viewport().update()
+
+    def set_row_height(self, height: int):
+        self._row_height = max(6, int(height))
+        self._update_scroll_ranges()
+        self.viewport().update()
+
+    def _on_scrolled(self, value):
+        self.viewport().update()
+
+    # styles and instrumentation
+
+    def set_style_table(self, styles: StyleTable):
+        if self._styles is not None:
+            self._styles.changed.disconnect(self.viewport().update)
+        self._styles = styles
+        styles.changed.connect(self.viewport().update)
+        self.viewport().update()
+
+    @property
+    def style_table(self) -> StyleTable:
+        return self._styles
+
+    def _own_styles(self) -> StyleTable:
+        # the shared default table is copied before this widget changes its colors
+        if self._styles is shared_style_table():
+            self.set_style_table(self._styles.copy(parent=self))
+        return self._styles
+
+    def set_color_map(self, color_map: Dict[str, str]):
+        self._own_styles().set_color_map(color_map)
+
+    def set_alarm_keywords(self, alarm_keywords):
+        self._own_styles().set_alarm_keywords(alarm_keywords)
+
+    def set_perf_monitor(self, monitor: Optional[PerfMonitor]):
+        self._perf = monitor
+
+    @property
+    def perf_monitor(self) -> Optional[PerfMonitor]:
+        return self._perf
+
+    # painting
+
+    def _update_palette(self):
+        palette = self.palette()
+        window = palette.color(QPalette.Window)
+        text = palette.color(QPalette.Text)
+        self._background = window
+        self._text_color = text
+        grid = QColor(text)
+        axis = QColor(text)
+        if window.lightness() > 128:
+            grid.setAlpha(40)
+            axis.setAlpha(180)
+        else:
+            grid.setAlpha(70)
+            axis.setAlpha(220)
+        self._grid_color = grid
+        self._axis_color = axis
+
+    def _update_label_width(self):
+        metrics = QFontMetricsF(self._label_font)
+        width = max((metrics.horizontalAdvance(signal.name) for signal in self._signals), default=60.0)
+        self._label_width = int(min(max(80.0, width + 16), 260.0))
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.PaletteChange, QEvent.StyleChange):
+            self._update_palette()
+            self._tick_labels.clear()
+            self.viewport().update()
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_ranges()
+
+    def _tick_step(self) -> float:
+        # 1-2-5 steps, roughly 110px apart
+        seconds = 110.0 / self._time_scale
+        exponent = math.floor(math.log10(seconds))
+        for factor in (1.0, 2.0, 5.0, 10.0):
+            step = factor * 10.0 ** exponent
+            if step >= seconds:
+                return step
+        return 10.0 ** (exponent + 1)
+
+    def _tick_label(self, tick_number: int, tick_step: float) -> str:
+        key = (tick_step, self._time_label_mode, self._start_time)
+        if key != self._tick_key:
+            self._tick_key = key
+            self._tick_labels.clear()
+        label = self._tick_labels.get(tick_number)
+        if label is None:
+            if len(self._tick_labels) >= self._MAX_TICK_LABELS:
+                self._tick_labels.clear()
+            offset = tick_number * tick_step
+            origin = self._start_time or 0.0
+            mode = self._time_label_mode
+            if mode == "relative" or (mode == "auto" and abs(origin + offset) < 10_000_000):
+                # format the offset itself; (origin + offset) - origin picks up float residue
+                label = format_timestamp(offset, mode="relative", base_time=0.0)
+            else:
+                label = format_timestamp(origin + offset, mode=mode, base_time=origin)
+            self._tick_labels[tick_number] = label
+        return label
+
+    def paintEvent(self, event):
+        perf = self._perf
+        started = perf.clock() if perf is not None else 0.0
+        painter = QPainter(self.viewport())
+        self._paint(painter, event.rect())
+        painter.end()
+        if perf is not None:
+            perf.add_duration("paint", perf.clock() - started)
+            perf.maybe_report()
+
+    def _visible_rows(self):
+        height = self.viewport().height() - self._AXIS_HEIGHT
+        offset = self.verticalScrollBar().value()
+        first = max(0, offset // self._row_height)
+        last = min(len(self._signals), (offset + height) // self._row_height + 1)
+        return first, last, self._AXIS_HEIGHT - offset
+
+    def _paint(self, painter, clip):
+        width = self.viewport().width()
+        painter.fillRect(clip, self._background)
+        view_start, view_end = self.visible_time_range()
+        first_row, last_row, top = self._visible_rows()
+        label_width = self._label_width
+
+        # shared time axis and grid, drawn once for all signals
+        tick_step = self._tick_step()
+        grid_pen = QPen(self._grid_color)
+        axis_pen = QPen(self._axis_color)
+        painter.setFont(self._tick_font)
+        painter.setPen(axis_pen)
+        painter.drawLine(QPointF(label_width, self._AXIS_HEIGHT - 1), QPointF(width, self._AXIS_HEIGHT - 1))
+        first_tick = math.floor((view_start - (self._start_time or 0.0)) / tick_step)
+        last_tick = math.floor((view_end - (self._start_time or 0.0)) / tick_step)
+        for tick_number in range(first_tick, last_tick + 1):
+            x = self._time_to_x((self._start_time or 0.0) + tick_number * tick_step, view_start)
+            if x < label_width:
+                continue
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(x, self._AXIS_HEIGHT), QPointF(x, self.viewport().height()))
+            painter.setPen(axis_pen)
+            painter.drawLine(QPointF(x, self._AXIS_HEIGHT - 6), QPointF(x, self._AXIS_HEIGHT - 1))
+            painter.drawText(QPointF(x + 2, self._AXIS_HEIGHT - 8), self._tick_label(tick_number, tick_step))
+
+        painter.save()
+        painter.setClipRect(QRectF(0, self._AXIS_HEIGHT, width, self.viewport().height() - self._AXIS_HEIGHT))
+        seconds_per_pixel = 1.0 / self._time_scale
+        bar_height = self._row_height - self._row_gap
+        styles = self._styles
+        label_metrics = QFontMetricsF(self._label_font)
+        for row in range(first_row, last_row):
+            signal = self._signals[row]
+            y = top + row * self._row_height
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(0, y + self._row_height - 1), QPointF(width, y + self._row_height - 1))
+            painter.setFont(self._label_font)
+            painter.setPen(self._text_color)
+            painter.drawText(
+                QRectF(6, y, label_width - 12, bar_height),
+                Qt.AlignVCenter | Qt.AlignLeft,
+                label_metrics.elidedText(signal.name, Qt.ElideRight, label_width - 12),
+            )
+            model = signal.model
+            count = model.event_count()
+            if not count:
+                continue
+            runs = compute_runs(model, max(view_start, model.timestamp_at(0)), view_end, seconds_per_pixel, self._end_time)
+            for run in runs:
+                x = max(label_width, self._time_to_x(run.start_time, view_start))
+                right = min(width, self._time_to_x(run.end_time, view_start))
+                run_rect = QRectF(x, y + self._row_gap / 2.0, max(1.0, right - x), bar_height)
+                style = styles.style(run.state_id)
+                if run.transitions:
+                    # several states share these pixels; draw each translucently with a marker
+                    merged = QColor(style.color)
+                    merged.setAlpha(150)
+                    painter.fillRect(run_rect, merged)
+                    painter.fillRect(QRectF(run_rect.left(), run_rect.top(), run_rect.width(), 2.0), self._text_color)
+                    continue
+                painter.fillRect(run_rect, style.color)
+                if style.alarm:
+                    painter.setPen(style.outline_pen)
+                    painter.drawRect(run_rect)
+        painter.restore()
+
+        if self._end_time and self._start_time is not None:
+            tail_x = self._time_to_x(self._end_time, view_start)
+            if label_width <= tail_x <= width:
+                painter.setPen(QPen(QColor(CURRENT_OUTLINE), 1))
+                painter.drawLine(QPointF(tail_x, self._AXIS_HEIGHT), QPointF(tail_x, self.viewport().height()))
+
+    # interaction
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            delta = event.angleDelta().y()
+            if delta:
+                self.zoom_by(1.25 ** (delta / 120.0), anchor_x=event.pos().x())
+            event.accept()
+            return
+        super().wheelEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_origin = (event.pos().x(), self.horizontalScrollBar().value())
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self._drag_origin = None
+        super().mouseReleaseEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._drag_origin is not None:
+            origin_x, origin_value = self._drag_origin
+            self.horizontalScrollBar().setValue(origin_value - (event.pos().x() - origin_x))
+        self._hover_pos = (event.pos(), event.globalPos())
+        if not self._hover_timer.isActive():
+            self._hover_timer.start(int(1000.0 / self._scheduler.max_fps))
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        self._hover_timer.stop()
+        self._hover_pos = None
+        self._hover_key = None
+        super().leaveEvent(event)
+
+    def signal_at(self, y: float) -> Optional[str]:
+        first_row, last_row, top = self._visible_rows()
+        if y < self._AXIS_HEIGHT:
+            return None
+        row = int((y - top) // self._row_height)
+        if row < 0 or row >= len(self._signals):
+            return None
+        return self._signals[row].name
+
+    def event_at(self, x: float, y: float):
+        name = self.signal_at(y)
+        if name is None or x < self._label_width:
+            return None, -1
+        model = self._by_name[name].model
+        if not model.event_count():
+            return name, -1
+        timestamp = self._view_start() + (x - self._label_width) / self._time_scale
+        if timestamp < model.timestamp_at(0) or timestamp > self._end_time:
+            return name, -1
+        return name, model.index_for_time(timestamp)
+
+    def _update_hover(self):
+        if self._hover_pos is None:
+            return
+        view_pos, global_pos = self._hover_pos
+        name, index = self.event_at(view_pos.x(), view_pos.y())
+        if index < 0:
+            if self._hover_key is not None:
+                self._hover_key = None
+                QToolTip.hideText()
+            return
+        model = self._by_name[name].model
+        key = (name, model.evicted_count + index, index + 1 < model.event_count())
+        if key == self._hover_key:
+            return
+        self._hover_key = key
+        timestamp = model.timestamp_at(index)
+        duration = None
+        if index + 1 < model.event_count():
+            duration = model.timestamp_at(index + 1) - timestamp
+        QToolTip.showText(
+            global_pos,
+            f"Signal: {name}\n"
+            f"State: {model.state_id_at(index)}\n"
+            f"Time: {format_timestamp(timestamp, mode=self._time_label_mode, base_time=self._start_time)}\n"
+            f"Duration: {format_duration(duration)}\n"
+            f"Extra: {model.extra_text(index)}",
+            self,
+        )
@@ -0,0 +1,663 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class Event:
+    timestamp: float
+    state_id: str
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+_EMPTY_EXTRA: Dict[str, Any] = {}
+_MISSING = object()
+_CODE_TYPECODES = ("B", "H", "I")
+_COMPACT_MIN = 4096
+# declared extra field type -> array typecode; str fields hold codes into a shared string table
+_FIELD_TYPECODES = {float: "d", int: "q", bool: "b", str: "I"}
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+# distinct leftover dicts remembered for sharing; beyond this new ones are stored as given
+_MAX_SHARED_EXTRAS = 4096
+
+
+class EventSequence(Sequence):
+    __slots__ = ("_store", "_start", "_stop")
+
+    def __init__(self, store, start: int = 0, stop: Optional[int] = None):
+        self._store = store
+        self._start = start
+        self._stop = len(store) if stop is None else stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self._store.event(self._start + idx) for idx in range(start, stop, step)]
+            return EventSequence(self._store, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        return self._store.event(self._start + index)
+
+    def __iter__(self):
+        event = self._store.event
+        for index in range(self._start, self._stop):
+            yield event(index)
+
+    def __repr__(self) -> str:
+        return f"EventSequence(start={self._start}, stop={self._stop})"
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def stop(self) -> int:
+        return self._stop
+
+    def timestamp(self, index: int) -> float:
+        if index < 0:
+            index += len(self)
+        return self._store.timestamp(self._start + index)
+
+    def state_id(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        return self._store.state_id(self._start + index)
+
+
+class _TimestampColumn(Sequence):
+    __slots__ = ("_store",)
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index):
+        return self._store.timestamp(index)
+
+
+class ExtraColumns:
+    # declared extra fields as typed columns; undeclared keys (or values of the wrong type)
+    # go to a sparse dict whose identical rows share one dict. Each row stores a small code
+    # into a table of layouts (key order plus which keys sit in columns), so a row reads
+    # back in the order it was written. Rows are stored by row id, which the owning store
+    # hands out in creation order (a late insert gets a new id at the end), so a view
+    # keeps reading its own row across inserts and evictions.
+    def __init__(self, schema: Dict[str, type]):
+        if not schema:
+            raise ValueError("extra schema needs at least one field")
+        for name, kind in schema.items():
+            if kind not in _FIELD_TYPECODES:
+                raise ValueError(f"unsupported type for extra field {name!r}: {kind!r}")
+        self._schema = dict(schema)
+        self._names = tuple(schema)
+        self._slots = {name: slot for slot, name in enumerate(self._names)}
+        self._kinds = tuple(schema.values())
+        self._dropped = 0
+        self._layouts = array(_CODE_TYPECODES[0])
+        self.clear()
+
+    @property
+    def schema(self) -> Dict[str, type]:
+        return dict(self._schema)
+
+    def clear(self) -> None:
+        # row ids keep counting, so views on cleared rows read as empty instead of new rows
+        self._dropped += len(self._layouts)
+        self._columns = [array(_FIELD_TYPECODES[kind]) for kind in self._kinds]
+        self._layouts = array(_CODE_TYPECODES[0])
+        # layout code 0 is the empty extra
+        self._layout_table: List[Any] = [((), frozenset())]
+        self._layout_of: Dict[Any, int] = {self._layout_table[0]: 0}
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._rest: Dict[int, Dict[str, Any]] = {}
+        self._shared: Dict[Any, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._layouts)
+
+    def _encode(self, kind, value):
+        # None when the value does not fit the declared column
+        if kind is float:
+            if type(value) is float:
+                return value
+        elif kind is int:
+            if type(value) is int and _INT64_MIN <= value <= _INT64_MAX:
+                return value
+        elif kind is bool:
+            if type(value) is bool:
+                return value
+        elif type(value) is str:
+            code = self._string_codes.get(value)
+            if code is None:
+                code = self._string_codes[value] = len(self._strings)
+                self._strings.append(value)
+            return code
+        return None
+
+    def _layout(self, keys, columnar) -> int:
+        layout = (keys, frozenset(columnar))
+        code = self._layout_of.get(layout)
+        if code is None:
+            code = self._layout_of[layout] = len(self._layout_table)
+            self._layout_table.append(layout)
+            if code >= 1 << (8 * self._layouts.itemsize):
+                typecode = _CODE_TYPECODES[_CODE_TYPECODES.index(self._layouts.typecode) + 1]
+                self._layouts = array(typecode, self._layouts)
+        return code
+
+    def _encode_row(self, extra):
+        encoded = [0] * len(self._names)
+        layout = 0
+        rest = None
+        if extra:
+            slots = self._slots
+            kinds = self._kinds
+            columnar = []
+            for key, value in extra.items():
+                slot = slots.get(key)
+                code = None if slot is None else self._encode(kinds[slot], value)
+                if code is None:
+                    if rest is None:
+                        rest = {}
+                    rest[key] = value
+                else:
+                    encoded[slot] = code
+                    columnar.append(key)
+            layout = self._layout(tuple(extra), columnar)
+        return encoded, layout, rest
+
+    def append(self, extra: Optional[Dict[str, Any]]) -> int:
+        row = self._dropped + len(self._layouts)
+        encoded, layout, rest = self._encode_row(extra)
+        for column, code in zip(self._columns, encoded):
+            column.append(code)
+        self._layouts.append(layout)
+        if rest is not None:
+            self._rest[row] = self._share(rest)
+        return row
+
+    def extend(self, extras) -> None:
+        # batches are checked one field at a time; a batch with any value that does not
+        # fit its column falls back to row-by-row appends
+        rows = [extra if extra else _EMPTY_EXTRA for extra in extras]
+        encoded = []
+        for name, kind in zip(self._names, self._kinds):
+            values = [row.get(name, _MISSING) for row in rows]
+            present = [value for value in values if value is not _MISSING]
+            if present:
+                if set(map(type, present)) != {kind}:
+                    break
+                if kind is int and (min(present) < _INT64_MIN or max(present) > _INT64_MAX):
+                    break
+                if kind is str:
+                    encode = self._encode
+                    values = [value if value is _MISSING else encode(str, value) for value in values]
+            encoded.append(values)
+        else:
+            for column, values in zip(self._columns, encoded):
+                column.extend([0 if value is _MISSING else value for value in values])
+            self._extend_layouts(rows)
+            return
+        for row in rows:
+            self.append(row)
+
+    def _extend_layouts(self, rows) -> None:
+        row_number = self._dropped + len(self._layouts)
+        slots = self._slots
+        plans: Dict[Any, Any] = {}
+        layouts = []
+        for offset, extra in enumerate(rows):
+            if not extra:
+                layouts.append(0)
+                continue
+            keys = tuple(extra)
+            plan = plans.get(keys)
+            if plan is None:
+                columnar = [key for key in keys if key in slots]
+                undeclared = tuple(key for key in keys if key not in slots)
+                plan = plans[keys] = (self._layout(keys, columnar), undeclared)
+            layouts.append(plan[0])
+            if plan[1]:
+                self._rest[row_number + offset] = self._share({key: extra[key] for key in plan[1]})
+        self._layouts.extend(layouts)
+
+    def _share(self, rest: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            key = tuple(rest.items())
+            hash(key)
+        except TypeError:
+            return rest
+        shared = self._shared.get(key)
+        if shared is None:
+            if len(self._shared) >= _MAX_SHARED_EXTRAS:
+                return rest
+            shared = self._shared[key] = rest
+        return shared
+
+    def release(self, row: int) -> None:
+        # frees the rows below this id; a released row reads as an empty extra
+        count = min(row - self._dropped, len(self._layouts))
+        if count <= 0:
+            return
+        for column in self._columns:
+            del column[:count]
+        del self._layouts[:count]
+        self._dropped += count
+        if self._rest:
+            dropped = self._dropped
+            self._rest = {key: rest for key, rest in self._rest.items() if key >= dropped}
+
+    def _row_layout(self, row: int):
+        position = row - self._dropped
+        if position < 0:
+            return self._layout_table[0]
+        return self._layout_table[self._layouts[position]]
+
+    def is_empty(self, row: int) -> bool:
+        position = row - self._dropped
+        return position < 0 or not self._layouts[position]
+
+    def value(self, row: int, key: str):
+        if key in self._row_layout(row)[1]:
+            slot = self._slots[key]
+            value = self._columns[slot][row - self._dropped]
+            kind = self._kinds[slot]
+            if kind is str:
+                return self._strings[value]
+            return bool(value) if kind is bool else value
+        rest = self._rest.get(row)
+        if rest is None:
+            raise KeyError(key)
+        return rest[key]
+
+    def keys(self, row: int):
+        return iter(self._row_layout(row)[0])
+
+    def count(self, row: int) -> int:
+        return len(self._row_layout(row)[0])
+
+    def memory_usage(self) -> int:
+        total = sum(sys.getsizeof(column) for column in self._columns) + sys.getsizeof(self._layouts)
+        total += sys.getsizeof(self._layout_table) + sys.getsizeof(self._layout_of)
+        total += sys.getsizeof(self._strings) + sys.getsizeof(self._string_codes)
+        total += sum(sys.getsizeof(text) for text in self._strings)
+        total += sys.getsizeof(self._rest) + sys.getsizeof(self._shared)
+        seen = set()
+        for rest in self._rest.values():
+            if id(rest) not in seen:
+                seen.add(id(rest))
+                total += sys.getsizeof(rest)
+        return total
+
+
+class ExtraView(Mapping):
+    # read-only mapping over one row of ExtraColumns; compares equal to the dict it came from.
+    # Once its row is evicted and the store compacts, it is an empty mapping
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns: ExtraColumns, row: int):
+        self._columns = columns
+        self._row = row
+
+    def __getitem__(self, key):
+        return self._columns.value(self._row, key)
+
+    def __contains__(self, key) -> bool:
+        try:
+            self._columns.value(self._row, key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return self._columns.keys(self._row)
+
+    def __len__(self) -> int:
+        return self._columns.count(self._row)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ListEventStore:
+    def __init__(self):
+        self._events: List[Event] = []
+        self._head = 0
+        self.timestamps = _TimestampColumn(self)
+
+    def __len__(self) -> int:
+        return len(self._events) - self._head
+
+    def append(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> Event:
+        event = Event(timestamp=timestamp, state_id=state_id, extra=extra or {})
+        self._events.append(event)
+        return event
+
+    def extend(self, timestamps, state_ids, extras=None) -> None:
+        if extras is None:
+            self._events.extend(Event(timestamp=ts, state_id=st, extra={}) for ts, st in zip(timestamps, state_ids))
+            return
+        self._events.extend(
+            Event(timestamp=ts, state_id=st, extra=ex or {}) for ts, st, ex in zip(timestamps, state_ids, extras)
+        )
+
+    def insert(self, index: int, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> Event:
+        event = Event(timestamp=timestamp, state_id=state_id, extra=extra or {})
+        self._events.insert(self._head + index, event)
+        return event
+
+    def clear(self) -> None:
+        self._events.clear()
+        self._head = 0
+
+    def drop_front(self, count: int) -> None:
+        self._head += min(count, len(self))
+        if self._head >= _COMPACT_MIN and self._head * 2 >= len(self._events):
+            del self._events[: self._head]
+            self._head = 0
+
+    def _position(self, index: int) -> int:
+        if index < 0:
+            return len(self._events) + index
+        return self._head + index
+
+    def event(self, index: int) -> Event:
+        return self._events[self._position(index)]
+
+    def timestamp(self, index: int) -> float:
+        return self._events[self._position(index)].timestamp
+
+    def state_id(self, index: int) -> str:
+        return self._events[self._position(index)].state_id
+
+    def extra(self, index: int) -> Dict[str, Any]:
+        return self._events[self._position(index)].extra
+
+    def bisect_left(self, timestamp: float, lo: int = 0) -> int:
+        return bisect_left(self.timestamps, timestamp, lo)
+
+    def bisect_right(self, timestamp: float, lo: int = 0) -> int:
+        return bisect_right(self.timestamps, timestamp, lo)
+
+    def __iter__(self):
+        return islice(self._events, self._head, None)
+
+    def memory_usage(self) -> int:
+        # only the live range; dropped head entries are freed by the next compaction
+        total = sys.getsizeof(self._events)
+        for event in islice(self._events, self._head, None):
+            total += sys.getsizeof(event) + sys.getsizeof(event.__dict__)
+            total += sys.getsizeof(event.timestamp) + sys.getsizeof(event.extra)
+        return total
+
+
+class ColumnarEventStore:
+    def __init__(self, timestamp_type: str = "d", extra_schema: Optional[Dict[str, type]] = None):
+        if timestamp_type not in ("d", "q"):
+            raise ValueError("timestamp_type must be 'd' (float64) or 'q' (int64)")
+        self._timestamps = array(timestamp_type)
+        self._codes = array(_CODE_TYPECODES[0])
+        self._head = 0
+        self._code_of: Dict[Any, int] = {}
+        self._state_table: List[Any] = []
+        # sparse extras keyed by row id. Row ids count up from _first_row along the columns
+        # until the first insert; from then on _row_ids holds the id of every position, so an
+        # insert is one more memmove instead of renumbering every stored extra
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._first_row = 0
+        self._next_row = 0
+        self._row_ids: Optional[array] = None
+        # with a schema every row has an entry in the typed extra columns instead
+        self._extra_columns: Optional[ExtraColumns] = None
+        self.timestamps = _TimestampColumn(self)
+        if extra_schema:
+            self.set_extra_schema(extra_schema)
+
+    def __len__(self) -> int:
+        return len(self._timestamps) - self._head
+
+    def _intern(self, state_id) -> int:
+        code = self._code_of.get(state_id)
+        if code is None:
+            code = len(self._state_table)
+            self._state_table.append(state_id)
+            self._code_of[state_id] = code
+            limit = 1 << (8 * self._codes.itemsize)
+            if code >= limit:
+                typecode = _CODE_TYPECODES[_CODE_TYPECODES.index(self._codes.typecode) + 1]
+                self._codes = array(typecode, self._codes)
+        return code
+
+    def append(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> Event:
+        row_ids = self._row_ids
+        if row_ids is None:
+            row = self._first_row + len(self._timestamps)
+        else:
+            row = self._next_row
+            self._next_row = row + 1
+            row_ids.append(row)
+        self._timestamps.append(timestamp)
+        self._codes.append(self._intern(state_id))
+        columns = self._extra_columns
+        if columns is not None:
+            columns.append(extra)
+            return Event(timestamp=timestamp, state_id=state_id, extra=self._extra_view(row))
+        if extra:
+            self._extras[row] = extra
+        return Event(timestamp=timestamp, state_id=state_id, extra=extra or {})
+
+    def insert(self, index: int, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> Event:
+        # the column inserts are memmoves; the new row takes the next id, so stored extras
+        # and views on other rows are untouched
+        position = self._head + index
+        code = self._intern(state_id)
+        row_ids = self._row_id_column()
+        row = self._next_row
+        self._next_row = row + 1
+        row_ids.insert(position, row)
+        self._timestamps.insert(position, timestamp)
+        self._codes.insert(position, code)
+        columns = self._extra_columns
+        if columns is not None:
+            columns.append(extra)
+            return Event(timestamp=timestamp, state_id=state_id, extra=self._extra_view(row))
+        if extra:
+            self._extras[row] = extra
+        return Event(timestamp=timestamp, state_id=state_id, extra=extra or {})
+
+    def extend(self, timestamps, state_ids, extras=None) -> None:
+        intern = self._intern
+        codes = [intern(state_id) for state_id in state_ids]
+        row_ids = self._row_ids
+        if row_ids is None:
+            start = self._first_row + len(self._timestamps)
+        else:
+            start = self._next_row
+            self._next_row = start + len(codes)
+            row_ids.extend(range(start, self._next_row))
+        self._timestamps.extend(timestamps)
+        self._codes.extend(codes)
+        columns = self._extra_columns
+        if columns is not None:
+            columns.extend([None] * len(codes) if extras is None else extras)
+        elif extras is not None:
+            for offset, extra in enumerate(extras):
+                if extra:
+                    self._extras[start + offset] = extra
+
+    def _row_id_column(self) -> array:
+        if self._row_ids is None:
+            self._next_row = self._first_row + len(self._timestamps)
+            self._row_ids = array("q", range(self._first_row, self._next_row))
+        return self._row_ids
+
+    def _row(self, position: int) -> int:
+        row_ids = self._row_ids
+        return self._first_row + position if row_ids is None else row_ids[position]
+
+    def clear(self) -> None:
+        # row ids keep counting so views handed out before the clear do not see new rows
+        if self._row_ids is None:
+            self._first_row += len(self._timestamps)
+        else:
+            self._first_row = self._next_row
+            self._row_ids = None
+        del self._timestamps[:]
+        self._codes = array(_CODE_TYPECODES[0])
+        self._head = 0
+        self._code_of.clear()
+        self._state_table.clear()
+        self._extras.clear()
+        if self._extra_columns is not None:
+            self._extra_columns.clear()
+
+    def set_extra_schema(self, schema: Optional[Dict[str, type]]) -> None:
+        # existing extras are moved over, so the schema can be declared after data arrived
+        extras = [self.extra(index) for index in range(len(self))]
+        # evicted rows are compacted away first so the extra columns line up with the arrays
+        head = self._head
+        del self._timestamps[:head]
+        del self._codes[:head]
+        self._head = 0
+        # a fresh ExtraColumns numbers its rows from zero
+        self._first_row = 0
+        self._row_ids = None
+        self._extras = {}
+        self._extra_columns = ExtraColumns(schema) if schema else None
+        for position, extra in enumerate(extras):
+            if self._extra_columns is not None:
+                self._extra_columns.append(extra)
+            elif extra:
+                self._extras[position] = dict(extra)
+
+    @property
+    def extra_schema(self) -> Optional[Dict[str, type]]:
+        return self._extra_columns.schema if self._extra_columns is not None else None
+
+    def _extra_view(self, row: int):
+        if self._extra_columns.is_empty(row):
+            return _EMPTY_EXTRA
+        return ExtraView(self._extra_columns, row)
+
+    def drop_front(self, count: int) -> None:
+        self._head += min(count, len(self))
+        if self._head >= _COMPACT_MIN and self._head * 2 >= len(self._timestamps):
+            head = self._head
+            del self._timestamps[:head]
+            del self._codes[:head]
+            self._head = 0
+            row_ids = self._row_ids
+            if row_ids is None:
+                self._first_row += head
+                first = self._first_row
+                if self._extras:
+                    self._extras = {row: extra for row, extra in self._extras.items() if row >= first}
+            else:
+                if self._extras:
+                    gone = set(row_ids[:head])
+                    self._extras = {row: extra for row, extra in self._extras.items() if row not in gone}
+                del row_ids[:head]
+                first = min(row_ids) if row_ids else self._next_row
+                # once the inserted rows are evicted the ids run in order again
+                if row_ids == array("q", range(first, self._next_row)):
+                    self._first_row = first
+                    self._row_ids = None
+            if self._extra_columns is not None:
+                self._extra_columns.release(first)
+
+    def _position(self, index: int) -> int:
+        if index < 0:
+            return len(self._timestamps) + index
+        return self._head + index
+
+    def event(self, index: int) -> Event:
+        position = self._position(index)
+        return Event(
+            timestamp=self._timestamps[position],
+            state_id=self._state_table[self._codes[position]],
+            extra=self._extra_at(position),
+        )
+
+    def timestamp(self, index: int) -> float:
+        return self._timestamps[self._position(index)]
+
+    def state_id(self, index: int) -> str:
+        return self._state_table[self._codes[self._position(index)]]
+
+    def state_code(self, index: int) -> int:
+        return self._codes[self._position(index)]
+
+    def extra(self, index: int) -> Dict[str, Any]:
+        return self._extra_at(self._position(index))
+
+    def _extra_at(self, position: int):
+        columns = self._extra_columns
+        if columns is None:
+            return self._extras.get(self._row(position), _EMPTY_EXTRA)
+        return self._extra_view(self._row(position))
+
+    def bisect_left(self, timestamp: float, lo: int = 0) -> int:
+        return bisect_left(self._timestamps, timestamp, self._head + lo) - self._head
+
+    def bisect_right(self, timestamp: float, lo: int = 0) -> int:
+        return bisect_right(self._timestamps, timestamp, self._head + lo) - self._head
+
+    @property
+    def state_table(self) -> List[Any]:
+        return list(self._state_table)
+
+    def column_slices(self, start: int = 0, stop: Optional[int] = None):
+        # buffer views pin the arrays; drop them before the store grows again
+        stop = len(self) if stop is None else min(stop, len(self))
+        if stop > start:
+            head = self._head
+            yield memoryview(self._timestamps)[head + start : head + stop], memoryview(self._codes)[head + start : head + stop]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.event(index)
+
+    def memory_usage(self) -> int:
+        total = sys.getsizeof(self._timestamps) + sys.getsizeof(self._codes)
+        total += sys.getsizeof(self._code_of) + sys.getsizeof(self._state_table)
+        total += sys.getsizeof(self._extras) + sys.getsizeof(self._row_ids)
+        for row, extra in self._extras.items():
+            total += sys.getsizeof(row) + sys.getsizeof(extra)
+        if self._extra_columns is not None:
+            total += self._extra_columns.memory_usage()
+        return total
+
+
+def create_store(storage="list", extra_schema: Optional[Dict[str, type]] = None):
+    if not isinstance(storage, str):
+        if extra_schema:
+            if not hasattr(storage, "set_extra_schema"):
+                raise ValueError(f"{type(storage).__name__} does not support an extra schema")
+            storage.set_extra_schema(extra_schema)
+        return storage
+    if extra_schema and storage != "columnar":
+        raise ValueError("extra_schema requires the 'columnar' storage backend")
+    if storage == "list":
+        return ListEventStore()
+    if storage == "columnar":
+        return ColumnarEventStore(extra_schema=extra_schema)
+    raise ValueError(f"unknown storage backend: {storage!r}")
@@ -0,0 +1,433 @@
+import math
+import multiprocessing
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+from PyQt5.QtCore import Qt, QMarginsF, QPointF, QRect, QRectF, QSize, QSizeF
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF, QGuiApplication, QImage, QPageSize, QPainter, QPdfWriter, QPen
+from PyQt5.QtSvg import QSvgGenerator
+
+from .state_model import StateTimelineModel
+from .recording import open_recording
+from .runs import compute_runs
+from ..utils.color_map import ALARM_OUTLINE
+from ..utils.style_table import StyleTable
+from ..utils.time_utils import format_timestamp
+
+
+FORMATS = ("png", "svg", "pdf")
+TILE_WIDTH = 2048
+# raster bands are sized so one band of full-width scanlines stays under this many bytes
+BAND_BYTES = 32 << 20
+# widest single PDF page in layout pixels (200 in at 96 dpi); wider exports are paginated
+MAX_PDF_PAGE_WIDTH = 19200
+
+_TICK_STEPS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600, 43200, 86400]
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_APP = None
+
+
+class ExportResult(NamedTuple):
+    path: str
+    format: str
+    width: int
+    height: int
+    pages: int
+
+
+class TimelineRenderer:
+    # paints a model over a fixed time window without a widget or scene; coordinates are
+    # layout pixels, and paint() only touches what intersects the given rect
+    def __init__(
+        self,
+        model: StateTimelineModel,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        states=None,
+        pixels_per_second: Optional[float] = None,
+        width: Optional[int] = None,
+        style_table: Optional[StyleTable] = None,
+        row_height: int = 36,
+        lane_margin: int = 14,
+        time_label_mode: str = "relative",
+        base_time: Optional[float] = None,
+        background=None,
+        text_color=None,
+    ):
+        count = model.event_count()
+        if start_time is None or end_time is None:
+            if not count:
+                raise ValueError("nothing to export: the model has no events and no time range was given")
+            if start_time is None:
+                start_time = model.timestamp_at(0)
+            if end_time is None:
+                end_time = model.timestamp_at(count - 1)
+        if end_time <= start_time:
+            end_time = start_time + 1.0
+        self._model = model
+        self._start = float(start_time)
+        self._end = float(end_time)
+        self._states = list(states) if states is not None else model.states()
+        self._lanes = {state: idx for idx, state in enumerate(self._states)}
+        self._styles = style_table if style_table is not None else StyleTable()
+        self._row_height = row_height
+        self._lane_margin = lane_margin
+        self._time_label_mode = time_label_mode
+        # ticks and relative labels count from here, like PhaseFlow's axis
+        self._base_time = self._start if base_time is None else float(base_time)
+        self._background = QColor(background if background is not None else Qt.white)
+        self._text_color = QColor(text_color if text_color is not None else Qt.black)
+        self._grid_color = QColor(self._text_color)
+        self._grid_color.setAlpha(55)
+        self._axis_color = QColor(self._text_color)
+        self._axis_color.setAlpha(180)
+        self._label_font = QFont("Consolas", 9)
+        self._tick_font = QFont("Consolas", 8)
+        self._top_padding = 16
+        self._axis_height = 26
+        self._right_padding = 16
+        label_padding = 18
+        metrics = QFontMetricsF(self._label_font)
+        label_width = max((metrics.horizontalAdvance(str(state)) for state in self._states), default=0.0)
+        self._label_padding = label_padding
+        self._left = max(80, int(label_width) + label_padding * 2) + label_padding
+        span = self._end - self._start
+        if width is not None:
+            pixels_per_second = max(1.0, width - self._left - self._right_padding) / span
+        elif pixels_per_second is None:
+            pixels_per_second = 120.0
+        if pixels_per_second <= 0:
+            raise ValueError("pixels_per_second must be positive")
+        self._scale = float(pixels_per_second)
+        self._axis_y = self._top_padding + max(1, len(self._states)) * row_height + 6
+        self._width = int(math.ceil(self._left + span * self._scale + self._right_padding))
+        self._height = self._axis_y + self._axis_height + 8
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def content_left(self) -> float:
+        return float(self._left)
+
+    @property
+    def background(self) -> QColor:
+        return self._background
+
+    @property
+    def time_range(self):
+        return self._start, self._end
+
+    @property
+    def pixels_per_second(self) -> float:
+        return self._scale
+
+    def x_for(self, timestamp: float) -> float:
+        return self._left + (timestamp - self._start) * self._scale
+
+    def time_at(self, x: float) -> float:
+        return self._start + (x - self._left) / self._scale
+
+    def _tick_step(self) -> float:
+        seconds = 110.0 / self._scale
+        for step in _TICK_STEPS:
+            if step >= seconds:
+                return step
+        return _TICK_STEPS[-1]
+
+    def paint(self, painter: QPainter, rect: QRectF, labels: bool = True) -> None:
+        painter.save()
+        painter.setClipRect(rect, Qt.IntersectClip)
+        painter.fillRect(rect, self._background)
+        content = QRectF(self._left, rect.top(), max(0.0, self._width - self._right_padding - self._left), rect.height())
+        content = content.intersected(rect)
+        if not content.isEmpty():
+            self._paint_grid(painter, content)
+            self._paint_runs(painter, content)
+        if labels and rect.left() < self._left:
+            self._paint_labels(painter)
+        painter.restore()
+
+    def _paint_grid(self, painter, rect):
+        left = rect.left()
+        right = rect.right()
+        grid_pen = QPen(self._grid_color)
+        grid_pen.setWidthF(0.0)
+        painter.setPen(grid_pen)
+        for idx in range(len(self._states)):
+            lane_y = self._top_padding + idx * self._row_height + self._row_height - self._lane_margin
+            painter.drawLine(QPointF(left, lane_y), QPointF(right, lane_y))
+        axis_y = self._axis_y
+        axis_pen = QPen(self._axis_color)
+        axis_pen.setWidthF(1.2)
+        painter.setPen(axis_pen)
+        painter.drawLine(QPointF(left, axis_y), QPointF(right, axis_y))
+
+        # labels are drawn right of their tick, so ticks up to one label width left of rect count
+        step = self._tick_step()
+        base = self._base_time
+        first_time = self.time_at(left - 200.0) - base
+        last_time = self.time_at(right) - base
+        painter.setFont(self._tick_font)
+        for tick_number in range(int(math.floor(first_time / step)), int(math.floor(last_time / step)) + 1):
+            tick = base + tick_number * step
+            if tick < self._start:
+                continue
+            x = self.x_for(tick)
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(x, self._top_padding), QPointF(x, axis_y))
+            painter.setPen(axis_pen)
+            painter.drawLine(QPointF(x, axis_y), QPointF(x, axis_y + 6))
+            label = format_timestamp(tick, mode=self._time_label_mode, base_time=base)
+            painter.drawText(QPointF(x + 2, axis_y + 18), label)
+
+    def _paint_runs(self, painter, rect):
+        if not self._model.event_count():
+            return
+        scale = self._scale
+        # sub-pixel segments are merged per pixel column, so a tile costs O(width) runs
+        runs = compute_runs(self._model, self.time_at(rect.left()), min(self._end, self.time_at(rect.right())), 1.0 / scale, self._end)
+        lanes = self._lanes
+        styles = self._styles
+        height = self._row_height - self._lane_margin
+        alarm_pen = QPen(QColor(ALARM_OUTLINE), 1)
+        marker_pen = QPen(self._text_color)
+        metrics = QFontMetricsF(self._tick_font)
+        painter.save()
+        painter.setClipRect(rect, Qt.IntersectClip)
+        painter.setFont(self._tick_font)
+        for run in runs:
+            lane = lanes.get(run.state_id)
+            if lane is None:
+                continue
+            style = styles.style(run.state_id)
+            lane_y = self._top_padding + lane * self._row_height
+            start = max(run.start_time, self._start)
+            end = min(run.end_time, self._end)
+            if end < start:
+                continue
+            x = self.x_for(start)
+            run_rect = QRectF(x, lane_y, max(1.0, (end - start) * scale), height)
+            if run.transitions:
+                merged = QColor(style.color)
+                merged.setAlpha(150)
+                painter.fillRect(run_rect, merged)
+                painter.fillRect(QRectF(x, lane_y, run_rect.width(), 2.0), self._text_color)
+                label = str(run.transitions)
+                if metrics.horizontalAdvance(label) + 4 <= run_rect.width():
+                    painter.setPen(marker_pen)
+                    painter.drawText(run_rect, Qt.AlignCenter, label)
+                continue
+            painter.fillRect(run_rect, style.color)
+            if style.alarm:
+                painter.setPen(alarm_pen)
+                painter.drawRect(run_rect)
+        painter.restore()
+
+    def _paint_labels(self, painter):
+        painter.fillRect(QRectF(0, 0, self._left, self._height), self._background)
+        painter.setFont(self._label_font)
+        painter.setPen(self._text_color)
+        height = self._row_height - self._lane_margin
+        for idx, state in enumerate(self._states):
+            y = self._top_padding + idx * self._row_height
+            painter.drawText(QRectF(self._label_padding, y, self._left - self._label_padding, height), Qt.AlignLeft | Qt.AlignVCenter, str(state))
+
+
+def _ensure_gui_application():
+    # text rendering needs a QGuiApplication; batch jobs get the offscreen platform
+    global _APP
+    if QGuiApplication.instance() is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _APP = QGuiApplication([])
+
+
+def _format_for(path, fmt):
+    if fmt is None:
+        fmt = os.path.splitext(str(path))[1].lstrip(".").lower()
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"unsupported export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def _png_chunk(handle, kind: bytes, data: bytes) -> None:
+    handle.write(struct.pack(">I", len(data)))
+    handle.write(kind)
+    handle.write(data)
+    handle.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+
+def _write_png(path, renderer: TimelineRenderer, dpi: float, tile_width: int, band_bytes: int, compress_level: int):
+    # scanlines are produced in horizontal bands and streamed through zlib, so memory is one
+    # band plus one tile image however long the timeline is
+    density = dpi / 96.0
+    width = int(math.ceil(renderer.width * density))
+    height = int(math.ceil(renderer.height * density))
+    stride = width * 3
+    band_rows = max(1, min(height, band_bytes // (stride + 1)))
+    compressor = zlib.compressobj(compress_level)
+    background = renderer.background
+    with open(path, "wb") as handle:
+        handle.write(_PNG_SIGNATURE)
+        _png_chunk(handle, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        per_meter = int(round(dpi / 0.0254))
+        _png_chunk(handle, b"pHYs", struct.pack(">IIB", per_meter, per_meter, 1))
+        for top in range(0, height, band_rows):
+            rows = min(band_rows, height - top)
+            # filter byte 0 (none) leads every scanline; the zeroed buffer already holds it
+            band = bytearray((stride + 1) * rows)
+            for left in range(0, width, tile_width):
+                columns = min(tile_width, width - left)
+                image = QImage(columns, rows, QImage.Format_RGB888)
+                image.fill(background)
+                painter = QPainter(image)
+                painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
+                painter.translate(-left, -top)
+                painter.scale(density, density)
+                renderer.paint(painter, QRectF(left / density, top / density, columns / density, rows / density))
+                painter.end()
+                line = image.bytesPerLine()
+                pixels = image.constBits()
+                pixels.setsize(line * rows)
+                data = memoryview(pixels)
+                span = columns * 3
+                for row in range(rows):
+                    offset = row * (stride + 1) + 1 + left * 3
+                    band[offset : offset + span] = data[row * line : row * line + span]
+                del data, pixels, image
+            chunk = compressor.compress(band)
+            if chunk:
+                _png_chunk(handle, b"IDAT", chunk)
+        _png_chunk(handle, b"IDAT", compressor.flush())
+        _png_chunk(handle, b"IEND", b"")
+    return width, height, 1
+
+
+def _write_svg(path, renderer: TimelineRenderer, dpi: float, tile_width: int, title: Optional[str]):
+    generator = QSvgGenerator()
+    generator.setFileName(str(path))
+    generator.setSize(QSize(renderer.width, renderer.height))
+    generator.setViewBox(QRect(0, 0, renderer.width, renderer.height))
+    generator.setResolution(int(round(dpi)))
+    if title:
+        generator.setTitle(title)
+    painter = QPainter(generator)
+    # painted tile by tile so run lists stay bounded; vector output has no pixel buffer
+    for left in range(0, renderer.width, tile_width):
+        renderer.paint(painter, QRectF(left, 0, min(tile_width, renderer.width - left), renderer.height))
+    painter.end()
+    return renderer.width, renderer.height, 1
+
+
+def _write_pdf(path, renderer: TimelineRenderer, tile_width: int, page_width: Optional[int], title: Optional[str]):
+    content_left = renderer.content_left
+    content_width = renderer.width - content_left
+    if page_width is None:
+        page_width = content_width if renderer.width <= MAX_PDF_PAGE_WIDTH else MAX_PDF_PAGE_WIDTH - content_left
+    page_width = max(1.0, float(page_width))
+    pages = max(1, int(math.ceil(content_width / page_width)))
+    writer = QPdfWriter(str(path))
+    # layout pixels map 1:1 onto a 96 dpi page; the output stays vector at any zoom
+    writer.setResolution(96)
+    writer.setPageSize(QPageSize(QSizeF((content_left + page_width) * 0.75, renderer.height * 0.75), QPageSize.Point))
+    writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+    if title:
+        writer.setTitle(title)
+    painter = QPainter(writer)
+    for page in range(pages):
+        if page:
+            writer.newPage()
+        shift = page * page_width
+        # every page repeats the lane labels; its content is the next page_width of the timeline
+        painter.save()
+        painter.translate(-shift, 0)
+        page_end = min(content_left + shift + page_width, renderer.width)
+        for left in range(int(content_left + shift), int(math.ceil(page_end)), tile_width):
+            renderer.paint(painter, QRectF(left, 0, min(tile_width, page_end - left), renderer.height), labels=False)
+        painter.restore()
+        renderer.paint(painter, QRectF(0, 0, content_left, renderer.height))
+    painter.end()
+    return int(math.ceil(content_left + page_width)), renderer.height, pages
+
+
+def export_timeline(
+    model: StateTimelineModel,
+    path,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    states=None,
+    pixels_per_second: Optional[float] = None,
+    width: Optional[int] = None,
+    dpi: float = 96.0,
+    format: Optional[str] = None,
+    style_table: Optional[StyleTable] = None,
+    color_map=None,
+    alarm_keywords=None,
+    time_label_mode: str = "relative",
+    base_time: Optional[float] = None,
+    tile_width: int = TILE_WIDTH,
+    band_bytes: int = BAND_BYTES,
+    page_width: Optional[int] = None,
+    compress_level: int = 6,
+    title: Optional[str] = None,
+) -> ExportResult:
+    fmt = _format_for(path, format)
+    _ensure_gui_application()
+    if style_table is None:
+        style_table = StyleTable(color_map, alarm_keywords) if alarm_keywords is not None else StyleTable(color_map)
+    renderer = TimelineRenderer(
+        model,
+        start_time,
+        end_time,
+        states=states,
+        pixels_per_second=pixels_per_second,
+        width=width,
+        style_table=style_table,
+        time_label_mode=time_label_mode,
+        base_time=base_time,
+    )
+    tile_width = max(64, int(tile_width))
+    if fmt == "png":
+        size = _write_png(path, renderer, dpi, tile_width, band_bytes, compress_level)
+    elif fmt == "svg":
+        size = _write_svg(path, renderer, dpi, tile_width, title)
+    else:
+        size = _write_pdf(path, renderer, tile_width, page_width, title)
+    return ExportResult(str(path), fmt, *size)
+
+
+def _export_job(job) -> ExportResult:
+    options = dict(job)
+    source = options.pop("source")
+    path = options.pop("path")
+    if isinstance(source, (str, os.PathLike)):
+        model = open_recording(source)
+        try:
+            return export_timeline(model, path, **options)
+        finally:
+            model.store.close()
+    return export_timeline(source, path, **options)
+
+
+def export_timelines(jobs, workers: Optional[int] = None, executor=None) -> List[ExportResult]:
+    # each job is a dict of export_timeline arguments with "source" (a recording path or a
+    # picklable model) and "path"; results come back in job order
+    jobs = list(jobs)
+    if executor is not None:
+        return list(executor.map(_export_job, jobs))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return [_export_job(job) for job in jobs]
+    # spawned rather than forked: a forked child would inherit this process's Qt state
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+        return list(pool.map(_export_job, jobs))
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import chain
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+
+_CORE_FIELDS = ("timestamp", "state_id", "extra")
+
+
+class ImportChunk(NamedTuple):
+    timestamps: List[float]
+    state_ids: List[str]
+    extras: Optional[List[Optional[Dict[str, Any]]]]
+    bytes_read: int
+
+
+def detect_format(path) -> str:
+    suffix = os.path.splitext(str(path))[1].lower()
+    if suffix in (".jsonl", ".ndjson", ".json"):
+        return FORMAT_JSONL
+    return FORMAT_CSV
+
+
+def _line_batches(handle, first_chunk: int, chunk_size: int) -> Iterator[List[str]]:
+    size = first_chunk
+    while True:
+        lines = []
+        for line in handle:
+            lines.append(line)
+            if len(lines) >= size:
+                break
+        if not lines:
+            return
+        yield lines
+        size = chunk_size
+
+
+def _csv_rows(handle, position, first_chunk: int, chunk_size: int) -> Iterator[tuple]:
+    # one reader over the whole stream, so quoted fields may span lines anywhere in the file
+    rows = csv.reader(handle)
+    first = next(rows, None)
+    while first is not None and not first:
+        first = next(rows, None)
+    if first is None:
+        return
+    names = [name.strip() for name in first]
+    lowered = [name.lower() for name in names]
+    if ("timestamp" in lowered and "state_id" in lowered) or lowered[0] == "timestamp":
+        header = [lower if lower in _CORE_FIELDS else name for name, lower in zip(names, lowered)]
+    else:
+        header = list(_CORE_FIELDS)
+        rows = chain((first,), rows)
+    batch = []
+    size = first_chunk
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield header, batch, position()
+            batch = []
+            size = chunk_size
+    if batch:
+        yield header, batch, position()
+
+
+def _parse_csv(handle, position, first_chunk: int, chunk_size: int, intern) -> Iterator[ImportChunk]:
+    for header, rows, bytes_read in _csv_rows(handle, position, first_chunk, chunk_size):
+        extra_columns = [(idx, name) for idx, name in enumerate(header) if name not in ("timestamp", "state_id")]
+        ts_col = header.index("timestamp") if "timestamp" in header else 0
+        state_col = header.index("state_id") if "state_id" in header else 1
+        timestamps = []
+        state_ids = []
+        extras = []
+        has_extra = False
+        for row in rows:
+            if not row:
+                continue
+            timestamps.append(float(row[ts_col]))
+            state_ids.append(intern(row[state_col], row[state_col]))
+            extra = None
+            for idx, name in extra_columns:
+                if idx >= len(row) or row[idx] == "":
+                    continue
+                if name == "extra":
+                    value = json.loads(row[idx])
+                    if value:
+                        extra = dict(value) if extra is None else {**extra, **value}
+                else:
+                    if extra is None:
+                        extra = {}
+                    extra[name] = row[idx]
+            if extra is not None:
+                has_extra = True
+            extras.append(extra)
+        if timestamps:
+            yield ImportChunk(timestamps, state_ids, extras if has_extra else None, bytes_read)
+
+
+def _parse_jsonl(handle, position, first_chunk: int, chunk_size: int, intern) -> Iterator[ImportChunk]:
+    loads = json.loads
+    for lines in _line_batches(handle, first_chunk, chunk_size):
+        timestamps = []
+        state_ids = []
+        extras = []
+        has_extra = False
+        for line in lines:
+            if not line.strip():
+                continue
+            record = loads(line)
+            state_id = str(record["state_id"])
+            timestamps.append(float(record["timestamp"]))
+            state_ids.append(intern(state_id, state_id))
+            extra = record.get("extra") or None
+            if extra is not None:
+                has_extra = True
+            extras.append(extra)
+        if timestamps:
+            yield ImportChunk(timestamps, state_ids, extras if has_extra else None, position())
+
+
+def iter_event_chunks(path, fmt: Optional[str] = None, chunk_size: int = 50000, first_chunk: Optional[int] = None) -> Iterator[ImportChunk]:
+    fmt = fmt or detect_format(path)
+    if fmt not in (FORMAT_CSV, FORMAT_JSONL):
+        raise ValueError(f"unknown log format: {fmt!r}")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    first_chunk = min(chunk_size, first_chunk or chunk_size)
+    # one string object per distinct state across the whole file
+    intern = {}.setdefault
+    with open(path, "rb") as raw:
+        # tell() is unavailable on a text stream while iterating it; count bytes on the raw side
+        counter = _CountingReader(raw)
+        handle = io.TextIOWrapper(io.BufferedReader(counter), encoding="utf-8", newline="")
+        parse = _parse_csv if fmt == FORMAT_CSV else _parse_jsonl
+        yield from parse(handle, counter.tell, first_chunk, chunk_size, intern)
+
+
+class _CountingReader(io.RawIOBase):
+    def __init__(self, raw):
+        self._raw = raw
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._raw.readinto(buffer)
+        self._position += count or 0
+        return count
+
+    def tell(self) -> int:
+        return self._position
+
+
+def import_log(model, path, fmt: Optional[str] = None, chunk_size: int = 50000, progress=None) -> int:
+    total_bytes = os.path.getsize(path)
+    loaded = 0
+    started = time.perf_counter()
+    for chunk in iter_event_chunks(path, fmt=fmt, chunk_size=chunk_size):
+        loaded += model.append_events(timestamps=chunk.timestamps, state_ids=chunk.state_ids, extras=chunk.extras)
+        if progress is not None:
+            elapsed = time.perf_counter() - started
+            progress(chunk.bytes_read, total_bytes, loaded, loaded / elapsed if elapsed > 0 else 0.0)
+    return loaded
+
+
+def __getattr__(name):
+    # LogImporter needs Qt; resolved on first use so the parsers import without PyQt5
+    if name == "LogImporter":
+        from .log_importer import LogImporter
+
+        return LogImporter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,98 @@
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+_OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
+
+class IngestBuffer:
+    def __init__(self, capacity: int = 65536, overflow: str = OVERFLOW_DROP_OLDEST):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in _OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {overflow!r}")
+        self._capacity = capacity
+        self._overflow = overflow
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._queued = 0
+        self._dropped = 0
+        self._drained = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def overflow(self) -> str:
+        return self._overflow
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def push(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            if not self._make_room(1, timeout):
+                return False
+            self._items.append((timestamp, state_id, extra))
+            self._queued += 1
+            return True
+
+    def push_many(self, events, timeout: Optional[float] = None) -> int:
+        accepted = 0
+        with self._lock:
+            for event in events:
+                if not self._make_room(1, timeout):
+                    continue
+                self._items.append(tuple(event))
+                accepted += 1
+            self._queued += accepted
+        return accepted
+
+    def _make_room(self, count: int, timeout: Optional[float]) -> bool:
+        items = self._items
+        if len(items) + count <= self._capacity:
+            return True
+        if self._overflow == OVERFLOW_DROP_OLDEST:
+            while len(items) + count > self._capacity:
+                items.popleft()
+                self._dropped += 1
+            return True
+        if self._overflow == OVERFLOW_BLOCK:
+            if self._not_full.wait_for(lambda: len(items) + count <= self._capacity, timeout):
+                return True
+        self._dropped += count
+        return False
+
+    def drain(self, max_items: Optional[int] = None) -> List[Tuple[float, str, Optional[Dict[str, Any]]]]:
+        with self._lock:
+            items = self._items
+            if max_items is None or max_items >= len(items):
+                batch = list(items)
+                items.clear()
+            else:
+                batch = [items.popleft() for _ in range(max_items)]
+            self._drained += len(batch)
+            if batch and self._overflow == OVERFLOW_BLOCK:
+                self._not_full.notify_all()
+        return batch
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "dropped": self._dropped,
+                "drained": self._drained,
+                "pending": len(self._items),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._queued = 0
+            self._dropped = 0
+            self._drained = 0
@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .importer import iter_event_chunks
+
+
+class LogImporter(QObject):
+    progress = pyqtSignal(int, int, int, float)  # bytes_read, total_bytes, events, events_per_second
+    chunk_loaded = pyqtSignal(int)
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(str)
+    _chunk_ready = pyqtSignal()
+
+    def __init__(self, parent=None, chunk_size: int = 50000, first_chunk: int = 2000, max_pending: int = 4):
+        super().__init__(parent)
+        self._chunk_size = chunk_size
+        self._first_chunk = first_chunk
+        self._queue: "queue.Queue" = queue.Queue(max_pending)
+        self._thread = None
+        self._cancel = threading.Event()
+        # set by the parser thread after its last chunk; the outcome is None or the exception
+        self._done = threading.Event()
+        self._outcome = None
+        self._target = None
+        self._total_bytes = 0
+        self._loaded = 0
+        self._started = 0.0
+        self._chunk_ready.connect(self._consume)
+
+    @property
+    def is_running(self) -> bool:
+        return self._target is not None
+
+    @property
+    def event_count(self) -> int:
+        return self._loaded
+
+    def start(self, path, target, fmt: Optional[str] = None) -> None:
+        # target is a StateTimelineModel or anything with the same append_events, e.g. PhaseFlow
+        if self.is_running:
+            raise RuntimeError("an import is already running")
+        self._target = target
+        self._total_bytes = os.path.getsize(path)
+        self._loaded = 0
+        self._started = time.perf_counter()
+        self._cancel.clear()
+        self._drain()
+        self._done.clear()
+        self._outcome = None
+        self._thread = threading.Thread(target=self._parse, args=(path, fmt), name="pyStateView-import", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        # queued chunks are dropped, so a parser waiting on a full queue can finish
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def _put(self, item) -> bool:
+        while not self._cancel.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            self._chunk_ready.emit()
+            return True
+        return False
+
+    def _parse(self, path, fmt) -> None:
+        result = None
+        chunks = iter_event_chunks(path, fmt=fmt, chunk_size=self._chunk_size, first_chunk=self._first_chunk)
+        try:
+            for chunk in chunks:
+                if not self._put(chunk):
+                    break
+        except Exception as exc:
+            result = exc
+        finally:
+            chunks.close()
+        # never blocks on the bounded queue: after cancel the GUI thread stops draining it.
+        # The signal still reaches the GUI thread, so the target gets released
+        self._outcome = result
+        self._done.set()
+        self._chunk_ready.emit()
+
+    def _consume(self) -> None:
+        while self._target is not None:
+            # checked before the queue: once done is set every chunk is already queued
+            done = self._done.is_set()
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                if done:
+                    self._finish()
+                return
+            if self._cancel.is_set():
+                continue
+            count = self._target.append_events(timestamps=item.timestamps, state_ids=item.state_ids, extras=item.extras)
+            self._loaded += count
+            elapsed = time.perf_counter() - self._started
+            self.chunk_loaded.emit(count)
+            self.progress.emit(item.bytes_read, self._total_bytes, self._loaded, self._loaded / elapsed if elapsed > 0 else 0.0)
+
+    def _finish(self) -> None:
+        self._target = None
+        outcome = self._outcome
+        self._outcome = None
+        if isinstance(outcome, Exception):
+            self.failed.emit(f"{type(outcome).__name__}: {outcome}")
+        else:
+            self.finished.emit(self._loaded)
@@ -0,0 +1,243 @@
+from typing import Optional
+
+from PyQt5.QtCore import Qt, QEvent, QRectF, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPalette, QPen, QPixmap
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+from .state_model import StateTimelineModel
+from .summary import SummaryPyramid
+from .update_scheduler import UpdateScheduler
+from ..utils.color_map import ALARM_COLOR, FAULT_COLOR, SEVERITY_FAULT, SEVERITY_NONE
+from ..utils.style_table import StyleTable, shared_style_table
+
+
+class TimelineOverview(QWidget):
+    time_selected = pyqtSignal(float)
+
+    _MARKER_HEIGHT = 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._flow = None
+        self._model = None
+        self._pyramid = None
+        self._styles = None
+        self._perf = None
+        self._strip = None
+        self._strip_key = None
+        self._dragging = False
+        self._scheduler = UpdateScheduler(max_fps=30.0, parent=self)
+        self._scheduler.frame.connect(self.update)
+        self._background = None
+        self._frame_color = None
+        self.setMinimumHeight(28)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setCursor(Qt.PointingHandCursor)
+        self.setObjectName("psvTimelineOverview")
+        self._update_palette()
+        self.set_style_table(shared_style_table())
+
+    def sizeHint(self):
+        size = super().sizeHint()
+        size.setHeight(36)
+        return size
+
+    def set_phase_flow(self, flow):
+        if self._flow is not None:
+            bar = self._flow.horizontalScrollBar()
+            bar.valueChanged.disconnect(self.update)
+            bar.rangeChanged.disconnect(self._on_flow_range_changed)
+            self._flow.model_changed.disconnect(self.set_model)
+            self._flow.style_table_changed.disconnect(self.set_style_table)
+        self._flow = flow
+        if flow is None:
+            self.set_model(None)
+            return
+        # the visible-range frame follows scrolling and zooming of the linked view
+        bar = flow.horizontalScrollBar()
+        bar.valueChanged.connect(self.update)
+        bar.rangeChanged.connect(self._on_flow_range_changed)
+        flow.model_changed.connect(self.set_model)
+        # follows the flow onto its private table once it changes colors
+        flow.style_table_changed.connect(self.set_style_table)
+        self.set_style_table(flow.style_table)
+        self.set_model(flow.model)
+
+    @property
+    def phase_flow(self):
+        return self._flow
+
+    def set_model(self, model: Optional[StateTimelineModel], pyramid: Optional[SummaryPyramid] = None):
+        if self._model is not None:
+            self._model.remove_listener(self._on_model_changed)
+        if self._pyramid is not None and self._pyramid.model is self._model:
+            self._pyramid.detach()
+        self._model = model
+        self._pyramid = None
+        if model is not None:
+            self._pyramid = pyramid if pyramid is not None else SummaryPyramid(model)
+            model.add_listener(self._on_model_changed)
+        self._strip_key = None
+        self.update()
+
+    @property
+    def model(self) -> Optional[StateTimelineModel]:
+        return self._model
+
+    @property
+    def summary(self) -> Optional[SummaryPyramid]:
+        return self._pyramid
+
+    def set_style_table(self, styles: StyleTable):
+        if self._styles is not None:
+            self._styles.changed.disconnect(self._on_styles_changed)
+        self._styles = styles
+        styles.changed.connect(self._on_styles_changed)
+        self._on_styles_changed()
+
+    @property
+    def style_table(self) -> StyleTable:
+        return self._styles
+
+    def set_perf_monitor(self, monitor):
+        self._perf = monitor
+
+    @property
+    def perf_monitor(self):
+        return self._perf
+
+    def time_range(self):
+        return self._pyramid.time_range() if self._pyramid is not None else None
+
+    def time_at(self, x: float) -> Optional[float]:
+        time_range = self.time_range()
+        if time_range is None:
+            return None
+        start, end = time_range
+        ratio = min(1.0, max(0.0, x / max(1, self.width())))
+        return start + ratio * (end - start)
+
+    def _on_model_changed(self, kind, start, count):
+        # the pyramid is updated by its own listener; the strip is redrawn at most once per frame
+        self._scheduler.request()
+
+    def _on_flow_range_changed(self, minimum, maximum):
+        self.update()
+
+    def _on_styles_changed(self):
+        self._strip_key = None
+        self.update()
+
+    def _update_palette(self):
+        palette = self.palette()
+        self._background = palette.color(QPalette.Base)
+        self._frame_color = palette.color(QPalette.Text)
+        self._strip_key = None
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.PaletteChange, QEvent.StyleChange):
+            self._update_palette()
+            self.update()
+        super().changeEvent(event)
+
+    def paintEvent(self, event):
+        perf = self._perf
+        if perf is None:
+            self._paint_overview()
+            return
+        started = perf.clock()
+        self._paint_overview()
+        perf.add_duration("overview.paint", perf.clock() - started)
+
+    def _paint_overview(self):
+        painter = QPainter(self)
+        time_range = self.time_range()
+        if time_range is None:
+            painter.fillRect(self.rect(), self._background)
+            return
+        ratio = self.devicePixelRatioF()
+        key = (self._pyramid.version, self.width(), self.height(), ratio)
+        if key != self._strip_key:
+            self._strip = self._render_strip(time_range, ratio)
+            self._strip_key = key
+        # the strip is cached, so moving the view frame is a blit plus one rectangle
+        painter.drawPixmap(0, 0, self._strip)
+        if self._flow is not None:
+            self._draw_view_frame(painter, time_range)
+
+    def _render_strip(self, time_range, ratio):
+        width = max(1, self.width())
+        height = max(1, self.height())
+        pixmap = QPixmap(int(width * ratio), int(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(self._background)
+        start, end = time_range
+        span = end - start
+        if span <= 0:
+            return pixmap
+        scale = width / span
+        marker = self._MARKER_HEIGHT
+        style = self._styles.style
+        alarm_color = QColor(ALARM_COLOR)
+        fault_color = QColor(FAULT_COLOR)
+        painter = QPainter(pixmap)
+        # one bucket per pixel at most; the pyramid answers in O(width) whatever the recording length
+        for bucket in self._pyramid.buckets(start, end, width):
+            x = (bucket.start - start) * scale
+            bucket_width = max(1.0, (bucket.end - bucket.start) * scale)
+            painter.fillRect(QRectF(x, marker, bucket_width, height - marker), style(bucket.dominant).color)
+            severity = max(style(state_id).severity for state_id in bucket.states)
+            if severity != SEVERITY_NONE:
+                painter.fillRect(QRectF(x, 0, bucket_width, marker), fault_color if severity >= SEVERITY_FAULT else alarm_color)
+        painter.end()
+        return pixmap
+
+    def _draw_view_frame(self, painter, time_range):
+        start, end = time_range
+        span = end - start
+        if span <= 0:
+            return
+        view_start, view_end = self._flow.visible_time_range()
+        scale = self.width() / span
+        left = max(0.0, (view_start - start) * scale)
+        right = min(float(self.width()), (view_end - start) * scale)
+        if right < left:
+            return
+        shade = QColor(self._frame_color)
+        shade.setAlpha(40)
+        frame = QRectF(left, 0.5, max(2.0, right - left), self.height() - 1.0)
+        painter.fillRect(frame, shade)
+        pen = QPen(self._frame_color)
+        pen.setWidthF(1.0)
+        painter.setPen(pen)
+        painter.drawRect(frame)
+
+    def _jump_to(self, x: float):
+        timestamp = self.time_at(x)
+        if timestamp is None:
+            return
+        if self._flow is not None:
+            self._flow.scroll_to_time(timestamp)
+        self.time_selected.emit(timestamp)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._dragging = True
+            self._jump_to(event.pos().x())
+            event.accept()
+            return
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._dragging:
+            self._jump_to(event.pos().x())
+            event.accept()
+            return
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self._dragging:
+            self._dragging = False
+            event.accept()
+            return
+        super().mouseReleaseEvent(event)
@@ -0,0 +1,165 @@
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+
+# upper bucket bounds in milliseconds; the last bucket is open-ended
+DURATION_BUCKETS_MS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 33.0, 66.0, 133.0, 266.0)
+
+
+class DurationHistogram:
+    __slots__ = ("count", "total", "maximum", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float) -> None:
+        millis = seconds * 1000.0
+        self.count += 1
+        self.total += millis
+        if millis > self.maximum:
+            self.maximum = millis
+        self.buckets[bisect_left(DURATION_BUCKETS_MS, millis)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        # upper bound of the bucket holding the requested rank, never above the observed maximum
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(DURATION_BUCKETS_MS[idx], self.maximum) if idx < len(DURATION_BUCKETS_MS) else self.maximum
+        return self.maximum
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.maximum,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "buckets_ms": list(DURATION_BUCKETS_MS),
+            "histogram": list(self.buckets),
+        }
+
+
+class RateCounter:
+    __slots__ = ("window", "slots", "counts", "stamps", "total")
+
+    def __init__(self, window: float = 1.0, slots: int = 10):
+        self.window = window
+        self.slots = slots
+        self.counts = [0] * slots
+        self.stamps = [-1] * slots
+        self.total = 0
+
+    def add(self, count: int, now: float) -> None:
+        tick = int(now * self.slots / self.window)
+        slot = tick % self.slots
+        if self.stamps[slot] != tick:
+            self.stamps[slot] = tick
+            self.counts[slot] = 0
+        self.counts[slot] += count
+        self.total += count
+
+    def rate(self, now: float) -> float:
+        tick = int(now * self.slots / self.window)
+        oldest = tick - self.slots + 1
+        recent = sum(count for count, stamp in zip(self.counts, self.stamps) if stamp >= oldest)
+        return recent / self.window
+
+
+class PerfMonitor:
+    def __init__(self, report_interval: float = 1.0, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._durations: Dict[str, DurationHistogram] = {}
+        self._rates: Dict[str, RateCounter] = {}
+        self._gauges: Dict[str, Any] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._report_interval = report_interval
+        self._last_report = clock()
+
+    @property
+    def clock(self) -> Callable[[], float]:
+        return self._clock
+
+    def add_duration(self, name: str, seconds: float) -> None:
+        histogram = self._durations.get(name)
+        if histogram is None:
+            histogram = self._durations[name] = DurationHistogram()
+        histogram.add(seconds)
+
+    def add_count(self, name: str, count: int = 1) -> None:
+        counter = self._rates.get(name)
+        if counter is None:
+            counter = self._rates[name] = RateCounter()
+        counter.add(count, self._clock())
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        self._gauges[name] = value
+
+    def duration(self, name: str) -> Optional[Dict[str, Any]]:
+        histogram = self._durations.get(name)
+        return histogram.summary() if histogram is not None else None
+
+    def rate(self, name: str) -> float:
+        counter = self._rates.get(name)
+        return counter.rate(self._clock()) if counter is not None else 0.0
+
+    def gauge(self, name: str, default: Any = None) -> Any:
+        return self._gauges.get(name, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "durations": {name: histogram.summary() for name, histogram in self._durations.items()},
+            "rates": {name: counter.rate(now) for name, counter in self._rates.items()},
+            "totals": {name: counter.total for name, counter in self._rates.items()},
+            "gauges": dict(self._gauges),
+        }
+
+    def reset(self) -> None:
+        self._durations.clear()
+        self._rates.clear()
+        self._gauges.clear()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def set_report_interval(self, seconds: float) -> None:
+        self._report_interval = max(0.0, seconds)
+
+    def maybe_report(self) -> None:
+        # called by instrumented widgets once per frame; listeners see at most one snapshot per interval
+        if not self._listeners:
+            return
+        now = self._clock()
+        if now - self._last_report < self._report_interval:
+            return
+        self._last_report = now
+        snapshot = self.snapshot()
+        for listener in list(self._listeners):
+            listener(snapshot)
+
+
+def logging_listener(logger: Optional[logging.Logger] = None, level: int = logging.INFO) -> Callable[[Dict[str, Any]], None]:
+    logger = logger or logging.getLogger("pyStateView.perf")
+
+    def listener(snapshot: Dict[str, Any]) -> None:
+        parts = [f"{name}={summary['p50_ms']:.2f}/{summary['p95_ms']:.2f}ms" for name, summary in sorted(snapshot["durations"].items())]
+        parts.extend(f"{name}={rate:.0f}/s" for name, rate in sorted(snapshot["rates"].items()))
+        parts.extend(f"{name}={value}" for name, value in sorted(snapshot["gauges"].items()))
+        logger.log(level, "perf %s", " ".join(parts))
+
+    return listener
@@ -1,9 +1,11 @@
 import math
+from collections import OrderedDict, deque
 from typing import Dict, Optional
 
-from PyQt5.QtCore import Qt, QRectF, QPointF, QEvent
-from PyQt5.QtGui import QColor, QBrush, QPen, QPainter, QFont, QPalette, QFontMetricsF
+from PyQt5.QtCore import Qt, QRectF, QPointF, QEvent, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QBrush, QPen, QPainter, QPixmap, QFont, QPalette, QFontMetricsF, QTransform
 from PyQt5.QtWidgets import (
+    QGraphicsItem,
     QGraphicsView,
     QGraphicsScene,
     QGraphicsRectItem,
@@ -13,12 +15,27 @@ from PyQt5.QtWidgets import (
     QFrame,
 )
 
-from .state_model import StateTimelineModel, Event
-from ..utils.color_map import state_color, CURRENT_OUTLINE, is_alarm_state
+from .state_model import CHANGE_APPENDED, CHANGE_INSERTED, StateTimelineModel, Event
+from .ingest import IngestBuffer
+from .reorder import ReorderBuffer
+from .runs import MAX_RUN_SCAN, compute_runs
+from .update_scheduler import UpdateScheduler
+from .perf import PerfMonitor
+from ..utils.color_map import CURRENT_OUTLINE, ALARM_OUTLINE
+from ..utils.style_table import StyleTable, shared_style_table
 from ..utils.time_utils import format_timestamp, format_duration
 
 
 class PhaseFlow(QGraphicsView):
+    model_changed = pyqtSignal(object)
+    style_table_changed = pyqtSignal(object)
+
+    _TILE_WIDTH = 512
+    _TILE_BAND = 24
+    _TILE_LABEL_OVERHANG = 200
+    _MAX_TILES = 48
+    _MAX_TICK_LABELS = 4096
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._scene = QGraphicsScene(self)
@@ -34,9 +51,8 @@ class PhaseFlow(QGraphicsView):
         self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
 
         self.model = StateTimelineModel()
-        self.color_map: Dict[str, str] = {}
         self.state_order: Optional[list] = None
-        self.alarm_keywords = ["ALARM", "FAULT", "ERROR"]
+        self._styles = None
 
         self._row_height = 36
         self._lane_margin = 14
@@ -54,14 +70,42 @@ class PhaseFlow(QGraphicsView):
         # disable auto follow-tail by default to keep left Y-axis and labels always visible
         self._follow_tail = False
         self._window_duration = 12.0
+        self._render_mode = "items"
+        self._layout_dirty = False
+        self._scroll_to_end = False
+        self._known_state_count = 0
+        self._scheduler = None
+        self._ingest_buffer = None
+        self._ingest_batch = None
+        self._ingest_timer = QTimer(self)
+        self._ingest_timer.timeout.connect(self._drain_ingest)
+        self._reorder = None
+        self._reorder_timer = QTimer(self)
+        self._reorder_timer.setSingleShot(True)
+        self._reorder_timer.timeout.connect(self._poll_reorder)
+        self._perf = None
+        self._perf_overlay = False
+        self._label_items = []
+        self._hover_pos = None
+        self._hover_key = None
+        self._hover_timer = QTimer(self)
+        self._hover_timer.setSingleShot(True)
+        self._hover_timer.timeout.connect(self._update_hover)
 
-        self._items = []
+        self._items = deque()
+        self._highlighted = -1
+        self._current_pen = self._cosmetic_pen(QColor(CURRENT_OUTLINE), 2)
+        self._evicted_seen = 0
+        self._segment_layer = None
         self._state_labels = []
         self._background = None
         self._grid_color = None
         self._text_color = None
         self._axis_color = None
         self._label_font = QFont("Consolas", 9)
+        self._tiles = OrderedDict()
+        self._tile_key = None
+        self._tick_labels = {}
         self._tick_font = QFont("Consolas", 8)
 
         self.setMouseTracking(True)
@@ -69,37 +113,281 @@ class PhaseFlow(QGraphicsView):
         self.setMinimumHeight(180)
         self.setObjectName("psvPhaseFlow")
         self._update_palette()
+        self._reset_scene()
+        self.set_update_scheduler(UpdateScheduler(parent=self))
+        self.set_style_table(shared_style_table())
+        self.model.add_listener(self._on_model_changed)
 
     def clear(self):
+        if self._reorder is not None:
+            self._reorder_timer.stop()
+            self._reorder.clear()
         self.model.clear()
-        self._scene.clear()
-        self._items.clear()
+        self._reset_scene()
         self._state_labels.clear()
+        self._known_state_count = 0
         self._current_index = -1
         self._base_time = None
         self._current_time = None
+        self._hover_key = None
 
     def append_event(self, timestamp: float, state_id: str, extra: Optional[dict] = None):
-        event = self.model.append_event(timestamp, state_id, extra=extra)
+        # with a reorder tolerance the event is held back and None is returned
+        if self._reorder is not None:
+            self._reorder.push(timestamp, state_id, extra)
+            self._arm_reorder_timer()
+            event = None
+        else:
+            event = self.model.append_event(timestamp, state_id, extra=extra)
+        if self._perf is not None:
+            self._perf.add_count("events")
+        return event
+
+    def append_events(self, events=None, timestamps=None, state_ids=None, extras=None) -> int:
+        if self._reorder is not None:
+            held = len(self._reorder)
+            released = self._reorder.push_many(events, timestamps=timestamps, state_ids=state_ids, extras=extras)
+            count = len(self._reorder) - held + released
+            self._arm_reorder_timer()
+        else:
+            count = self.model.append_events(events, timestamps=timestamps, state_ids=state_ids, extras=extras)
+        if self._perf is not None:
+            self._perf.add_count("events", count)
+        return count
+
+    def set_reorder_tolerance(self, seconds: Optional[float], max_hold: Optional[float] = None):
+        # events are held until one this much newer arrives, so late ones are committed in order;
+        # if the source goes quiet they are committed after max_hold wall-clock seconds (the
+        # tolerance by default). None or 0 commits whatever is held and appends directly again
+        if seconds:
+            if self._reorder is None:
+                self._reorder = ReorderBuffer(self.model, seconds, max_hold)
+            else:
+                self._reorder.set_max_hold(max_hold)
+                self._reorder.set_tolerance(seconds)
+            self._arm_reorder_timer()
+        elif self._reorder is not None:
+            self._reorder_timer.stop()
+            self._reorder.flush()
+            self._reorder = None
+
+    def _arm_reorder_timer(self):
+        remaining = self._reorder.hold_remaining()
+        if remaining is None:
+            self._reorder_timer.stop()
+        elif not self._reorder_timer.isActive():
+            self._reorder_timer.start(int(remaining * 1000.0) + 1)
+
+    def _poll_reorder(self):
+        if self._reorder is None:
+            return
+        self._reorder.poll()
+        # a newer event pushed the deadline back while the timer ran
+        self._arm_reorder_timer()
+
+    @property
+    def reorder_tolerance(self) -> float:
+        return self._reorder.tolerance if self._reorder is not None else 0.0
+
+    @property
+    def reorder_buffer(self) -> Optional[ReorderBuffer]:
+        return self._reorder
+
+    def _on_model_changed(self, kind: str, start: int, count: int):
+        if kind == CHANGE_APPENDED:
+            timestamp_at = self.model.timestamp_at
+            self._note_appended(timestamp_at(start), timestamp_at(start + count - 1))
+        elif kind == CHANGE_INSERTED:
+            self._note_inserted(start, count)
+
+    def _note_appended(self, first_time: float, last_time: float):
         if self._base_time is None:
-            self._base_time = timestamp
-        self._last_time = max(self._last_time, timestamp)
+            self._base_time = first_time
+        self._last_time = max(self._last_time, last_time)
         self._current_time = self._last_time
-        self._refresh_states()
-        self._draw_axes()
-        self._append_item(len(self.model.events) - 1, event)
+        self._scroll_to_end = True
+        self._schedule_layout()
+
+    def _note_inserted(self, start: int, count: int):
+        # a late event splits one segment: only it and its new neighbour are redrawn
+        self._hover_key = None
+        if self.model.state_count() != self._known_state_count:
+            # a new lane changes the axes; the next layout pass redraws everything
+            self._schedule_layout()
+        if self._render_mode != "items":
+            if self._current_index >= start:
+                self._current_index += count
+            self._update_inserted_region(start, count)
+            return
+        self._release_evicted()
+        if self._current_index >= start:
+            self._current_index += count
+        evicted = self.model.evicted_count
+        if self._highlighted >= evicted + start:
+            self._highlighted += count
+        items = self._items
+        if start >= len(items):
+            # not laid out yet; the next layout pass appends it like any other event
+            return
+        timestamp_at = self.model.timestamp_at
+        for index in range(start, start + count):
+            items.insert(index, self._create_item(self.model.get_event(index), timestamp_at(index + 1)))
+        if start > 0:
+            self._stretch_item(items[start - 1], timestamp_at(start))
+
+    def _update_inserted_region(self, start: int, count: int):
+        timestamp_at = self.model.timestamp_at
+        first_time = timestamp_at(max(0, start - 1))
+        stop = start + count
+        if stop < self.model.event_count():
+            last_time = timestamp_at(stop)
+        else:
+            last_time = self._current_time if self._current_time is not None else self._last_time
+        left = self._left_padding + first_time * self._time_scale
+        right = self._left_padding + last_time * self._time_scale
+        bottom = self._top_padding + max(1, len(self._state_labels)) * self._row_height
+        area = self.mapFromScene(QRectF(left, self._top_padding, right - left, bottom - self._top_padding)).boundingRect()
+        self.viewport().update(area.adjusted(-3, -3, 3, 3))
+
+    def set_retention(self, max_events: Optional[int] = None, max_age: Optional[float] = None):
+        self.model.set_retention(max_events=max_events, max_age=max_age)
+        self._schedule_layout()
+
+    def set_update_scheduler(self, scheduler: UpdateScheduler):
+        if self._scheduler is not None:
+            self._scheduler.frame.disconnect(self._flush_layout)
+        self._scheduler = scheduler
+        scheduler.frame.connect(self._flush_layout)
+
+    @property
+    def update_scheduler(self) -> UpdateScheduler:
+        return self._scheduler
+
+    def set_max_refresh_rate(self, fps: float):
+        self._scheduler.set_max_fps(fps)
+        if self._ingest_timer.isActive():
+            self._ingest_timer.start(int(1000.0 / self._scheduler.max_fps))
+
+    def attach_ingest_buffer(self, buffer: IngestBuffer, max_batch: Optional[int] = None):
+        self._ingest_buffer = buffer
+        self._ingest_batch = max_batch
+        self._ingest_timer.start(int(1000.0 / self._scheduler.max_fps))
+
+    def detach_ingest_buffer(self):
+        self._ingest_timer.stop()
+        self._drain_ingest()
+        self._ingest_buffer = None
+        if self._reorder is not None:
+            # nothing newer will come to release what is still held
+            self._reorder.flush()
+
+    @property
+    def ingest_buffer(self) -> Optional[IngestBuffer]:
+        return self._ingest_buffer
+
+    def _drain_ingest(self):
+        if self._ingest_buffer is None or not len(self._ingest_buffer):
+            return
+        batch = self._ingest_buffer.drain(self._ingest_batch)
+        if batch:
+            self.append_events(batch)
+
+    def flush(self):
+        self._flush_layout()
+
+    def _schedule_layout(self):
+        self._layout_dirty = True
+        self._scheduler.request()
+
+    def _flush_layout(self):
+        if not self._layout_dirty:
+            return
+        perf = self._perf
+        if perf is None:
+            self._layout_pass()
+            return
+        started = perf.clock()
+        self._layout_pass()
+        perf.add_duration("layout", perf.clock() - started)
+        self._update_perf_gauges()
+
+    def _layout_pass(self):
+        self._layout_dirty = False
+        lanes_moved = False
+        if self.model.state_count() != self._known_state_count:
+            previous = list(self._state_labels)
+            self._refresh_states()
+            self._draw_axes()
+            # a state sorted in before others, or dropped by retention, moves existing lanes
+            lanes_moved = self._state_labels[: len(previous)] != previous
+        self._release_evicted()
+        if self._render_mode == "items":
+            if lanes_moved:
+                self._rebuild_items()
+            else:
+                self._sync_items()
         self._update_scene_rect()
         self._apply_follow_tail()
-        self.ensureVisible(QRectF(self._scene.sceneRect().right() - 10, 0, 10, self._scene.height()))
-        return event
+        if self._scroll_to_end:
+            self._scroll_to_end = False
+            self.ensureVisible(QRectF(self._scene.sceneRect().right() - 10, 0, 10, self._scene.height()))
+        self.viewport().update()
 
     def set_current_index(self, index: int):
         self._current_index = index
         self._update_current_highlight()
 
     def set_color_map(self, color_map: Dict[str, str]):
-        self.color_map = color_map
-        self._rebuild_items()
+        self._own_styles().set_color_map(color_map)
+
+    def set_alarm_keywords(self, alarm_keywords):
+        self._own_styles().set_alarm_keywords(alarm_keywords)
+
+    @property
+    def color_map(self) -> Dict[str, str]:
+        return self._styles.color_map
+
+    @color_map.setter
+    def color_map(self, color_map: Dict[str, str]):
+        self.set_color_map(color_map)
+
+    @property
+    def alarm_keywords(self):
+        return self._styles.alarm_keywords
+
+    @alarm_keywords.setter
+    def alarm_keywords(self, alarm_keywords):
+        self.set_alarm_keywords(alarm_keywords)
+
+    def set_style_table(self, styles: StyleTable):
+        # several widgets may share one table so colors stay consistent across a dashboard
+        if self._styles is not None:
+            self._styles.changed.disconnect(self._on_styles_changed)
+        self._styles = styles
+        styles.changed.connect(self._on_styles_changed)
+        self._on_styles_changed()
+        self.style_table_changed.emit(styles)
+
+    @property
+    def style_table(self) -> StyleTable:
+        return self._styles
+
+    def _own_styles(self) -> StyleTable:
+        # the shared default table is copied before this widget changes its colors
+        if self._styles is shared_style_table():
+            self.set_style_table(self._styles.copy(parent=self))
+        return self._styles
+
+    def _on_styles_changed(self):
+        if self._render_mode == "items":
+            # restyle in place; rebuilding the scene costs far more than swapping brushes
+            style = self._styles.style
+            state_at = self.model.state_id_at
+            for idx, item in enumerate(self._items):
+                state_style = style(state_at(idx))
+                item.setBrush(state_style.brush)
+                item.setPen(self._current_pen if idx == self._current_index else state_style.outline_pen)
+        self.viewport().update()
 
     def set_state_order(self, states):
         self.state_order = list(states) if states else None
@@ -107,10 +395,45 @@ class PhaseFlow(QGraphicsView):
         self._draw_axes()
         self._rebuild_items()
 
-    def set_time_scale(self, pixels_per_second: float):
-        self._time_scale = max(10.0, pixels_per_second)
+    def set_time_scale(self, pixels_per_second: float, anchor_x: Optional[float] = None):
+        scale = max(10.0, pixels_per_second)
+        if scale == self._time_scale:
+            return
+        if anchor_x is None:
+            anchor_x = self.viewport().width() / 2.0
+        anchor_time = (self.mapToScene(int(anchor_x), 0).x() - self._left_padding) / self._time_scale
+        self._time_scale = scale
+        self._apply_time_scale()
+        scene_x = self._left_padding + anchor_time * scale
+        self.horizontalScrollBar().setValue(int(round(scene_x - anchor_x)))
+
+    def zoom_by(self, factor: float, anchor_x: Optional[float] = None):
+        if factor > 0:
+            self.set_time_scale(self._time_scale * factor, anchor_x)
+
+    def visible_time_range(self):
+        start = (self.mapToScene(0, 0).x() - self._left_padding) / self._time_scale
+        return start, start + self.viewport().width() / self._time_scale
+
+    def scroll_to_time(self, timestamp: float, anchor_x: Optional[float] = None):
+        # puts timestamp under anchor_x, the viewport centre by default
+        if anchor_x is None:
+            anchor_x = self.viewport().width() / 2.0
+        scene_x = self._left_padding + timestamp * self._time_scale
+        self.horizontalScrollBar().setValue(int(round(scene_x - anchor_x)))
+
+    def set_render_mode(self, mode: str):
+        if mode not in ("items", "viewport"):
+            return
+        if mode == self._render_mode:
+            return
+        self._render_mode = mode
         self._rebuild_items()
 
+    @property
+    def render_mode(self):
+        return self._render_mode
+
     def set_follow_tail(self, enabled: bool):
         self._follow_tail = bool(enabled)
 
@@ -121,14 +444,7 @@ class PhaseFlow(QGraphicsView):
     def set_current_time(self, timestamp: float):
         self._current_time = max(self._last_time, timestamp)
         self._last_time = max(self._last_time, timestamp)
-        if self._items:
-            last_item = self._items[-1]
-            last_rect = last_item.rect()
-            end_x = self._left_padding + self._current_time * self._time_scale
-            last_item.setRect(QRectF(last_rect.left(), last_rect.top(), max(2.0, end_x - last_rect.left()), last_rect.height()))
-        self._update_scene_rect()
-        self._apply_follow_tail()
-        self.viewport().update()
+        self._schedule_layout()
 
     def set_time_label_mode(self, mode: str):
         if mode not in ("relative", "absolute", "auto"):
@@ -149,6 +465,7 @@ class PhaseFlow(QGraphicsView):
     def _refresh_states(self):
         states = self.state_order or self.model.states()
         self._state_labels = states
+        self._known_state_count = self.model.state_count()
         self._update_label_width()
 
     def _state_index(self, state_id: str) -> int:
@@ -158,41 +475,91 @@ class PhaseFlow(QGraphicsView):
         states.append(state_id)
         return states.index(state_id)
 
+    def _reset_scene(self):
+        self._scene.clear()
+        self._label_items = []
+        self._items.clear()
+        self._highlighted = -1
+        self._evicted_seen = self.model.evicted_count
+        # segment rects live in (seconds, pixels) coordinates under one parent item,
+        # so zoom and label-width changes only touch the parent's transform
+        self._segment_layer = QGraphicsRectItem()
+        self._segment_layer.setFlag(QGraphicsItem.ItemHasNoContents)
+        self._scene.addItem(self._segment_layer)
+        self._apply_time_scale()
+
+    def _apply_time_scale(self):
+        self._segment_layer.setPos(self._left_padding, 0)
+        self._segment_layer.setTransform(QTransform.fromScale(self._time_scale, 1.0))
+        self._update_scene_rect()
+        self.viewport().update()
+
     def _append_item(self, index: int, event: Event):
+        end_time = self._current_time if self._current_time is not None else self._last_time
+        self._items.append(self._create_item(event, end_time))
+        if index > 0:
+            self._stretch_item(self._items[index - 1], event.timestamp)
+
+    def _create_item(self, event: Event, end_time: float) -> QGraphicsRectItem:
         state_index = self._state_index(event.state_id)
         lane_y = self._top_padding + state_index * self._row_height
-        start_x = self._left_padding + event.timestamp * self._time_scale
-        end_time = self._current_time if self._current_time is not None else self._last_time
-        end_x = self._left_padding + end_time * self._time_scale
+        start = event.timestamp
         height = self._row_height - self._lane_margin
 
-        rect = QRectF(start_x, lane_y, max(2.0, end_x - start_x), height)
-        color = state_color(event.state_id, self.color_map, alarm_keywords=self.alarm_keywords)
-        item = QGraphicsRectItem(rect)
-        item.setBrush(QBrush(color))
-        item.setPen(QPen(Qt.NoPen))
-        item.setData(0, index)
+        rect = QRectF(start, lane_y, max(2.0 / self._time_scale, end_time - start), height)
+        style = self._styles.style(event.state_id)
+        item = QGraphicsRectItem(rect, self._segment_layer)
+        item.setBrush(style.brush)
+        item.setPen(style.outline_pen)
+        # items carry no index; it is found from the hover position, so late events
+        # never renumber the items after them
         item.setToolTip(" ")
-        self._scene.addItem(item)
-        self._items.append(item)
+        return item
 
-        if is_alarm_state(event.state_id, self.alarm_keywords):
-            item.setPen(QPen(QColor("#F5E663"), 1))
+    @staticmethod
+    def _stretch_item(item: QGraphicsRectItem, end_time: float):
+        rect = item.rect()
+        item.setRect(QRectF(rect.left(), rect.top(), end_time - rect.left(), rect.height()))
 
-        if index > 0:
-            prev_item = self._items[index - 1]
-            prev_rect = prev_item.rect()
-            prev_item.setRect(QRectF(prev_rect.left(), prev_rect.top(), start_x - prev_rect.left(), prev_rect.height()))
+    @staticmethod
+    def _cosmetic_pen(color, width):
+        pen = QPen(color, width)
+        pen.setCosmetic(True)
+        return pen
+
+    def _release_evicted(self):
+        evicted = self.model.evicted_count - self._evicted_seen
+        if evicted <= 0:
+            return
+        self._evicted_seen = self.model.evicted_count
+        if self._current_index >= 0:
+            self._current_index = self._current_index - evicted if self._current_index >= evicted else -1
+        items = self._items
+        for _ in range(min(evicted, len(items))):
+            self._scene.removeItem(items.popleft())
+
+    def _sync_items(self):
+        count = self.model.event_count()
+        for idx in range(len(self._items), count):
+            self._append_item(idx, self.model.get_event(idx))
+        if self._items:
+            last_item = self._items[-1]
+            last_rect = last_item.rect()
+            end_time = self._current_time if self._current_time is not None else self._last_time
+            width = max(2.0 / self._time_scale, end_time - last_rect.left())
+            last_item.setRect(QRectF(last_rect.left(), last_rect.top(), width, last_rect.height()))
 
     def _rebuild_items(self):
-        events = self.model.events
-        self._scene.clear()
-        self._items.clear()
+        perf = self._perf
+        started = perf.clock() if perf is not None else 0.0
+        self._reset_scene()
         self._draw_axes()
-        for idx, event in enumerate(events):
-            self._append_item(idx, event)
+        if self._render_mode == "items":
+            self._sync_items()
         self._update_current_highlight()
         self._update_scene_rect()
+        if perf is not None:
+            perf.add_duration("rebuild_items", perf.clock() - started)
 
     def _update_label_width(self):
         if not self._state_labels:
@@ -203,18 +570,30 @@ class PhaseFlow(QGraphicsView):
         width = max(metrics.horizontalAdvance(str(state)) for state in self._state_labels)
         self._label_width = max(80, int(width) + self._label_padding * 2)
         self._left_padding = self._label_width + self._label_padding
+        if self._segment_layer is not None:
+            self._segment_layer.setPos(self._left_padding, 0)
 
     def _update_current_highlight(self):
-        for idx, item in enumerate(self._items):
-            pen = QPen(Qt.NoPen)
-            if idx == self._current_index:
-                pen = QPen(QColor(CURRENT_OUTLINE), 2)
-            item.setPen(pen)
+        if self._render_mode != "items":
+            self.viewport().update()
+            return
+        # only the previously and newly highlighted items change; the rest keep their style pen
+        evicted = self.model.evicted_count
+        previous = self._highlighted - evicted
+        if 0 <= previous < len(self._items):
+            self._items[previous].setPen(self._styles.style(self.model.state_id_at(previous)).outline_pen)
+        self._highlighted = -1
+        if 0 <= self._current_index < len(self._items):
+            self._items[self._current_index].setPen(self._current_pen)
+            self._highlighted = evicted + self._current_index
 
     def _draw_axes(self):
-        for label_item in self._scene.items():
-            if isinstance(label_item, QGraphicsSimpleTextItem):
-                self._scene.removeItem(label_item)
+        perf = self._perf
+        started = perf.clock() if perf is not None else 0.0
+        # tracked explicitly; scanning scene.items() is O(segments) in items mode
+        for label_item in self._label_items:
+            self._scene.removeItem(label_item)
+        self._label_items = []
 
         for idx, state in enumerate(self._state_labels):
             y = self._top_padding + idx * self._row_height
@@ -223,6 +602,9 @@ class PhaseFlow(QGraphicsView):
             text_item.setBrush(QBrush(self._text_color))
             text_item.setPos(self._label_padding, y)
             self._scene.addItem(text_item)
+            self._label_items.append(text_item)
+        if perf is not None:
+            perf.add_duration("draw_axes", perf.clock() - started)
 
     def _update_scene_rect(self):
         height = self._top_padding + max(1, len(self._state_labels)) * self._row_height + self._axis_height + 20
@@ -233,86 +615,225 @@ class PhaseFlow(QGraphicsView):
 
     def wheelEvent(self, event):
         if event.modifiers() & Qt.ControlModifier:
-            if event.angleDelta().y() > 0:
-                self.zoom_in()
-            else:
-                self.zoom_out()
+            delta = event.angleDelta().y()
+            if delta:
+                # fractional notches from high-resolution wheels/touchpads zoom proportionally
+                self.zoom_by(1.25 ** (delta / 120.0), anchor_x=event.pos().x())
             event.accept()
             return
         super().wheelEvent(event)
 
     def mouseMoveEvent(self, event):
-        pos = self.mapToScene(event.pos())
-        item = self._scene.itemAt(pos, self.transform())
-        if isinstance(item, QGraphicsRectItem):
-            index = item.data(0)
-            event_info = self.model.get_event(index)
-            if event_info:
-                duration = None
-                if index + 1 < self.model.event_count():
-                    duration = self.model.events[index + 1].timestamp - event_info.timestamp
-                tooltip = (
-                    f"State: {event_info.state_id}\n"
-                    f"Time: {format_timestamp(event_info.timestamp, mode=self._time_label_mode, base_time=self._base_time)}\n"
-                    f"Duration: {format_duration(duration)}\n"
-                    f"Extra: {event_info.extra}"
-                )
-                QToolTip.showText(event.globalPos(), tooltip, self)
+        # hover hit-testing runs at most once per frame, on the latest pointer position
+        self._hover_pos = (event.pos(), event.globalPos())
+        if not self._hover_timer.isActive():
+            self._hover_timer.start(int(1000.0 / self._scheduler.max_fps))
         super().mouseMoveEvent(event)
 
+    def leaveEvent(self, event):
+        self._hover_timer.stop()
+        self._hover_pos = None
+        self._hover_key = None
+        super().leaveEvent(event)
+
+    def _update_hover(self):
+        if self._hover_pos is None:
+            return
+        view_pos, global_pos = self._hover_pos
+        index = self._event_index_at(self.mapToScene(view_pos))
+        if index < 0:
+            if self._hover_key is not None:
+                self._hover_key = None
+                QToolTip.hideText()
+            return
+        # the tooltip of the last event changes once its successor arrives
+        key = (self.model.evicted_count + index, index + 1 < self.model.event_count())
+        if key == self._hover_key:
+            return
+        self._hover_key = key
+        tooltip = self._tooltip_for_index(index)
+        if tooltip:
+            QToolTip.showText(global_pos, tooltip, self)
+
+    def _event_index_at(self, pos) -> int:
+        if not self.model.event_count() or pos.x() < self._left_padding:
+            return -1
+        offset_y = pos.y() - self._top_padding
+        lane = int(offset_y // self._row_height)
+        if lane < 0 or lane >= len(self._state_labels):
+            return -1
+        if offset_y - lane * self._row_height > self._row_height - self._lane_margin:
+            return -1
+        timestamp = (pos.x() - self._left_padding) / self._time_scale
+        end_time = self._current_time if self._current_time is not None else self._last_time
+        if timestamp > end_time:
+            return -1
+        index = self.model.index_for_time(timestamp)
+        if self.model.timestamp_at(index) > timestamp:
+            return -1
+        lane_state = self._state_labels[lane]
+        if self.model.state_id_at(index) == lane_state:
+            return index
+        # segments narrower than a pixel are drawn at least 2px wide; find the nearest one in this lane
+        store = self.model.store
+        tolerance = 2.0 / self._time_scale
+        first = store.bisect_left(timestamp - tolerance)
+        stop = min(store.bisect_right(timestamp + tolerance, first), first + MAX_RUN_SCAN)
+        best = -1
+        best_distance = tolerance
+        for idx in range(first, stop):
+            if store.state_id(idx) != lane_state:
+                continue
+            distance = abs(store.timestamp(idx) - timestamp)
+            if distance <= best_distance:
+                best = idx
+                best_distance = distance
+        return best
+
+    def _tooltip_for_index(self, index: int) -> Optional[str]:
+        event_info = self.model.get_event(index)
+        if not event_info:
+            return None
+        duration = None
+        if index + 1 < self.model.event_count():
+            duration = self.model.timestamp_at(index + 1) - event_info.timestamp
+        return (
+            f"State: {event_info.state_id}\n"
+            f"Time: {format_timestamp(event_info.timestamp, mode=self._time_label_mode, base_time=self._base_time)}\n"
+            f"Duration: {format_duration(duration)}\n"
+            f"Extra: {self.model.extra_text(index)}"
+        )
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self._update_scene_rect()
 
     def set_model(self, model: StateTimelineModel):
+        if self._reorder is not None:
+            self._reorder.flush()
+            self._reorder = ReorderBuffer(model, self._reorder.tolerance, self._reorder.max_hold)
+        self.model.remove_listener(self._on_model_changed)
         self.model = model
+        model.add_listener(self._on_model_changed)
+        self._hover_key = None
+        count = model.event_count()
+        if count:
+            self._base_time = model.timestamp_at(0)
+            self._last_time = model.timestamp_at(count - 1)
+            self._current_time = self._last_time
         self._refresh_states()
         self._draw_axes()
         self._rebuild_items()
+        self.model_changed.emit(model)
 
     def _draw_background(self, painter, rect):
         painter.fillRect(rect, self._background)
+        axis_y = self._top_padding + max(1, len(self._state_labels)) * self._row_height + 6
+
+        # lane grid, axis and tick labels only change with the layout; they are rendered
+        # once per scene-aligned tile, so scrolling only paints tiles that become exposed
+        key = self._background_key(axis_y)
+        if key != self._tile_key:
+            self._tile_key = key
+            self._tiles.clear()
+            self._tick_labels.clear()
+        band_height = axis_y + self._TILE_BAND
+        tile_width = self._TILE_WIDTH
+        first = max(0, int(math.floor(rect.left() / tile_width)))
+        last = int(math.floor(rect.right() / tile_width))
+        if rect.top() < band_height:
+            for tile_index in range(first, last + 1):
+                pixmap = self._tiles.get(tile_index)
+                if pixmap is None:
+                    pixmap = self._render_tile(tile_index, axis_y, band_height)
+                    if len(self._tiles) >= self._MAX_TILES:
+                        self._tiles.popitem(last=False)
+                    self._tiles[tile_index] = pixmap
+                else:
+                    self._tiles.move_to_end(tile_index)
+                painter.drawPixmap(QPointF(tile_index * tile_width, 0.0), pixmap)
+
+        if self._current_time is not None:
+            current_x = self._left_padding + self._current_time * self._time_scale
+            marker_pen = QPen(self._axis_color)
+            marker_pen.setWidthF(1.4)
+            painter.setPen(marker_pen)
+            painter.drawLine(QPointF(current_x, self._top_padding), QPointF(current_x, axis_y))
+
+    def _background_key(self, axis_y):
+        return (
+            self._time_scale,
+            self._left_padding,
+            axis_y,
+            len(self._state_labels),
+            self._time_label_mode,
+            self._base_time,
+            self._background.rgba(),
+            self._grid_color.rgba(),
+            self._axis_color.rgba(),
+            self.devicePixelRatioF(),
+        )
+
+    def _render_tile(self, tile_index, axis_y, band_height):
+        tile_width = self._TILE_WIDTH
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(math.ceil(tile_width * ratio)), int(math.ceil(band_height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(self._background)
+        left = tile_index * tile_width
+        right = left + tile_width
+
+        tile_painter = QPainter(pixmap)
+        tile_painter.setRenderHints(self.renderHints())
+        tile_painter.translate(-left, 0.0)
 
         # subtle horizontal lane separators
+        line_left = max(left, self._left_padding)
         grid_pen = QPen(self._grid_color)
         grid_pen.setWidthF(0.0)
-        painter.setPen(grid_pen)
-        for idx, _ in enumerate(self._state_labels):
-            y = self._top_padding + idx * self._row_height
-            lane_y = y + self._row_height - self._lane_margin
-            painter.drawLine(QPointF(self._left_padding, lane_y), QPointF(rect.right(), lane_y))
+        if line_left < right:
+            tile_painter.setPen(grid_pen)
+            for idx, _ in enumerate(self._state_labels):
+                y = self._top_padding + idx * self._row_height
+                lane_y = y + self._row_height - self._lane_margin
+                tile_painter.drawLine(QPointF(line_left, lane_y), QPointF(right, lane_y))
 
-        axis_y = self._top_padding + max(1, len(self._state_labels)) * self._row_height + 6
         axis_pen = QPen(self._axis_color)
         axis_pen.setWidthF(1.2)
-        painter.setPen(axis_pen)
-        painter.drawLine(QPointF(self._left_padding, axis_y), QPointF(rect.right(), axis_y))
+        if line_left < right:
+            tile_painter.setPen(axis_pen)
+            tile_painter.drawLine(QPointF(line_left, axis_y), QPointF(right, axis_y))
 
+        # labels are drawn right of their tick and may start in the previous tile
         tick_step = self._time_tick_step()
-        start_time = max(0.0, (rect.left() - self._left_padding) / self._time_scale)
-        end_time = (rect.right() - self._left_padding) / self._time_scale
-        tick = math.floor(start_time / tick_step) * tick_step
-        painter.setFont(self._tick_font)
-        while tick <= end_time:
+        start_time = max(0.0, (left - self._TILE_LABEL_OVERHANG - self._left_padding) / self._time_scale)
+        end_time = (right - self._left_padding) / self._time_scale
+        tile_painter.setFont(self._tick_font)
+        for tick_number in range(int(math.floor(start_time / tick_step)), int(math.floor(end_time / tick_step)) + 1):
+            tick = tick_number * tick_step
+            if tick < 0.0:
+                continue
             x = self._left_padding + tick * self._time_scale
-            painter.setPen(grid_pen)
-            painter.drawLine(QPointF(x, self._top_padding), QPointF(x, axis_y))
-            painter.setPen(axis_pen)
-            painter.drawLine(QPointF(x, axis_y), QPointF(x, axis_y + 6))
+            tile_painter.setPen(grid_pen)
+            tile_painter.drawLine(QPointF(x, self._top_padding), QPointF(x, axis_y))
+            tile_painter.setPen(axis_pen)
+            tile_painter.drawLine(QPointF(x, axis_y), QPointF(x, axis_y + 6))
+            tile_painter.drawText(QPointF(x + 2, axis_y + 18), self._tick_label(tick_number, tick))
+        tile_painter.end()
+        return pixmap
+
+    def _tick_label(self, tick_number, tick):
+        label = self._tick_labels.get(tick_number)
+        if label is None:
             label = format_timestamp(
                 (self._base_time or 0.0) + tick,
                 mode=self._time_label_mode,
                 base_time=self._base_time,
             )
-            painter.drawText(QPointF(x + 2, axis_y + 18), label)
-            tick += tick_step
-
-        if self._current_time is not None:
-            current_x = self._left_padding + self._current_time * self._time_scale
-            marker_pen = QPen(self._axis_color)
-            marker_pen.setWidthF(1.4)
-            painter.setPen(marker_pen)
-            painter.drawLine(QPointF(current_x, self._top_padding), QPointF(current_x, axis_y))
+            if len(self._tick_labels) >= self._MAX_TICK_LABELS:
+                self._tick_labels.clear()
+            self._tick_labels[tick_number] = label
+        return label
 
     def _apply_follow_tail(self):
         if not self._follow_tail or self._current_time is None:
@@ -362,6 +883,142 @@ class PhaseFlow(QGraphicsView):
                 return step
         return steps[-1]
 
+    def _draw_runs(self, painter, rect):
+        if not self.model.event_count():
+            return
+        scale = self._time_scale
+        left = max(rect.left(), self._left_padding)
+        end_of_data = self._current_time if self._current_time is not None else self._last_time
+        runs = compute_runs(
+            self.model,
+            (left - self._left_padding) / scale,
+            (rect.right() - self._left_padding) / scale,
+            1.0 / scale,
+            end_of_data,
+        )
+        if not runs:
+            return
+        lanes = {state: idx for idx, state in enumerate(self._state_labels)}
+        styles = self._styles
+        height = self._row_height - self._lane_margin
+        alarm_pen = QPen(QColor(ALARM_OUTLINE), 1)
+        current_pen = QPen(QColor(CURRENT_OUTLINE), 2)
+        marker_pen = QPen(self._text_color)
+        metrics = QFontMetricsF(self._tick_font)
+
+        painter.save()
+        painter.setClipRect(QRectF(left, rect.top(), rect.right() - left, rect.height()))
+        painter.setFont(self._tick_font)
+        for run in runs:
+            lane = lanes.get(run.state_id)
+            if lane is None:
+                lane = self._state_index(run.state_id)
+                lanes[run.state_id] = lane
+            style = styles.style(run.state_id)
+            color = style.color
+            lane_y = self._top_padding + lane * self._row_height
+            x = self._left_padding + run.start_time * scale
+            width = max(1.0, (run.end_time - run.start_time) * scale)
+            run_rect = QRectF(x, lane_y, width, height)
+            if run.transitions:
+                # merged sub-pixel segments: translucent fill plus a marker bar and count
+                merged = QColor(color)
+                merged.setAlpha(150)
+                painter.fillRect(run_rect, merged)
+                painter.fillRect(QRectF(x, lane_y, width, 2.0), self._text_color)
+                label = str(run.transitions)
+                if metrics.horizontalAdvance(label) + 4 <= width:
+                    painter.setPen(marker_pen)
+                    painter.drawText(run_rect, Qt.AlignCenter, label)
+                continue
+            painter.fillRect(run_rect, color)
+            if run.first_index == self._current_index:
+                painter.setPen(current_pen)
+                painter.drawRect(run_rect)
+            elif style.alarm:
+                painter.setPen(alarm_pen)
+                painter.drawRect(run_rect)
+        painter.restore()
+
     def drawBackground(self, painter, rect):
         super().drawBackground(painter, rect)
         self._draw_background(painter, rect)
+
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        if self._render_mode == "viewport":
+            self._draw_runs(painter, rect)
+        if self._perf_overlay and self._perf is not None:
+            self._draw_perf_overlay(painter)
+
+    def paintEvent(self, event):
+        perf = self._perf
+        if perf is None:
+            super().paintEvent(event)
+            return
+        started = perf.clock()
+        super().paintEvent(event)
+        perf.add_duration("paint", perf.clock() - started)
+        perf.maybe_report()
+
+    def set_perf_monitor(self, monitor: Optional[PerfMonitor]):
+        # None removes all instrumentation; hot paths then cost one attribute check
+        self._perf = monitor
+        if monitor is None:
+            self._perf_overlay = False
+        else:
+            self._update_perf_gauges()
+        self.viewport().update()
+
+    @property
+    def perf_monitor(self) -> Optional[PerfMonitor]:
+        return self._perf
+
+    def set_perf_overlay(self, enabled: bool):
+        if enabled and self._perf is None:
+            self.set_perf_monitor(PerfMonitor())
+        self._perf_overlay = bool(enabled)
+        self.viewport().update()
+
+    def _update_perf_gauges(self):
+        perf = self._perf
+        perf.set_gauge("items", len(self._items) + len(self._label_items))
+        perf.set_gauge("model_events", self.model.event_count())
+        stats = self._scheduler.stats()
+        perf.set_gauge("updates_requested", stats["requested"])
+        perf.set_gauge("updates_coalesced", stats["coalesced"])
+        if self._ingest_buffer is not None:
+            stats = self._ingest_buffer.stats()
+            perf.set_gauge("ingest_queued", stats["queued"])
+            perf.set_gauge("ingest_dropped", stats["dropped"])
+            perf.set_gauge("ingest_pending", stats["pending"])
+
+    def _draw_perf_overlay(self, painter):
+        perf = self._perf
+        lines = []
+        for name in ("paint", "layout", "rebuild_items", "draw_axes"):
+            summary = perf.duration(name)
+            if summary is not None:
+                lines.append(f"{name:<13} p50 {summary['p50_ms']:6.2f}  p95 {summary['p95_ms']:6.2f}  max {summary['max_ms']:7.2f} ms")
+        lines.append(f"events/s      {perf.rate('events'):10.0f}")
+        lines.append(f"items         {perf.gauge('items', 0):10d}")
+        lines.append(f"updates       {perf.gauge('updates_requested', 0)} req / {perf.gauge('updates_coalesced', 0)} coalesced")
+        if perf.gauge("ingest_queued") is not None:
+            lines.append(f"ingest        {perf.gauge('ingest_queued')} queued / {perf.gauge('ingest_dropped')} dropped")
+
+        painter.save()
+        painter.resetTransform()
+        painter.setFont(self._tick_font)
+        metrics = QFontMetricsF(self._tick_font)
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 12
+        height = metrics.lineSpacing() * len(lines) + 8
+        box = QRectF(self.viewport().width() - width - 6, 6, width, height)
+        shade = QColor(self._background)
+        shade.setAlpha(220)
+        painter.fillRect(box, shade)
+        painter.setPen(self._text_color)
+        y = box.top() + 4 + metrics.ascent()
+        for line in lines:
+            painter.drawText(QPointF(box.left() + 6, y), line)
+            y += metrics.lineSpacing()
+        painter.restore()
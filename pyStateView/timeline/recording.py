@@ -0,0 +1,481 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .event_store import Event, ColumnarEventStore, _EMPTY_EXTRA, _TimestampColumn
+from .state_model import CHANGE_APPENDED, CHANGE_INSERTED, StateTimelineModel, _split_events
+
+
+# File layout (little endian):
+#   header      MAGIC, version, timestamp typecode, footer offset, event count
+#   chunk*      chunk header, timestamps[count], state codes[count] (uint32),
+#               JSON list of states first seen in this chunk, JSON {offset: extra}
+#   footer      chunk index (offset, first index, count, first/last timestamp)
+#               followed by the JSON state table
+# The footer offset stays 0 until the writer is closed; readers then rebuild the
+# index by scanning chunk headers, so an interrupted recording is still readable.
+MAGIC = b"PSVREC\x00\x01"
+FOOTER_MAGIC = b"PSVIDX\x00\x01"
+VERSION = 1
+_HEADER = struct.Struct("<8sHcxIQQ")
+_CHUNK_HEADER = struct.Struct("<4sIddII")
+_CHUNK_MAGIC = b"CHNK"
+_FOOTER_HEADER = struct.Struct("<8sQQ")
+_INDEX_ENTRY = struct.Struct("<QQIxxxxdd")
+_HEADER_FOOTER_OFFSET = 16
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def _to_file_bytes(column: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+class RecordingWriter:
+    def __init__(self, path, chunk_size: int = 65536, timestamp_type: str = "d"):
+        if timestamp_type not in ("d", "q"):
+            raise ValueError("timestamp_type must be 'd' (float64) or 'q' (int64)")
+        self._path = path
+        self._chunk_size = max(1, chunk_size)
+        self._timestamp_type = timestamp_type
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, timestamp_type.encode(), 0, 0, 0))
+        self._codes_of: Dict[Any, int] = {}
+        self._state_table: List[Any] = []
+        self._new_states: List[Any] = []
+        self._timestamps = array(timestamp_type)
+        self._codes = array("I")
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._index = []
+        self._count = 0
+        self._late_dropped = 0
+        self._model = None
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def late_events_dropped(self) -> int:
+        # late events older than a chunk already on disk; chunks are never rewritten
+        return self._late_dropped
+
+    @property
+    def event_count(self) -> int:
+        return self._count + len(self._timestamps)
+
+    def _code(self, state_id) -> int:
+        code = self._codes_of.get(state_id)
+        if code is None:
+            code = self._codes_of[state_id] = len(self._state_table)
+            self._state_table.append(state_id)
+            self._new_states.append(state_id)
+        return code
+
+    def append(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        code = self._code(state_id)
+        if extra:
+            # schema-backed extras are read-only views; the chunk needs a plain dict for JSON
+            self._extras[len(self._timestamps)] = extra if type(extra) is dict else dict(extra)
+        self._timestamps.append(timestamp)
+        self._codes.append(code)
+        if len(self._timestamps) >= self._chunk_size:
+            self._write_chunk()
+
+    def insert(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> bool:
+        # a late event goes into the pending chunk at its place in time
+        if self._index and timestamp < self._index[-1][4]:
+            self._late_dropped += 1
+            return False
+        position = bisect_right(self._timestamps, timestamp)
+        if position == len(self._timestamps):
+            self.append(timestamp, state_id, extra)
+            return True
+        code = self._code(state_id)
+        if self._extras:
+            self._extras = {key + (key >= position): value for key, value in self._extras.items()}
+        if extra:
+            self._extras[position] = extra if type(extra) is dict else dict(extra)
+        self._timestamps.insert(position, timestamp)
+        self._codes.insert(position, code)
+        if len(self._timestamps) >= self._chunk_size:
+            self._write_chunk()
+        return True
+
+    def append_events(self, events=None, timestamps=None, state_ids=None, extras=None) -> int:
+        if events is not None:
+            timestamps, state_ids, extras = _split_events(events)
+        if extras is None:
+            extras = [None] * len(timestamps)
+        count = 0
+        for timestamp, state_id, extra in zip(timestamps, state_ids, extras):
+            self.append(timestamp, state_id, extra)
+            count += 1
+        return count
+
+    def _write_chunk(self) -> None:
+        count = len(self._timestamps)
+        if not count:
+            return
+        handle = self._file
+        offset = handle.tell()
+        states_blob = json.dumps(self._new_states).encode("utf-8")
+        extras_blob = json.dumps({str(k): v for k, v in self._extras.items()}, default=str).encode("utf-8")
+        handle.write(
+            _CHUNK_HEADER.pack(
+                _CHUNK_MAGIC, count, self._timestamps[0], self._timestamps[-1], len(states_blob), len(extras_blob)
+            )
+        )
+        handle.write(_to_file_bytes(self._timestamps))
+        codes = _to_file_bytes(self._codes)
+        handle.write(codes)
+        handle.write(b"\x00" * _padding(len(codes)))
+        handle.write(states_blob)
+        handle.write(extras_blob)
+        handle.write(b"\x00" * _padding(len(states_blob) + len(extras_blob)))
+        self._index.append((offset, self._count, count, self._timestamps[0], self._timestamps[-1]))
+        self._count += count
+        self._timestamps = array(self._timestamp_type)
+        self._codes = array("I")
+        self._extras = {}
+        self._new_states = []
+
+    def flush(self) -> None:
+        self._write_chunk()
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.detach()
+        self._write_chunk()
+        handle = self._file
+        footer_offset = handle.tell()
+        handle.write(_FOOTER_HEADER.pack(FOOTER_MAGIC, len(self._index), self._count))
+        for entry in self._index:
+            handle.write(_INDEX_ENTRY.pack(*entry))
+        handle.write(json.dumps(self._state_table).encode("utf-8"))
+        handle.seek(_HEADER_FOOTER_OFFSET)
+        handle.write(struct.pack("<QQ", footer_offset, self._count))
+        handle.close()
+
+    def attach(self, model: StateTimelineModel) -> None:
+        self.detach()
+        self._model = model
+        model.add_listener(self._on_model_changed)
+
+    def detach(self) -> None:
+        if self._model is not None:
+            self._model.remove_listener(self._on_model_changed)
+            self._model = None
+
+    def _on_model_changed(self, kind, start, count):
+        if kind == CHANGE_APPENDED:
+            write = self.append
+        elif kind == CHANGE_INSERTED:
+            write = self.insert
+        else:
+            return
+        store = self._model.store
+        for index in range(start, start + count):
+            write(store.timestamp(index), store.state_id(index), store.extra(index))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class MappedEventStore:
+    def __init__(self, path, extras_cache: int = 8):
+        self._path = path
+        self._handle = open(path, "rb")
+        size = os.fstat(self._handle.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError(f"{path}: not a pyStateView recording")
+        self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, typecode, _, footer_offset, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a pyStateView recording")
+        self._timestamp_type = typecode.decode()
+        self._state_table: List[Any] = []
+        self._chunk_offsets = array("Q")
+        self._chunk_starts = array("q")
+        self._chunk_counts = array("I")
+        self._chunk_first = array("d")
+        self._chunk_last = array("d")
+        if footer_offset:
+            self._read_footer(footer_offset)
+        else:
+            self._scan_chunks(size)
+        self._total = (self._chunk_starts[-1] + self._chunk_counts[-1]) if len(self._chunk_starts) else 0
+        self._head = 0
+        self._columns: Dict[int, Any] = {}
+        self._extras_cache: "OrderedDict[int, Dict[int, Dict[str, Any]]]" = OrderedDict()
+        self._extras_cache_size = max(1, extras_cache)
+        self._last_chunk = 0
+        self.timestamps = _TimestampColumn(self)
+
+    def _add_chunk(self, offset, first_index, count, first_time, last_time):
+        self._chunk_offsets.append(offset)
+        self._chunk_starts.append(first_index)
+        self._chunk_counts.append(count)
+        self._chunk_first.append(first_time)
+        self._chunk_last.append(last_time)
+
+    def _read_footer(self, offset):
+        magic, chunk_count, _ = _FOOTER_HEADER.unpack_from(self._map, offset)
+        if magic != FOOTER_MAGIC:
+            raise ValueError(f"{self._path}: corrupt recording footer")
+        position = offset + _FOOTER_HEADER.size
+        for _ in range(chunk_count):
+            self._add_chunk(*_INDEX_ENTRY.unpack_from(self._map, position))
+            position += _INDEX_ENTRY.size
+        self._state_table = json.loads(bytes(self._map[position:]).decode("utf-8"))
+
+    def _scan_chunks(self, size):
+        position = _HEADER.size
+        first_index = 0
+        while position + _CHUNK_HEADER.size <= size:
+            magic, count, first_time, last_time, states_len, extras_len = _CHUNK_HEADER.unpack_from(self._map, position)
+            if magic != _CHUNK_MAGIC:
+                break
+            codes_len = count * 4 + _padding(count * 4)
+            states_at = position + _CHUNK_HEADER.size + count * 8 + codes_len
+            end = states_at + states_len + extras_len
+            end += _padding(states_len + extras_len)
+            if end > size:
+                break
+            self._state_table.extend(json.loads(bytes(self._map[states_at : states_at + states_len]).decode("utf-8")))
+            self._add_chunk(position, first_index, count, first_time, last_time)
+            first_index += count
+            position = end
+
+    def _chunk_for(self, position: int) -> int:
+        chunk = self._last_chunk
+        start = self._chunk_starts[chunk]
+        if start <= position < start + self._chunk_counts[chunk]:
+            return chunk
+        chunk = bisect_right(self._chunk_starts, position) - 1
+        self._last_chunk = chunk
+        return chunk
+
+    def _chunk_columns(self, chunk: int):
+        columns = self._columns.get(chunk)
+        if columns is None:
+            count = self._chunk_counts[chunk]
+            start = self._chunk_offsets[chunk] + _CHUNK_HEADER.size
+            view = memoryview(self._map)
+            timestamps = view[start : start + count * 8].cast(self._timestamp_type)
+            codes = view[start + count * 8 : start + count * 12].cast("I")
+            if not _LITTLE_ENDIAN:
+                timestamps = array(self._timestamp_type, timestamps.tobytes())
+                timestamps.byteswap()
+                codes = array("I", codes.tobytes())
+                codes.byteswap()
+            columns = self._columns[chunk] = (timestamps, codes)
+        return columns
+
+    def _chunk_extras(self, chunk: int) -> Dict[int, Dict[str, Any]]:
+        extras = self._extras_cache.get(chunk)
+        if extras is not None:
+            self._extras_cache.move_to_end(chunk)
+            return extras
+        offset = self._chunk_offsets[chunk]
+        _, count, _, _, states_len, extras_len = _CHUNK_HEADER.unpack_from(self._map, offset)
+        start = offset + _CHUNK_HEADER.size + count * 8 + count * 4 + _padding(count * 4) + states_len
+        raw = json.loads(bytes(self._map[start : start + extras_len]).decode("utf-8"))
+        extras = {int(key): value for key, value in raw.items()}
+        self._extras_cache[chunk] = extras
+        if len(self._extras_cache) > self._extras_cache_size:
+            self._extras_cache.popitem(last=False)
+        return extras
+
+    def __len__(self) -> int:
+        return self._total - self._head
+
+    def _position(self, index: int) -> int:
+        if index < 0:
+            return self._total + index
+        return self._head + index
+
+    def _locate(self, index: int):
+        position = self._position(index)
+        if not self._head <= position < self._total:
+            raise IndexError("event index out of range")
+        chunk = self._chunk_for(position)
+        return chunk, position - self._chunk_starts[chunk]
+
+    def timestamp(self, index: int) -> float:
+        chunk, offset = self._locate(index)
+        return self._chunk_columns(chunk)[0][offset]
+
+    def state_code(self, index: int) -> int:
+        chunk, offset = self._locate(index)
+        return self._chunk_columns(chunk)[1][offset]
+
+    def state_id(self, index: int) -> str:
+        return self._state_table[self.state_code(index)]
+
+    def extra(self, index: int) -> Dict[str, Any]:
+        chunk, offset = self._locate(index)
+        return self._chunk_extras(chunk).get(offset, _EMPTY_EXTRA)
+
+    def event(self, index: int) -> Event:
+        chunk, offset = self._locate(index)
+        timestamps, codes = self._chunk_columns(chunk)
+        return Event(
+            timestamp=timestamps[offset],
+            state_id=self._state_table[codes[offset]],
+            extra=self._chunk_extras(chunk).get(offset, _EMPTY_EXTRA),
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.event(index)
+
+    def bisect_left(self, timestamp: float, lo: int = 0) -> int:
+        chunk = bisect_left(self._chunk_last, timestamp)
+        if chunk >= len(self._chunk_last):
+            position = self._total
+        else:
+            position = self._chunk_starts[chunk] + bisect_left(self._chunk_columns(chunk)[0], timestamp)
+        return max(lo, position - self._head)
+
+    def bisect_right(self, timestamp: float, lo: int = 0) -> int:
+        chunk = bisect_right(self._chunk_last, timestamp)
+        if chunk >= len(self._chunk_last):
+            position = self._total
+        else:
+            position = self._chunk_starts[chunk] + bisect_right(self._chunk_columns(chunk)[0], timestamp)
+        return max(lo, position - self._head)
+
+    def drop_front(self, count: int) -> None:
+        self._head += min(count, len(self))
+
+    def append(self, timestamp, state_id, extra=None):
+        raise TypeError("mapped recordings are read-only; record into a RecordingWriter instead")
+
+    def extend(self, timestamps, state_ids, extras=None):
+        raise TypeError("mapped recordings are read-only; record into a RecordingWriter instead")
+
+    def clear(self) -> None:
+        self._head = self._total
+
+    @property
+    def state_table(self) -> List[Any]:
+        return list(self._state_table)
+
+    @property
+    def timestamp_type(self) -> str:
+        return self._timestamp_type
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunk_offsets)
+
+    def chunk_span(self, chunk: int):
+        # (first absolute index, event count, first timestamp, last timestamp)
+        return (
+            self._chunk_starts[chunk],
+            self._chunk_counts[chunk],
+            self._chunk_first[chunk],
+            self._chunk_last[chunk],
+        )
+
+    def chunk_columns(self, chunk: int):
+        return self._chunk_columns(chunk)
+
+    def chunk_extras(self, chunk: int) -> Dict[int, Dict[str, Any]]:
+        return self._chunk_extras(chunk)
+
+    def column_slices(self, start: int = 0, stop: Optional[int] = None):
+        # per-chunk views over logical [start, stop); codes index the global state table
+        stop = len(self) if stop is None else min(stop, len(self))
+        if stop <= start:
+            return
+        position = self._head + start
+        end = self._head + stop
+        chunk = bisect_right(self._chunk_starts, position) - 1
+        while position < end:
+            first = self._chunk_starts[chunk]
+            upto = min(end, first + self._chunk_counts[chunk])
+            timestamps, codes = self._chunk_columns(chunk)
+            yield timestamps[position - first : upto - first], codes[position - first : upto - first]
+            position = upto
+            chunk += 1
+
+    def memory_usage(self) -> int:
+        total = sum(sys.getsizeof(column) for column in (
+            self._chunk_offsets, self._chunk_starts, self._chunk_counts, self._chunk_first, self._chunk_last
+        ))
+        total += sys.getsizeof(self._state_table) + sys.getsizeof(self._columns)
+        for extras in self._extras_cache.values():
+            total += sys.getsizeof(extras)
+        return total
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        self._columns.clear()
+        self._extras_cache.clear()
+        self._map.close()
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_recording(model: StateTimelineModel, path, chunk_size: int = 65536, timestamp_type: str = "d") -> int:
+    store = model.store
+    with RecordingWriter(path, chunk_size=chunk_size, timestamp_type=timestamp_type) as writer:
+        for index in range(len(store)):
+            writer.append(store.timestamp(index), store.state_id(index), store.extra(index))
+        return writer.event_count
+
+
+def record_model(model: StateTimelineModel, path, chunk_size: int = 65536, timestamp_type: str = "d") -> RecordingWriter:
+    writer = RecordingWriter(path, chunk_size=chunk_size, timestamp_type=timestamp_type)
+    writer.attach(model)
+    return writer
+
+
+def open_recording(path) -> StateTimelineModel:
+    # the model keeps the file mapped until close(), or use it as a context manager
+    return StateTimelineModel(MappedEventStore(path))
+
+
+def load_recording(path) -> StateTimelineModel:
+    mapped = MappedEventStore(path)
+    try:
+        store = ColumnarEventStore(mapped.timestamp_type)
+        table = mapped.state_table
+        for chunk in range(mapped.chunk_count):
+            timestamps, codes = mapped.chunk_columns(chunk)
+            chunk_extras = mapped.chunk_extras(chunk)
+            extras = None
+            if chunk_extras:
+                extras = [None] * len(timestamps)
+                for offset, extra in chunk_extras.items():
+                    extras[offset] = extra
+            store.extend(array(mapped.timestamp_type, timestamps), [table[code] for code in codes], extras)
+            del timestamps, codes
+        return StateTimelineModel(store)
+    finally:
+        mapped.close()
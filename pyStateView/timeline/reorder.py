@@ -0,0 +1,143 @@
+import heapq
+import time
+from typing import Any, Dict, Optional
+
+from .state_model import _split_events
+
+
+class ReorderBuffer:
+    def __init__(self, target, tolerance: float = 1.0, max_hold: Optional[float] = None):
+        # target is anything with append_events(timestamps=, state_ids=, extras=), usually a model;
+        # max_hold is wall-clock seconds without a newer event before poll() commits everything,
+        # the tolerance by default
+        if tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+        if max_hold is not None and max_hold < 0:
+            raise ValueError("max_hold must not be negative")
+        self._target = target
+        self._tolerance = float(tolerance)
+        self._max_hold = None if max_hold is None else float(max_hold)
+        self._advanced_at = 0.0
+        self._heap = []
+        self._sequence = 0
+        self._newest = None
+        self._committed = None
+        self._late = 0
+
+    @property
+    def target(self):
+        return self._target
+
+    @property
+    def tolerance(self) -> float:
+        return self._tolerance
+
+    def set_tolerance(self, tolerance: float) -> int:
+        if tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+        self._tolerance = float(tolerance)
+        return self._release()
+
+    @property
+    def max_hold(self) -> float:
+        return self._tolerance if self._max_hold is None else self._max_hold
+
+    def set_max_hold(self, max_hold: Optional[float]) -> None:
+        if max_hold is not None and max_hold < 0:
+            raise ValueError("max_hold must not be negative")
+        self._max_hold = None if max_hold is None else float(max_hold)
+
+    def hold_remaining(self, now: Optional[float] = None) -> Optional[float]:
+        # seconds until poll() commits the held events, None when nothing is held
+        if not self._heap:
+            return None
+        if now is None:
+            now = time.monotonic()
+        return max(0.0, self._advanced_at + self.max_hold - now)
+
+    def poll(self, now: Optional[float] = None) -> int:
+        # a quiet source never advances the watermark; once max_hold has passed without a
+        # newer event, whatever is held is committed
+        remaining = self.hold_remaining(now)
+        if remaining is None or remaining > 0:
+            return 0
+        return self.flush()
+
+    @property
+    def watermark(self) -> Optional[float]:
+        # events at or before this time are committed to the target
+        if self._newest is None:
+            return None
+        return self._newest - self._tolerance
+
+    @property
+    def late_count(self) -> int:
+        # events that arrived after their window had closed and were inserted, not appended
+        return self._late
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> int:
+        self._hold(timestamp, state_id, extra)
+        return self._release()
+
+    def push_many(self, events=None, timestamps=None, state_ids=None, extras=None) -> int:
+        if events is not None:
+            timestamps, state_ids, extras = _split_events(events)
+        elif timestamps is None or state_ids is None:
+            raise ValueError("push_many needs either events or timestamps and state_ids")
+        else:
+            timestamps = list(timestamps)
+            state_ids = list(state_ids)
+            if len(timestamps) != len(state_ids):
+                raise ValueError("timestamps and state_ids must have the same length")
+        if extras is None:
+            extras = [None] * len(timestamps)
+        hold = self._hold
+        for timestamp, state_id, extra in zip(timestamps, state_ids, extras):
+            hold(timestamp, state_id, extra)
+        return self._release()
+
+    def flush(self) -> int:
+        # commits everything still held, e.g. when the source goes quiet or is closed
+        return self._release(flush=True)
+
+    def clear(self) -> None:
+        self._heap = []
+        self._newest = None
+        self._committed = None
+        self._late = 0
+
+    def _hold(self, timestamp, state_id, extra) -> None:
+        # the sequence number keeps arrival order among equal timestamps
+        heapq.heappush(self._heap, (timestamp, self._sequence, state_id, extra))
+        self._sequence += 1
+        if self._newest is None or timestamp > self._newest:
+            self._newest = timestamp
+            self._advanced_at = time.monotonic()
+
+    def _release(self, flush: bool = False) -> int:
+        heap = self._heap
+        if not heap:
+            return 0
+        watermark = self._newest - self._tolerance
+        timestamps = []
+        state_ids = []
+        extras = []
+        committed = self._committed
+        pop = heapq.heappop
+        while heap and (flush or heap[0][0] <= watermark):
+            timestamp, _, state_id, extra = pop(heap)
+            if committed is not None and timestamp < committed:
+                self._late += 1
+            timestamps.append(timestamp)
+            state_ids.append(state_id)
+            extras.append(extra)
+        if not timestamps:
+            return 0
+        if committed is None or timestamps[-1] > committed:
+            self._committed = timestamps[-1]
+        # one sorted batch; only events older than the committed ones take the insert path
+        self._target.append_events(timestamps=timestamps, state_ids=state_ids, extras=extras)
+        return len(timestamps)
@@ -0,0 +1,74 @@
+from typing import List, NamedTuple, Optional
+
+
+MAX_RUN_SCAN = 256
+
+
+class Run(NamedTuple):
+    state_id: str
+    start_time: float
+    end_time: float
+    first_index: int
+    last_index: int
+    transitions: int = 0
+
+
+def compute_runs(
+    model,
+    start_time: float,
+    end_time: float,
+    seconds_per_pixel: float,
+    end_of_data: Optional[float] = None,
+    max_scan: int = MAX_RUN_SCAN,
+) -> List[Run]:
+    count = model.event_count()
+    if not count or end_time <= start_time or seconds_per_pixel <= 0:
+        return []
+    store = model.store
+    timestamp_at = store.timestamp
+    state_at = store.state_id
+    if end_of_data is None:
+        end_of_data = timestamp_at(count - 1)
+    index = max(0, store.bisect_right(start_time) - 1)
+    cursor = max(start_time, timestamp_at(index))
+    runs: List[Run] = []
+    cluster = {}
+    cluster_transitions = 0
+
+    def flush():
+        for state_id, (first_time, last_time, first_index, last_index) in cluster.items():
+            runs.append(Run(state_id, first_time, last_time, first_index, last_index, cluster_transitions))
+        cluster.clear()
+
+    while index < count and cursor < end_time:
+        seg_end = timestamp_at(index + 1) if index + 1 < count else max(end_of_data, timestamp_at(index))
+        if index + 1 >= count or seg_end - cursor >= seconds_per_pixel:
+            if cluster:
+                flush()
+                cluster_transitions = 0
+            runs.append(Run(state_at(index), timestamp_at(index), seg_end, index, index))
+            index += 1
+            cursor = seg_end
+            continue
+
+        # every segment starting inside this pixel column is narrower than a pixel;
+        # collapse them into one run per lane, sampling when the column is very dense
+        stop = store.bisect_right(cursor + seconds_per_pixel, index + 1) - 1
+        stop_time = timestamp_at(stop)
+        span = stop - index
+        step = max(1, span // max_scan)
+        for idx in range(index, stop, step):
+            state_id = state_at(idx)
+            entry = cluster.get(state_id)
+            if entry is None:
+                cluster[state_id] = [timestamp_at(idx), stop_time, idx, stop - 1]
+            else:
+                entry[1] = stop_time
+                entry[3] = stop - 1
+        cluster_transitions += span
+        index = stop
+        cursor = stop_time
+
+    if cluster:
+        flush()
+    return runs
@@ -1,51 +1,341 @@
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+import operator
+from collections import Counter, OrderedDict
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
 
+from .event_store import Event, EventSequence, create_store
 
-@dataclass(frozen=True)
-class Event:
-    timestamp: float
-    state_id: str
-    extra: Dict[str, Any] = field(default_factory=dict)
+
+# change kinds passed to model listeners as listener(kind, start, count)
+CHANGE_APPENDED = "appended"
+CHANGE_EVICTING = "evicting"
+CHANGE_EVICTED = "evicted"
+CHANGE_RESET = "reset"
+# count events were inserted at start; events from start on moved up by count
+CHANGE_INSERTED = "inserted"
+
+# formatted extras remembered by extra_text for table rows and tooltips
+_EXTRA_TEXT_CACHE = 4096
 
 
 class StateTimelineModel:
-    def __init__(self):
-        self._events: List[Event] = []
-        self._state_set = set()
+    def __init__(self, storage="list", extra_schema: Optional[Dict[str, type]] = None):
+        self._store = create_store(storage, extra_schema)
+        self._state_set = set(getattr(self._store, "state_table", ()))
+        # events per state, kept only while retention can evict so states can disappear again
+        self._state_counts: Optional[Counter] = None
+        self._max_events: Optional[int] = None
+        self._max_age: Optional[float] = None
+        self._evicted_count = 0
+        self._listeners = []
+        # keyed by absolute index (evicted_count + index) so eviction does not invalidate it
+        self._extra_text: "OrderedDict[int, str]" = OrderedDict()
+
+    @property
+    def store(self):
+        return self._store
+
+    def set_extra_schema(self, schema: Optional[Dict[str, type]]) -> None:
+        # declared fields are kept as typed columns; None goes back to plain dicts
+        if not hasattr(self._store, "set_extra_schema"):
+            raise ValueError(f"{type(self._store).__name__} does not support an extra schema")
+        self._store.set_extra_schema(schema)
+        self._extra_text.clear()
+
+    @property
+    def extra_schema(self) -> Optional[Dict[str, type]]:
+        return getattr(self._store, "extra_schema", None)
+
+    def add_listener(self, listener) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, kind: str, start: int = 0, count: int = 0) -> None:
+        for listener in list(self._listeners):
+            listener(kind, start, count)
 
     def append_event(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> Event:
-        event = Event(timestamp=timestamp, state_id=state_id, extra=extra or {})
-        self._events.append(event)
+        count = len(self._store)
+        if count and timestamp < self._store.timestamp(count - 1):
+            # late arrival: keep the store sorted instead of appending out of order
+            return self.insert_event(timestamp, state_id, extra)
+        event = self._store.append(timestamp, state_id, extra)
         self._state_set.add(state_id)
+        counts = self._state_counts
+        if counts is not None:
+            counts[state_id] = counts.get(state_id, 0) + 1
+        if self._listeners:
+            self._notify(CHANGE_APPENDED, len(self._store) - 1, 1)
+        if self._max_events is not None or self._max_age is not None:
+            self._enforce_retention()
+        return event
+
+    def append_events(self, events=None, timestamps=None, state_ids=None, extras=None) -> int:
+        if events is not None:
+            timestamps, state_ids, extras = _split_events(events)
+        elif timestamps is None or state_ids is None:
+            raise ValueError("append_events needs either events or timestamps and state_ids")
+        else:
+            timestamps = list(timestamps)
+            state_ids = list(state_ids)
+            if len(timestamps) != len(state_ids):
+                raise ValueError("timestamps and state_ids must have the same length")
+        if timestamps and not self._in_order(timestamps):
+            return self._merge_events(timestamps, state_ids, extras)
+        self._store.extend(timestamps, state_ids, extras)
+        self._add_states(state_ids)
+        if self._listeners and timestamps:
+            self._notify(CHANGE_APPENDED, len(self._store) - len(timestamps), len(timestamps))
+        if self._max_events is not None or self._max_age is not None:
+            self._enforce_retention()
+        return len(timestamps)
+
+    def insert_event(self, timestamp: float, state_id: str, extra: Optional[Dict[str, Any]] = None) -> Event:
+        # binary search for the slot (after events with the same timestamp); only the
+        # neighbours of that slot change, which CHANGE_INSERTED lets listeners exploit
+        index = self._store.bisect_right(timestamp)
+        if index >= len(self._store):
+            return self.append_event(timestamp, state_id, extra)
+        event = self._insert(index, timestamp, state_id, extra)
+        if self._max_events is not None or self._max_age is not None:
+            self._enforce_retention()
+        return event
+
+    def _insert(self, index: int, timestamp: float, state_id: str, extra) -> Event:
+        if not hasattr(self._store, "insert"):
+            raise ValueError(f"{type(self._store).__name__} does not support inserting events")
+        event = self._store.insert(index, timestamp, state_id, extra)
+        self._add_state(state_id)
+        # cached texts of later events are keyed by absolute index, which just moved up
+        boundary = self._evicted_count + index
+        for key in [key for key in self._extra_text if key >= boundary]:
+            del self._extra_text[key]
+        if self._listeners:
+            self._notify(CHANGE_INSERTED, index, 1)
         return event
 
+    def _in_order(self, timestamps) -> bool:
+        count = len(self._store)
+        if count and timestamps[0] < self._store.timestamp(count - 1):
+            return False
+        return all(map(operator.le, timestamps, islice(timestamps, 1, None)))
+
+    def _merge_events(self, timestamps, state_ids, extras) -> int:
+        # the batch is sorted (stably); events older than the newest stored one are inserted
+        # one at a time, the rest are appended as one block
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        timestamps = [timestamps[i] for i in order]
+        state_ids = [state_ids[i] for i in order]
+        extras = [extras[i] for i in order] if extras is not None else None
+        count = len(self._store)
+        late = 0
+        if count:
+            last_time = self._store.timestamp(count - 1)
+            while late < len(timestamps) and timestamps[late] < last_time:
+                late += 1
+        for i in range(late):
+            index = self._store.bisect_right(timestamps[i])
+            self._insert(index, timestamps[i], state_ids[i], extras[i] if extras is not None else None)
+        if late < len(timestamps):
+            tail = len(timestamps) - late
+            self._store.extend(timestamps[late:], state_ids[late:], extras[late:] if extras is not None else None)
+            self._add_states(state_ids[late:])
+            if self._listeners:
+                self._notify(CHANGE_APPENDED, len(self._store) - tail, tail)
+        if self._max_events is not None or self._max_age is not None:
+            self._enforce_retention()
+        return len(timestamps)
+
+    def _add_state(self, state_id) -> None:
+        self._state_set.add(state_id)
+        counts = self._state_counts
+        if counts is not None:
+            counts[state_id] = counts.get(state_id, 0) + 1
+
+    def _add_states(self, state_ids) -> None:
+        self._state_set.update(state_ids)
+        if self._state_counts is not None:
+            self._state_counts.update(state_ids)
+
+    def set_retention(self, max_events: Optional[int] = None, max_age: Optional[float] = None) -> None:
+        if max_events is not None and max_events < 1:
+            raise ValueError("max_events must be at least 1")
+        if max_age is not None and max_age < 0:
+            raise ValueError("max_age must not be negative")
+        self._max_events = max_events
+        self._max_age = max_age
+        if max_events is None and max_age is None:
+            self._state_counts = None
+        elif self._state_counts is None:
+            # counted once here, then kept up to date by appends, inserts and evictions
+            store = self._store
+            self._state_counts = Counter(map(store.state_id, range(len(store))))
+            self._state_set = set(self._state_counts)
+        self._enforce_retention()
+
+    @property
+    def retention(self) -> Tuple[Optional[int], Optional[float]]:
+        return self._max_events, self._max_age
+
+    @property
+    def evicted_count(self) -> int:
+        return self._evicted_count
+
+    def _enforce_retention(self) -> None:
+        count = len(self._store)
+        if not count:
+            return
+        evict = 0
+        if self._max_events is not None and count > self._max_events:
+            evict = count - self._max_events
+        if self._max_age is not None:
+            # keep the event active at the cutoff so the first segment still has its state
+            cutoff = self._store.timestamp(count - 1) - self._max_age
+            evict = max(evict, self._store.bisect_right(cutoff) - 1)
+        if evict > 0:
+            # listeners see "evicting" while the events are still readable
+            if self._listeners:
+                self._notify(CHANGE_EVICTING, 0, evict)
+            self._release_states(evict)
+            self._store.drop_front(evict)
+            self._evicted_count += evict
+            if self._listeners:
+                self._notify(CHANGE_EVICTED, 0, evict)
+
+    def _release_states(self, count: int) -> None:
+        # states whose last event is evicted leave states() and state_count()
+        counts = self._state_counts
+        if counts is None:
+            return
+        state_at = self._store.state_id
+        for index in range(count):
+            state_id = state_at(index)
+            remaining = counts[state_id] - 1
+            if remaining:
+                counts[state_id] = remaining
+            else:
+                del counts[state_id]
+                self._state_set.discard(state_id)
+
     def clear(self) -> None:
-        self._events.clear()
+        self._store.clear()
         self._state_set.clear()
+        if self._state_counts is not None:
+            self._state_counts.clear()
+        self._evicted_count = 0
+        self._extra_text.clear()
+        self._notify(CHANGE_RESET)
+
+    def close(self) -> None:
+        # releases what the store holds open, e.g. the mmap and file of a recording
+        close = getattr(self._store, "close", None)
+        if close is not None:
+            close()
+        self._extra_text.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     @property
-    def events(self) -> List[Event]:
-        return list(self._events)
+    def events(self) -> EventSequence:
+        return EventSequence(self._store)
 
     def event_count(self) -> int:
-        return len(self._events)
+        return len(self._store)
 
     def states(self) -> List[str]:
         return sorted(self._state_set, key=str)
 
+    def state_count(self) -> int:
+        return len(self._state_set)
+
     def get_event(self, index: int) -> Optional[Event]:
-        if 0 <= index < len(self._events):
-            return self._events[index]
+        if 0 <= index < len(self._store):
+            return self._store.event(index)
         return None
 
     def iter_events(self):
-        return iter(self._events)
+        return iter(self._store)
+
+    def extra_text(self, index: int) -> str:
+        # str() of an extra is paid once per event however often a row or tooltip shows it
+        key = self._evicted_count + index
+        cache = self._extra_text
+        text = cache.get(key)
+        if text is not None:
+            cache.move_to_end(key)
+            return text
+        text = str(self._store.extra(index))
+        cache[key] = text
+        if len(cache) > _EXTRA_TEXT_CACHE:
+            cache.popitem(last=False)
+        return text
+
+    def timestamp_at(self, index: int) -> float:
+        return self._store.timestamp(index)
+
+    def state_id_at(self, index: int) -> str:
+        return self._store.state_id(index)
 
     def index_for_time(self, timestamp: float) -> int:
-        if not self._events:
+        if not len(self._store):
             return -1
-        for idx in range(len(self._events) - 1, -1, -1):
-            if self._events[idx].timestamp <= timestamp:
-                return idx
-        return 0
+        return max(0, self._store.bisect_right(timestamp) - 1)
+
+    def next_index(self, timestamp: float) -> int:
+        index = self._store.bisect_right(timestamp)
+        return index if index < len(self._store) else -1
+
+    def previous_index(self, timestamp: float) -> int:
+        return self._store.bisect_left(timestamp) - 1
+
+    def state_at(self, timestamp: float) -> Optional[str]:
+        index = self._store.bisect_right(timestamp) - 1
+        if index < 0:
+            return None
+        return self._store.state_id(index)
+
+    def index_range(self, start_time: Optional[float] = None, end_time: Optional[float] = None) -> Tuple[int, int]:
+        start = 0 if start_time is None else self._store.bisect_left(start_time)
+        stop = len(self._store) if end_time is None else self._store.bisect_right(end_time)
+        return start, max(start, stop)
+
+    def events_between(self, start_time: Optional[float] = None, end_time: Optional[float] = None) -> EventSequence:
+        start, stop = self.index_range(start_time, end_time)
+        return EventSequence(self._store, start, stop)
+
+    def memory_usage(self) -> int:
+        return self._store.memory_usage()
+
+    def bytes_per_event(self) -> float:
+        count = len(self._store)
+        if not count:
+            return 0.0
+        return self.memory_usage() / count
+
+
+def _split_events(events):
+    timestamps = []
+    state_ids = []
+    extras = []
+    for item in events:
+        if isinstance(item, Event):
+            timestamps.append(item.timestamp)
+            state_ids.append(item.state_id)
+            extras.append(item.extra)
+        elif isinstance(item, dict):
+            timestamps.append(item["timestamp"])
+            state_ids.append(item["state_id"])
+            extras.append(item.get("extra"))
+        else:
+            timestamps.append(item[0])
+            state_ids.append(item[1])
+            extras.append(item[2] if len(item) > 2 else None)
+    return timestamps, state_ids, extras
@@ -0,0 +1,275 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+from math import isqrt
+from operator import itemgetter, sub
+from typing import Any, Dict, List, Optional, Tuple
+
+from .state_model import CHANGE_APPENDED, CHANGE_EVICTING, CHANGE_INSERTED, CHANGE_RESET, StateTimelineModel
+
+
+_COMPACT_MIN = 1024
+_PENDING_MIN = 64
+
+
+class _StateSegments:
+    __slots__ = ("times", "cumulative", "head", "base", "pending_times", "pending_deltas")
+
+    def __init__(self):
+        # start times of closed segments and their running dwell sum; keyed by time, not
+        # position, so a late event elsewhere does not move them
+        self.times = array("d")
+        self.cumulative = array("d")
+        self.head = 0
+        self.base = 0.0
+        # corrections from late events, folded into the arrays once there are enough of them
+        self.pending_times: List[float] = []
+        self.pending_deltas: List[float] = []
+
+    def append(self, timestamp: float, duration: float) -> None:
+        total = self.cumulative[-1] if len(self.cumulative) else self.base
+        self.times.append(timestamp)
+        self.cumulative.append(total + duration)
+
+    def adjust(self, timestamp: float, delta: float) -> None:
+        # a segment starting at timestamp grew by delta, or a new one of length delta appeared
+        position = bisect_right(self.pending_times, timestamp)
+        self.pending_times.insert(position, timestamp)
+        self.pending_deltas.insert(position, delta)
+        if len(self.pending_times) > max(_PENDING_MIN, isqrt(len(self.times) - self.head)):
+            self._fold()
+
+    def _fold(self) -> None:
+        head = self.head
+        before = self.cumulative[head - 1] if head else self.base
+        live = self.cumulative[head:]
+        durations = map(sub, live, chain((before,), live))
+        merged = sorted(chain(zip(self.times[head:], durations), zip(self.pending_times, self.pending_deltas)), key=itemgetter(0))
+        times, durations = zip(*merged) if merged else ((), ())
+        self.times = array("d", times)
+        self.cumulative = array("d", accumulate(durations, initial=before))
+        del self.cumulative[0]
+        self.head = 0
+        self.base = before
+        self.pending_times = []
+        self.pending_deltas = []
+
+    def drop_before(self, timestamp: float) -> None:
+        self.head = bisect_left(self.times, timestamp, self.head)
+        cut = bisect_left(self.pending_times, timestamp)
+        if cut:
+            del self.pending_times[:cut]
+            del self.pending_deltas[:cut]
+        if self.head >= _COMPACT_MIN and self.head * 2 >= len(self.times):
+            self.base = self.cumulative[self.head - 1]
+            del self.times[: self.head]
+            del self.cumulative[: self.head]
+            self.head = 0
+
+    def total_between(self, low: float, high: float) -> float:
+        # segments starting in [low, high)
+        total = 0.0
+        pending = self.pending_times
+        if pending:
+            total = sum(self.pending_deltas[bisect_left(pending, low) : bisect_left(pending, high)])
+        start = bisect_left(self.times, low, self.head)
+        stop = bisect_left(self.times, high, start)
+        if stop <= start:
+            return total
+        before = self.cumulative[start - 1] if start > 0 else self.base
+        return total + self.cumulative[stop - 1] - before
+
+
+class TimelineStatistics:
+    def __init__(self, model: StateTimelineModel):
+        self._model = model
+        self._dwell: Dict[Any, float] = {}
+        self._transitions: Dict[Tuple[Any, Any], int] = {}
+        self._segments: Dict[Any, _StateSegments] = {}
+        self._listeners = []
+        model.add_listener(self._on_model_changed)
+        self.rebuild()
+
+    @property
+    def model(self) -> StateTimelineModel:
+        return self._model
+
+    def detach(self) -> None:
+        self._model.remove_listener(self._on_model_changed)
+
+    def add_listener(self, listener) -> None:
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
+
+    def rebuild(self) -> None:
+        self._dwell.clear()
+        self._transitions.clear()
+        self._segments.clear()
+        count = self._model.event_count()
+        if count > 1:
+            self._close_segments(0, count - 1)
+        self._notify()
+
+    def _on_model_changed(self, kind: str, start: int, count: int) -> None:
+        if kind == CHANGE_APPENDED:
+            self._close_segments(max(0, start - 1), start + count - 1)
+        elif kind == CHANGE_INSERTED:
+            self._insert_segments(start, count)
+        elif kind == CHANGE_EVICTING:
+            self._release_segments(count)
+        elif kind == CHANGE_RESET:
+            self.rebuild()
+            return
+        else:
+            return
+        self._notify()
+
+    def _close_segments(self, first: int, last: int) -> None:
+        # closes segments first..last-1, each ended by the event that follows it
+        if last <= first:
+            return
+        store = self._model.store
+        timestamp_at = store.timestamp
+        state_at = store.state_id
+        dwell = self._dwell
+        transitions = self._transitions
+        segments = self._segments
+        prev_time = timestamp_at(first)
+        prev_state = state_at(first)
+        for index in range(first + 1, last + 1):
+            timestamp = timestamp_at(index)
+            state_id = state_at(index)
+            duration = timestamp - prev_time
+            dwell[prev_state] = dwell.get(prev_state, 0.0) + duration
+            key = (prev_state, state_id)
+            transitions[key] = transitions.get(key, 0) + 1
+            state_segments = segments.get(prev_state)
+            if state_segments is None:
+                state_segments = segments[prev_state] = _StateSegments()
+            state_segments.append(prev_time, duration)
+            prev_time = timestamp
+            prev_state = state_id
+
+    def _insert_segments(self, start: int, count: int) -> None:
+        # the segment that spanned the gap is split around the inserted events: only it and
+        # the new ones change, so the cost does not depend on how many events follow
+        store = self._model.store
+        timestamp_at = store.timestamp
+        state_at = store.state_id
+        stop = start + count
+        dwell = self._dwell
+        transitions = self._transitions
+        segments = self._segments
+        next_time = timestamp_at(stop)
+        next_state = state_at(stop)
+        if start > 0:
+            prev_time = timestamp_at(start - 1)
+            prev_state = state_at(start - 1)
+            shortened = next_time - timestamp_at(start)
+            dwell[prev_state] -= shortened
+            key = (prev_state, next_state)
+            remaining = transitions[key] - 1
+            if remaining:
+                transitions[key] = remaining
+            else:
+                del transitions[key]
+            segments[prev_state].adjust(prev_time, -shortened)
+        else:
+            prev_state = None
+        for index in range(start, stop):
+            timestamp = timestamp_at(index)
+            state_id = state_at(index)
+            if index > 0:
+                key = (prev_state, state_id)
+                transitions[key] = transitions.get(key, 0) + 1
+            following = timestamp_at(index + 1)
+            dwell[state_id] = dwell.get(state_id, 0.0) + (following - timestamp)
+            state_segments = segments.get(state_id)
+            if state_segments is None:
+                state_segments = segments[state_id] = _StateSegments()
+            state_segments.adjust(timestamp, following - timestamp)
+            prev_state = state_id
+        key = (prev_state, next_state)
+        transitions[key] = transitions.get(key, 0) + 1
+
+    def _release_segments(self, count: int) -> None:
+        store = self._model.store
+        total = len(store)
+        dwell = self._dwell
+        transitions = self._transitions
+        for index in range(min(count, total - 1)):
+            state_id = store.state_id(index)
+            dwell[state_id] -= store.timestamp(index + 1) - store.timestamp(index)
+            key = (state_id, store.state_id(index + 1))
+            remaining = transitions[key] - 1
+            if remaining:
+                transitions[key] = remaining
+            else:
+                del transitions[key]
+        if not total:
+            return
+        boundary = store.timestamp(min(count, total - 1))
+        for state_segments in self._segments.values():
+            state_segments.drop_before(boundary)
+
+    def dwell_totals(self, end_time: Optional[float] = None) -> Dict[Any, float]:
+        totals = {state_id: duration for state_id, duration in self._dwell.items() if duration > 0}
+        count = self._model.event_count()
+        if end_time is not None and count:
+            last_time = self._model.timestamp_at(count - 1)
+            if end_time > last_time:
+                state_id = self._model.state_id_at(count - 1)
+                totals[state_id] = totals.get(state_id, 0.0) + end_time - last_time
+        return totals
+
+    def transition_counts(self) -> Dict[Tuple[Any, Any], int]:
+        return dict(self._transitions)
+
+    def transition_matrix(self) -> Tuple[List[Any], List[List[int]]]:
+        states = self._model.states()
+        lookup = {state_id: idx for idx, state_id in enumerate(states)}
+        matrix = [[0] * len(states) for _ in states]
+        for (src, dst), count in self._transitions.items():
+            matrix[lookup[src]][lookup[dst]] = count
+        return states, matrix
+
+    def distribution(self, start_time: Optional[float] = None, end_time: Optional[float] = None) -> Dict[Any, float]:
+        model = self._model
+        store = model.store
+        count = len(store)
+        if not count:
+            return {}
+        if start_time is None and end_time is None:
+            return self.dwell_totals()
+        first_time = store.timestamp(0)
+        start = first_time if start_time is None else max(start_time, first_time)
+        end = store.timestamp(count - 1) if end_time is None else end_time
+        if end <= start:
+            return {}
+        first = store.bisect_right(start) - 1
+        last = store.bisect_right(end) - 1
+        result: Dict[Any, float] = {}
+
+        def add(state_id, duration):
+            if duration > 0:
+                result[state_id] = result.get(state_id, 0.0) + duration
+
+        if first == last:
+            add(store.state_id(first), end - start)
+            return result
+        add(store.state_id(first), store.timestamp(first + 1) - start)
+        if last > first + 1:
+            low = store.timestamp(first + 1)
+            high = store.timestamp(last)
+            for state_id, state_segments in self._segments.items():
+                add(state_id, state_segments.total_between(low, high))
+        add(store.state_id(last), end - store.timestamp(last))
+        return result
@@ -0,0 +1,386 @@
+import math
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from .state_model import CHANGE_APPENDED, CHANGE_EVICTED, CHANGE_INSERTED, CHANGE_RESET, StateTimelineModel
+from ..utils.color_map import SEVERITY_NONE, alarm_severity
+
+
+# finest bucket is 2**BASE_EXPONENT seconds; level n doubles it n times
+BASE_EXPONENT = -4
+LEVELS = 32
+# a level stops storing closed tiles once it holds more than this many
+MAX_TILES = 8192
+
+
+class SummaryTile:
+    # events that fall inside one bucket; the state carried in from the left is added at query time
+    __slots__ = ("index", "events", "first_time", "first_state", "last_time", "last_state", "dwell", "states", "transitions")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.events = 0
+        self.first_time = 0.0
+        self.first_state = None
+        self.last_time = 0.0
+        self.last_state = None
+        self.dwell: Dict[Any, float] = {}
+        self.states: Set[Any] = set()
+        self.transitions = 0
+
+    def add(self, timestamp: float, state_id) -> None:
+        if self.events:
+            last = self.last_state
+            self.dwell[last] = self.dwell.get(last, 0.0) + (timestamp - self.last_time)
+            if state_id != last:
+                self.transitions += 1
+                self.states.add(state_id)
+        else:
+            self.first_time = timestamp
+            self.first_state = state_id
+            self.states.add(state_id)
+        self.events += 1
+        self.last_time = timestamp
+        self.last_state = state_id
+
+    def absorb(self, other: "SummaryTile") -> None:
+        # other covers a later stretch of the same bucket
+        if not other.events:
+            return
+        if not self.events:
+            self.first_time = other.first_time
+            self.first_state = other.first_state
+            self.dwell = dict(other.dwell)
+            self.states = set(other.states)
+            self.transitions = other.transitions
+        else:
+            last = self.last_state
+            self.dwell[last] = self.dwell.get(last, 0.0) + (other.first_time - self.last_time)
+            for state_id, seconds in other.dwell.items():
+                self.dwell[state_id] = self.dwell.get(state_id, 0.0) + seconds
+            self.states |= other.states
+            self.transitions += other.transitions + (other.first_state != last)
+        self.events += other.events
+        self.last_time = other.last_time
+        self.last_state = other.last_state
+
+    def copy(self) -> "SummaryTile":
+        tile = SummaryTile(self.index)
+        tile.absorb(self)
+        return tile
+
+
+class SummaryBucket(NamedTuple):
+    start: float
+    end: float
+    dominant: Any
+    states: frozenset
+    transitions: int
+    events: int
+    severity: int
+
+    @property
+    def alarm(self) -> bool:
+        return self.severity > SEVERITY_NONE
+
+
+class SummaryPyramid:
+    def __init__(
+        self,
+        model: Optional[StateTimelineModel] = None,
+        base_exponent: int = BASE_EXPONENT,
+        levels: int = LEVELS,
+        max_tiles: int = MAX_TILES,
+        alarm_keywords=None,
+    ):
+        self._widths = [2.0 ** (base_exponent + level) for level in range(levels)]
+        self._levels = levels
+        self._max_tiles = max_tiles
+        self._alarm_keywords = alarm_keywords
+        self._severity: Dict[Any, int] = {}
+        self._model = None
+        self._version = 0
+        self._reset()
+        if model is not None:
+            self.attach(model)
+
+    def _reset(self) -> None:
+        self._open: List[Optional[SummaryTile]] = [None] * self._levels
+        # closed tiles per level, None once a level has been dropped for holding too many
+        self._tiles: List[Optional[Dict[int, SummaryTile]]] = [{} for _ in range(self._levels)]
+        self._keys: List[Optional[array]] = [array("q") for _ in range(self._levels)]
+        self._events = 0
+        self._first_time = 0.0
+        self._last_time = 0.0
+        self._last_state = None
+        self._version += 1
+
+    @property
+    def model(self) -> Optional[StateTimelineModel]:
+        return self._model
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def event_count(self) -> int:
+        return self._events
+
+    def time_range(self):
+        if not self._events:
+            return None
+        return self._first_time, self._last_time
+
+    def bucket_width(self, level: int) -> float:
+        return self._widths[level]
+
+    def stored_levels(self) -> List[int]:
+        return [level for level, tiles in enumerate(self._tiles) if tiles is not None]
+
+    def attach(self, model: StateTimelineModel) -> None:
+        self.detach()
+        self._model = model
+        model.add_listener(self._on_model_changed)
+        self.rebuild()
+
+    def detach(self) -> None:
+        if self._model is not None:
+            self._model.remove_listener(self._on_model_changed)
+            self._model = None
+
+    def set_alarm_keywords(self, alarm_keywords) -> None:
+        # severity is derived from the states present when queried, so no rebuild is needed
+        self._alarm_keywords = alarm_keywords
+        self._severity.clear()
+        self._version += 1
+
+    def rebuild(self) -> None:
+        self._reset()
+        model = self._model
+        if model is not None and model.event_count():
+            store = model.store
+            self._feed(store, 0, len(store))
+
+    def _on_model_changed(self, kind: str, start: int, count: int) -> None:
+        if kind == CHANGE_APPENDED:
+            store = self._model.store
+            if self._events and store.timestamp(start) < self._last_time:
+                # tiles are closed in time order; an older event rewinds to its bucket
+                self._rewind(store, start, count)
+                return
+            self._feed(store, start, start + count)
+        elif kind == CHANGE_INSERTED:
+            self._rewind(self._model.store, start, count)
+        elif kind == CHANGE_EVICTED:
+            if self._model.event_count():
+                self.discard_before(self._model.timestamp_at(0))
+        elif kind == CHANGE_RESET:
+            self.rebuild()
+
+    def add_event(self, timestamp: float, state_id) -> None:
+        if self._events and timestamp < self._last_time:
+            raise ValueError("summary events must be added in time order")
+        self._add(timestamp, state_id)
+        self._version += 1
+
+    def _feed(self, store, first: int, last: int) -> None:
+        timestamp_at = store.timestamp
+        state_at = store.state_id
+        width = self._widths[0]
+        add = self._add
+        for index in range(first, last):
+            timestamp = timestamp_at(index)
+            tile = self._open[0]
+            # fast path: most events land in the bucket the previous one opened
+            if tile is not None and tile.index == math.floor(timestamp / width):
+                tile.add(timestamp, state_at(index))
+                self._last_time = timestamp
+                self._last_state = tile.last_state
+                self._events += 1
+            else:
+                add(timestamp, state_at(index))
+        self._version += 1
+
+    def _rewind(self, store, start: int, count: int) -> None:
+        # rolls the pyramid back to just before the finest bucket of the event at start and
+        # refeeds from there; tiles of earlier buckets, at every level, are kept as they are
+        width = self._widths[0]
+        first = store.bisect_left(math.floor(store.timestamp(start) / width) * width)
+        if first == 0:
+            self.rebuild()
+            return
+        total = len(store)
+        previous = math.floor(store.timestamp(first - 1) / width)
+        open_tiles = self._open
+        for level in range(self._levels):
+            index = previous >> level
+            tiles = self._tiles[level]
+            if tiles is not None:
+                keys = self._keys[level]
+                cut = bisect_left(keys, index)
+                for key in keys[cut:]:
+                    del tiles[key]
+                del keys[cut:]
+            if level == 0:
+                tile = self._scan(store, 0, index, first)
+            elif (previous >> (level - 1)) & 1:
+                # the open tile holds its closed left child
+                child = self._tiles[level - 1]
+                if child is None:
+                    tile = self._scan(store, level - 1, index << 1, first)
+                else:
+                    tile = child.get(index << 1)
+                    tile = tile.copy() if tile is not None else SummaryTile(index << 1)
+                tile.index = index
+            else:
+                tile = SummaryTile(index)
+            open_tiles[level] = tile
+        self._events -= total - count - first
+        self._last_time = store.timestamp(first - 1)
+        self._last_state = store.state_id(first - 1)
+        self._feed(store, first, total)
+
+    def _scan(self, store, level: int, index: int, stop: int) -> SummaryTile:
+        # rebuilds one bucket from the store, for levels that no longer keep their tiles
+        tile = SummaryTile(index)
+        bucket_end = (index + 1) * self._widths[level]
+        timestamp_at = store.timestamp
+        state_at = store.state_id
+        for position in range(store.bisect_left(index * self._widths[level]), stop):
+            timestamp = timestamp_at(position)
+            if timestamp >= bucket_end:
+                break
+            tile.add(timestamp, state_at(position))
+        return tile
+
+    def _add(self, timestamp: float, state_id) -> None:
+        open_tiles = self._open
+        index = math.floor(timestamp / self._widths[0])
+        level = 0
+        while level < self._levels:
+            tile = open_tiles[level]
+            if tile is not None and tile.index == index:
+                break
+            if tile is not None:
+                self._close(level, tile)
+                if level + 1 < self._levels:
+                    # open tiles form a chain: the parent is always open while its child is
+                    open_tiles[level + 1].absorb(tile)
+            open_tiles[level] = SummaryTile(index)
+            index >>= 1
+            level += 1
+        open_tiles[0].add(timestamp, state_id)
+        if not self._events:
+            self._first_time = timestamp
+        self._events += 1
+        self._last_time = timestamp
+        self._last_state = state_id
+
+    def _close(self, level: int, tile: SummaryTile) -> None:
+        tiles = self._tiles[level]
+        if tiles is None or not tile.events:
+            return
+        tiles[tile.index] = tile
+        self._keys[level].append(tile.index)
+        if len(tiles) > self._max_tiles:
+            self._tiles[level] = None
+            self._keys[level] = None
+
+    def discard_before(self, timestamp: float) -> None:
+        # drops closed tiles that end before timestamp, e.g. after retention evicted their events
+        for level, tiles in enumerate(self._tiles):
+            if tiles is None:
+                continue
+            keys = self._keys[level]
+            cut = bisect_left(keys, math.floor(timestamp / self._widths[level]))
+            for key in keys[:cut]:
+                del tiles[key]
+            del keys[:cut]
+        self._first_time = max(self._first_time, timestamp)
+        self._version += 1
+
+    def _tile(self, level: int, index: int) -> Optional[SummaryTile]:
+        tile = self._open[level]
+        if tile is not None and tile.index == index:
+            # the newest bucket still has its latest stretch in the open tiles below it
+            merged = tile.copy()
+            for lower in range(level - 1, -1, -1):
+                merged.absorb(self._open[lower])
+            return merged
+        tiles = self._tiles[level]
+        return tiles.get(index) if tiles is not None else None
+
+    def _carried_state(self, level: int, index: int):
+        # state in effect at the start of bucket `index`
+        tile = self._open[level]
+        if tile is None:
+            return None
+        if index > tile.index:
+            return self._last_state
+        keys = self._keys[level]
+        position = bisect_left(keys, index)
+        if position == 0:
+            return None
+        return self._tiles[level][keys[position - 1]].last_state
+
+    def level_for(self, start_time: float, end_time: float, max_buckets: int) -> int:
+        span = max(0.0, end_time - start_time)
+        for level, tiles in enumerate(self._tiles):
+            if tiles is not None and span / self._widths[level] <= max(1, max_buckets) - 1:
+                return level
+        return self._levels - 1
+
+    def severity_of(self, state_id) -> int:
+        severity = self._severity.get(state_id)
+        if severity is None:
+            severity = self._severity[state_id] = alarm_severity(state_id, alarm_keywords=self._alarm_keywords)
+        return severity
+
+    def buckets(self, start_time: float, end_time: float, max_buckets: int, level: Optional[int] = None) -> List[SummaryBucket]:
+        # at most max_buckets + 1 buckets, independent of how many events they summarize
+        if not self._events or end_time <= start_time:
+            return []
+        data_start = self._first_time
+        data_end = self._last_time
+        start_time = max(start_time, data_start)
+        end_time = min(end_time, data_end)
+        if end_time < start_time:
+            return []
+        if level is None:
+            level = self.level_for(start_time, end_time, max_buckets)
+        elif self._tiles[level] is None:
+            raise ValueError(f"summary level {level} holds too many tiles and is no longer stored")
+        width = self._widths[level]
+        first = math.floor(start_time / width)
+        last = math.floor(end_time / width)
+        carried = self._carried_state(level, first)
+        severity_of = self.severity_of
+        result = []
+        for index in range(first, last + 1):
+            bucket_start = index * width
+            bucket_end = bucket_start + width
+            # clipped to the data so the first and last bucket do not claim time nobody recorded
+            low = max(bucket_start, data_start)
+            high = min(bucket_end, data_end)
+            tile = self._tile(level, index)
+            if tile is None:
+                if carried is not None:
+                    result.append(SummaryBucket(low, high, carried, frozenset((carried,)), 0, 0, severity_of(carried)))
+                continue
+            dwell = dict(tile.dwell)
+            states = set(tile.states)
+            transitions = tile.transitions
+            if carried is not None:
+                transitions += carried != tile.first_state
+                if tile.first_time > low:
+                    dwell[carried] = dwell.get(carried, 0.0) + (tile.first_time - low)
+                    states.add(carried)
+            if high > tile.last_time:
+                dwell[tile.last_state] = dwell.get(tile.last_state, 0.0) + (high - tile.last_time)
+            dominant = max(dwell, key=dwell.get) if dwell else tile.last_state
+            severity = max(severity_of(state_id) for state_id in states)
+            result.append(SummaryBucket(low, high, dominant, frozenset(states), transitions, tile.events, severity))
+            carried = tile.last_state
+        return result
@@ -0,0 +1,51 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class UpdateScheduler(QObject):
+    frame = pyqtSignal()
+
+    def __init__(self, max_fps: float = 60.0, parent=None):
+        super().__init__(parent)
+        self._interval = 1.0 / max(1.0, max_fps)
+        self._last_frame = 0.0
+        self._requested = 0
+        self._coalesced = 0
+        self._frames = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def max_fps(self) -> float:
+        return 1.0 / self._interval
+
+    def set_max_fps(self, max_fps: float):
+        self._interval = 1.0 / max(1.0, max_fps)
+
+    def is_pending(self) -> bool:
+        return self._timer.isActive()
+
+    def request(self):
+        self._requested += 1
+        if self._timer.isActive():
+            self._coalesced += 1
+            return
+        wait = self._last_frame + self._interval - time.perf_counter()
+        self._timer.start(max(0, int(wait * 1000.0)))
+
+    def flush(self):
+        self._timer.stop()
+        self._last_frame = time.perf_counter()
+        self._frames += 1
+        self.frame.emit()
+
+    def stats(self):
+        # requested = frames + coalesced + pending; coalesced requests were folded into a later frame
+        return {"requested": self._requested, "coalesced": self._coalesced, "frames": self._frames}
+
+    def reset_stats(self):
+        self._requested = 0
+        self._coalesced = 0
+        self._frames = 0
@@ -0,0 +1,263 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # every kernel below has a pure-Python path
+    np = None
+
+from .event_store import EventSequence
+
+
+HAVE_NUMPY = np is not None
+# dense bincount up to this many (from, to) cells; sparser state tables fall back to np.unique
+_DENSE_PAIRS = 1 << 22
+_MASK_GROUPS = 32
+
+_use_numpy = HAVE_NUMPY
+
+
+def set_numpy_enabled(enabled: bool) -> None:
+    global _use_numpy
+    _use_numpy = bool(enabled) and HAVE_NUMPY
+
+
+def numpy_enabled() -> bool:
+    return _use_numpy
+
+
+def state_columns(source, start: int = 0, stop: Optional[int] = None):
+    # (timestamps, codes, states) for a model, store, EventSequence or list of events;
+    # NumPy arrays when enabled, otherwise array("d") / list columns
+    if isinstance(source, EventSequence):
+        stop = source.stop if stop is None else min(source.stop, source.start + stop)
+        start += source.start
+        source = source.store
+    source = getattr(source, "store", source)
+    if hasattr(source, "column_slices"):
+        return _join_slices(source.column_slices(start, stop), source.state_table)
+    return _collect_events(source, start, stop)
+
+
+def _join_slices(pieces, states):
+    pieces = list(pieces)
+    if _use_numpy:
+        if not pieces:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64), states
+        # copies out of the store buffers, so the result never pins a growing column
+        timestamps = np.concatenate([np.asarray(ts, dtype=np.float64) for ts, _ in pieces])
+        codes = np.concatenate([np.asarray(cs).astype(np.int64) for _, cs in pieces])
+        return timestamps, codes, states
+    timestamps = array("d")
+    codes: List[int] = []
+    for ts, cs in pieces:
+        timestamps.extend(ts)
+        codes.extend(cs)
+    return timestamps, codes, states
+
+
+def _collect_events(source, start: int, stop: Optional[int]):
+    count = len(source)
+    stop = count if stop is None else min(stop, count)
+    if hasattr(source, "timestamp") and hasattr(source, "state_id"):
+        timestamps = array("d", (source.timestamp(idx) for idx in range(start, stop)))
+        state_ids = [source.state_id(idx) for idx in range(start, stop)]
+    else:
+        events = source[start:stop]
+        timestamps = array("d", (event.timestamp for event in events))
+        state_ids = [event.state_id for event in events]
+    states: List[Any] = []
+    lookup: Dict[Any, int] = {}
+    codes = []
+    for state_id in state_ids:
+        code = lookup.get(state_id)
+        if code is None:
+            code = lookup[state_id] = len(states)
+            states.append(state_id)
+        codes.append(code)
+    if _use_numpy:
+        return np.asarray(timestamps, dtype=np.float64), np.asarray(codes, dtype=np.int64), states
+    return timestamps, codes, states
+
+
+def window_bounds(timestamps, start_time: Optional[float] = None, end_time: Optional[float] = None) -> Tuple[int, int]:
+    # [lo, hi) covering every event whose segment overlaps the window
+    count = len(timestamps)
+    if _use_numpy and isinstance(timestamps, np.ndarray):
+        lo = 0 if start_time is None else max(0, int(np.searchsorted(timestamps, start_time, "right")) - 1)
+        hi = count if end_time is None else int(np.searchsorted(timestamps, end_time, "right"))
+    else:
+        lo = 0 if start_time is None else max(0, bisect_right(timestamps, start_time) - 1)
+        hi = count if end_time is None else bisect_right(timestamps, end_time)
+    return lo, max(lo, hi)
+
+
+def clipped_durations(timestamps, start_time: Optional[float] = None, end_time: Optional[float] = None):
+    # overlap of each event's segment [t_i, t_i+1) with the window; the last segment ends at end_time
+    count = len(timestamps)
+    if _use_numpy and isinstance(timestamps, np.ndarray):
+        if not count:
+            return np.empty(0, dtype=np.float64)
+        ends = np.empty(count, dtype=np.float64)
+        ends[:-1] = timestamps[1:]
+        ends[-1] = timestamps[-1] if end_time is None else max(end_time, timestamps[-1])
+        if end_time is not None:
+            np.minimum(ends, end_time, out=ends)
+        begins = timestamps if start_time is None else np.maximum(timestamps, start_time)
+        durations = ends - begins
+        np.maximum(durations, 0.0, out=durations)
+        return durations
+    durations = [0.0] * count
+    for idx in range(count):
+        begin = timestamps[idx]
+        end = timestamps[idx + 1] if idx + 1 < count else (begin if end_time is None else max(end_time, begin))
+        if end_time is not None and end > end_time:
+            end = end_time
+        if start_time is not None and begin < start_time:
+            begin = start_time
+        if end > begin:
+            durations[idx] = end - begin
+    return durations
+
+
+def dwell_totals(timestamps, codes, states: Sequence[Any], start_time=None, end_time=None) -> Dict[Any, float]:
+    lo, hi = window_bounds(timestamps, start_time, end_time)
+    durations = clipped_durations(timestamps[lo:hi], start_time, end_time)
+    if _use_numpy and isinstance(durations, np.ndarray):
+        if not len(durations):
+            return {}
+        sums = np.bincount(codes[lo:hi], weights=durations, minlength=len(states))
+        return {states[code]: float(sums[code]) for code in np.flatnonzero(sums > 0)}
+    totals: Dict[Any, float] = {}
+    for code, duration in zip(codes[lo:hi], durations):
+        if duration > 0:
+            state_id = states[code]
+            totals[state_id] = totals.get(state_id, 0.0) + duration
+    return totals
+
+
+def transition_counts(codes, states: Sequence[Any]) -> Dict[Tuple[Any, Any], int]:
+    # every consecutive pair, self-transitions included, as StateTransitionTable shows them;
+    # pairs come in order of first occurrence with either backend
+    if _use_numpy and isinstance(codes, np.ndarray):
+        if len(codes) < 2:
+            return {}
+        size = len(states)
+        pair_keys = codes[:-1].astype(np.int64) * size + codes[1:]
+        if size * size <= _DENSE_PAIRS:
+            pairs = np.bincount(pair_keys, minlength=size * size)
+            keys = np.flatnonzero(pairs)
+            counts = pairs[keys]
+            first = np.full(size * size, len(pair_keys), dtype=np.int64)
+            np.minimum.at(first, pair_keys, np.arange(len(pair_keys)))
+            first = first[keys]
+        else:
+            keys, first, counts = np.unique(pair_keys, return_index=True, return_counts=True)
+        order = np.argsort(first, kind="stable")
+        keys = keys[order]
+        counts = counts[order]
+        return {(states[key // size], states[key % size]): int(count) for key, count in zip(keys.tolist(), counts.tolist())}
+    result: Dict[Tuple[int, int], int] = {}
+    for pair in zip(codes, codes[1:]):
+        result[pair] = result.get(pair, 0) + 1
+    return {(states[src], states[dst]): count for (src, dst), count in result.items()}
+
+
+def transition_matrix(codes, states: Sequence[Any]) -> Tuple[List[Any], List[List[int]]]:
+    transitions = transition_counts(codes, states)
+    seen = set()
+    for src, dst in transitions:
+        seen.add(src)
+        seen.add(dst)
+    ordered = [state_id for state_id in states if state_id in seen]
+    lookup = {state_id: idx for idx, state_id in enumerate(ordered)}
+    matrix = [[0] * len(ordered) for _ in ordered]
+    for (src, dst), count in transitions.items():
+        matrix[lookup[src]][lookup[dst]] = count
+    return ordered, matrix
+
+
+def run_durations(timestamps, codes, start_time=None, end_time=None):
+    # consecutive events in the same state form one dwell; returns (run codes, run durations)
+    lo, hi = window_bounds(timestamps, start_time, end_time)
+    durations = clipped_durations(timestamps[lo:hi], start_time, end_time)
+    codes = codes[lo:hi]
+    if _use_numpy and isinstance(durations, np.ndarray):
+        if not len(durations):
+            return np.empty(0, dtype=np.int64), durations
+        starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+        return codes[starts], np.add.reduceat(durations, starts)
+    run_codes: List[int] = []
+    run_lengths: List[float] = []
+    for code, duration in zip(codes, durations):
+        if run_codes and run_codes[-1] == code:
+            run_lengths[-1] += duration
+        else:
+            run_codes.append(code)
+            run_lengths.append(duration)
+    return run_codes, run_lengths
+
+
+def _runs_by_state(timestamps, codes, states, start_time, end_time) -> Dict[Any, Any]:
+    run_codes, lengths = run_durations(timestamps, codes, start_time, end_time)
+    if _use_numpy and isinstance(lengths, np.ndarray):
+        if not len(lengths):
+            return {}
+        present = np.flatnonzero(np.bincount(run_codes, minlength=len(states)))
+        if len(present) <= _MASK_GROUPS:
+            # a handful of states: one boolean pass each beats sorting millions of runs
+            return {states[code]: lengths[run_codes == code] for code in present.tolist()}
+        order = np.argsort(run_codes, kind="stable")
+        sorted_codes = run_codes[order]
+        cuts = np.flatnonzero(np.diff(sorted_codes)) + 1
+        groups = np.split(lengths[order], cuts)
+        heads = sorted_codes[np.concatenate(([0], cuts))]
+        return {states[code]: group for code, group in zip(heads.tolist(), groups)}
+    grouped: Dict[Any, List[float]] = {}
+    for code, length in zip(run_codes, lengths):
+        grouped.setdefault(states[code], []).append(length)
+    return grouped
+
+
+def dwell_percentiles(timestamps, codes, states, percentiles=(50.0, 90.0, 99.0), start_time=None, end_time=None) -> Dict[Any, List[float]]:
+    # linear interpolation between closest ranks, matching numpy.percentile's default
+    grouped = _runs_by_state(timestamps, codes, states, start_time, end_time)
+    if _use_numpy and grouped and isinstance(next(iter(grouped.values())), np.ndarray):
+        return {state_id: np.percentile(values, percentiles).tolist() for state_id, values in grouped.items()}
+    result = {}
+    for state_id, values in grouped.items():
+        values = sorted(values)
+        last = len(values) - 1
+        row = []
+        for pct in percentiles:
+            rank = last * pct / 100.0
+            low = int(rank)
+            high = min(low + 1, last)
+            row.append(values[low] + (values[high] - values[low]) * (rank - low))
+        result[state_id] = row
+    return result
+
+
+def dwell_histogram(timestamps, codes, states, bins: int = 20, start_time=None, end_time=None) -> Dict[Any, Tuple[List[int], List[float]]]:
+    # per state: (counts, bin edges) over that state's dwell range
+    grouped = _runs_by_state(timestamps, codes, states, start_time, end_time)
+    if _use_numpy and grouped and isinstance(next(iter(grouped.values())), np.ndarray):
+        result = {}
+        for state_id, values in grouped.items():
+            counts, edges = np.histogram(values, bins=bins)
+            result[state_id] = (counts.tolist(), edges.tolist())
+        return result
+    result = {}
+    for state_id, values in grouped.items():
+        low = min(values)
+        high = max(values)
+        if high <= low:
+            low, high = low - 0.5, high + 0.5
+        width = (high - low) / bins
+        edges = [low + width * idx for idx in range(bins)] + [high]
+        counts = [0] * bins
+        for value in values:
+            counts[min(bins - 1, bisect_right(edges, value) - 1)] += 1
+        result[state_id] = (counts, edges)
+    return result
@@ -1,4 +1,39 @@
 from .time_utils import format_timestamp, format_duration
-from .color_map import state_color, is_alarm_state
+from .color_map import state_color, state_color_name, is_alarm_state, palette_slot
 
-__all__ = ["format_timestamp", "format_duration", "state_color", "is_alarm_state"]
+__all__ = [
+    "format_timestamp",
+    "format_duration",
+    "state_color",
+    "state_color_name",
+    "is_alarm_state",
+    "palette_slot",
+    "StyleTable",
+    "shared_style_table",
+    "StateStyle",
+    "BlinkClock",
+    "shared_blink_clock",
+]
+
+_LAZY = {
+    "StyleTable": ".style_table",
+    "shared_style_table": ".style_table",
+    "StateStyle": ".style_table",
+    "BlinkClock": ".blink_clock",
+    "shared_blink_clock": ".blink_clock",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
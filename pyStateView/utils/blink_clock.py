@@ -0,0 +1,75 @@
+import time
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+BLINK_INTERVAL_MS = 400
+
+
+class BlinkClock(QObject):
+    phase_changed = pyqtSignal(bool)
+
+    def __init__(self, interval_ms: int = BLINK_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self._interval = max(1, int(interval_ms))
+        self._on = True
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._tick)
+
+    @property
+    def interval(self) -> int:
+        return self._interval
+
+    def set_interval(self, interval_ms: int) -> None:
+        self._interval = max(1, int(interval_ms))
+        if self._timer.isActive():
+            self._schedule()
+
+    def is_on(self) -> bool:
+        return self._on
+
+    def is_running(self) -> bool:
+        return self._timer.isActive()
+
+    def _phase_now(self) -> bool:
+        # derived from the monotonic clock, so every clock with the same interval is in step
+        return int(time.monotonic() * 1000.0 // self._interval) % 2 == 0
+
+    def _schedule(self) -> None:
+        remaining = self._interval - (time.monotonic() * 1000.0) % self._interval
+        self._timer.start(int(remaining) + 1)
+
+    def subscribe(self, slot) -> None:
+        self.phase_changed.connect(slot)
+        if not self._timer.isActive():
+            self._on = self._phase_now()
+            self._schedule()
+
+    def unsubscribe(self, slot) -> None:
+        try:
+            self.phase_changed.disconnect(slot)
+        except TypeError:
+            pass
+
+    def _tick(self) -> None:
+        # stops once nobody listens; destroyed widgets are disconnected by Qt
+        if not self.receivers(self.phase_changed):
+            return
+        on = self._phase_now()
+        if on != self._on:
+            self._on = on
+            self.phase_changed.emit(on)
+        self._schedule()
+
+
+_SHARED: Optional[BlinkClock] = None
+
+
+def shared_blink_clock() -> BlinkClock:
+    # one timer for every blinking indicator in the process
+    global _SHARED
+    if _SHARED is None:
+        _SHARED = BlinkClock()
+    return _SHARED
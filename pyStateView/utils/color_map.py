@@ -1,4 +1,4 @@
-from PyQt5.QtGui import QColor
+import zlib
 
 
 DEFAULT_STATE_COLORS = [
@@ -17,6 +17,13 @@ DEFAULT_STATE_COLORS = [
 ALARM_COLOR = "#D7263D"
 FAULT_COLOR = "#A30015"
 CURRENT_OUTLINE = "#F8F32B"
+ALARM_OUTLINE = "#F5E663"
+NONE_COLOR = "#666666"
+DEFAULT_ALARM_KEYWORDS = ("ALARM", "FAULT", "ERROR")
+
+SEVERITY_NONE = 0
+SEVERITY_ALARM = 1
+SEVERITY_FAULT = 2
 
 
 def is_alarm_state(state_id, alarm_keywords=None):
@@ -28,14 +35,35 @@ def is_alarm_state(state_id, alarm_keywords=None):
     return "ALARM" in state_upper or "FAULT" in state_upper or "ERROR" in state_upper
 
 
-def state_color(state_id, color_map=None, alarm_keywords=None):
-    if is_alarm_state(state_id, alarm_keywords=alarm_keywords):
-        if "FAULT" in str(state_id).upper() or "ERROR" in str(state_id).upper():
-            return QColor(FAULT_COLOR)
-        return QColor(ALARM_COLOR)
+def alarm_severity(state_id, alarm_keywords=None) -> int:
+    if not is_alarm_state(state_id, alarm_keywords=alarm_keywords):
+        return SEVERITY_NONE
+    state_upper = str(state_id).upper()
+    if "FAULT" in state_upper or "ERROR" in state_upper:
+        return SEVERITY_FAULT
+    return SEVERITY_ALARM
+
+
+def palette_slot(state_id) -> int:
+    # crc32 instead of hash(): str hashes are salted per process
+    return zlib.crc32(str(state_id).encode("utf-8")) % len(DEFAULT_STATE_COLORS)
+
+
+def state_color_name(state_id, color_map=None, alarm_keywords=None) -> str:
+    severity = alarm_severity(state_id, alarm_keywords=alarm_keywords)
+    if severity == SEVERITY_FAULT:
+        return FAULT_COLOR
+    if severity == SEVERITY_ALARM:
+        return ALARM_COLOR
     if color_map and state_id in color_map:
-        return QColor(color_map[state_id])
+        return color_map[state_id]
     if state_id is None:
-        return QColor("#666666")
-    index = abs(hash(str(state_id))) % len(DEFAULT_STATE_COLORS)
-    return QColor(DEFAULT_STATE_COLORS[index])
+        return NONE_COLOR
+    return DEFAULT_STATE_COLORS[palette_slot(state_id)]
+
+
+def state_color(state_id, color_map=None, alarm_keywords=None):
+    # Qt is only needed here; the rest of this module is used by headless code
+    from PyQt5.QtGui import QColor
+
+    return QColor(state_color_name(state_id, color_map=color_map, alarm_keywords=alarm_keywords))
@@ -0,0 +1,106 @@
+from typing import Dict, Optional
+
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor, QPen
+
+from .color_map import (
+    ALARM_OUTLINE,
+    DEFAULT_ALARM_KEYWORDS,
+    SEVERITY_NONE,
+    alarm_severity,
+    palette_slot,
+    state_color_name,
+)
+
+
+class StateStyle:
+    __slots__ = ("state_id", "color", "brush", "outline_pen", "severity", "palette_slot")
+
+    def __init__(self, state_id, color: QColor, outline_pen: QPen, severity: int, slot: Optional[int]):
+        self.state_id = state_id
+        self.color = color
+        self.brush = QBrush(color)
+        self.outline_pen = outline_pen
+        self.severity = severity
+        self.palette_slot = slot
+
+    @property
+    def alarm(self) -> bool:
+        return self.severity != SEVERITY_NONE
+
+
+class StyleTable(QObject):
+    changed = pyqtSignal()
+
+    def __init__(self, color_map: Optional[Dict[str, str]] = None, alarm_keywords=DEFAULT_ALARM_KEYWORDS, parent=None):
+        super().__init__(parent)
+        self._color_map: Dict[str, str] = dict(color_map or {})
+        self._alarm_keywords = list(alarm_keywords or ())
+        self._styles: Dict[object, StateStyle] = {}
+        self._revision = 0
+        # pens are cosmetic so they keep their width under PhaseFlow's time-scaled segment layer
+        self._no_pen = QPen(Qt.NoPen)
+        self._alarm_pen = QPen(QColor(ALARM_OUTLINE), 1)
+        self._alarm_pen.setCosmetic(True)
+
+    @property
+    def color_map(self) -> Dict[str, str]:
+        return self._color_map
+
+    @property
+    def alarm_keywords(self):
+        return self._alarm_keywords
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    def copy(self, parent=None) -> "StyleTable":
+        return StyleTable(self._color_map, self._alarm_keywords, parent=parent)
+
+    def set_color_map(self, color_map: Optional[Dict[str, str]]) -> None:
+        self._color_map = dict(color_map or {})
+        self.invalidate()
+
+    def set_alarm_keywords(self, alarm_keywords) -> None:
+        self._alarm_keywords = list(alarm_keywords or ())
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        self._styles.clear()
+        self._revision += 1
+        self.changed.emit()
+
+    def style(self, state_id) -> StateStyle:
+        style = self._styles.get(state_id)
+        if style is None:
+            style = self._styles[state_id] = self._resolve(state_id)
+        return style
+
+    def color(self, state_id) -> QColor:
+        return self.style(state_id).color
+
+    def brush(self, state_id) -> QBrush:
+        return self.style(state_id).brush
+
+    def is_alarm(self, state_id) -> bool:
+        return self.style(state_id).severity != SEVERITY_NONE
+
+    def _resolve(self, state_id) -> StateStyle:
+        keywords = self._alarm_keywords
+        severity = alarm_severity(state_id, alarm_keywords=keywords)
+        color = QColor(state_color_name(state_id, self._color_map, alarm_keywords=keywords))
+        slot = palette_slot(state_id) if state_id is not None else None
+        pen = self._alarm_pen if severity != SEVERITY_NONE else self._no_pen
+        return StateStyle(state_id, color, pen, severity, slot)
+
+
+_SHARED: Optional[StyleTable] = None
+
+
+def shared_style_table() -> StyleTable:
+    # the default table of every widget, so each state is resolved once per process
+    global _SHARED
+    if _SHARED is None:
+        _SHARED = StyleTable()
+    return _SHARED
@@ -1,10 +1,12 @@
 from .state_indicator import StateIndicator
+from .indicator_bank import IndicatorBank
 from .state_distribution import StateDistributionBar
 from .state_transition_table import StateTransitionTable
 from .event_log_view import EventLogView
 
 __all__ = [
     "StateIndicator",
+    "IndicatorBank",
     "StateDistributionBar",
     "StateTransitionTable",
     "EventLogView",
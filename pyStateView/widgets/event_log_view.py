@@ -1,24 +1,196 @@
-from PyQt5.QtCore import Qt, pyqtSignal, QEvent
+from PyQt5.QtCore import Qt, pyqtSignal, QEvent, QAbstractTableModel, QModelIndex, QTimer
 from PyQt5.QtGui import QPalette
-from PyQt5.QtWidgets import QAbstractItemView, QTableWidget, QTableWidgetItem
+from PyQt5.QtWidgets import QAbstractItemView, QHeaderView, QTableView
 
+from ..timeline.state_model import (
+    CHANGE_APPENDED,
+    CHANGE_EVICTED,
+    CHANGE_EVICTING,
+    CHANGE_INSERTED,
+    CHANGE_RESET,
+    StateTimelineModel,
+)
 from ..utils.time_utils import format_timestamp, format_duration
 
 
-class EventLogView(QTableWidget):
+class EventTableModel(QAbstractTableModel):
+    HEADERS = ["Time", "State", "Duration", "Extra"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._timeline = None
+        self._events = ()
+        self._rows = 0
+        self._pending_rows = False
+        self._removing = 0
+        self._base_time = None
+        # first event's time when the caller gave no base; dropped again on reset
+        self._derived_base_time = None
+        self._time_mode = "auto"
+
+    def set_timeline_model(self, timeline: StateTimelineModel, base_time=None, time_mode="auto"):
+        self.beginResetModel()
+        self._detach()
+        self._timeline = timeline
+        self._events = ()
+        self._base_time = base_time
+        self._derived_base_time = None
+        self._time_mode = time_mode
+        self._rows = timeline.event_count()
+        timeline.add_listener(self._on_timeline_changed)
+        self.endResetModel()
+
+    def set_events(self, events, base_time=None, time_mode="auto"):
+        self.beginResetModel()
+        self._detach()
+        self._events = events if events is not None else ()
+        self._base_time = base_time
+        self._derived_base_time = None
+        self._time_mode = time_mode
+        self._rows = len(self._events)
+        self.endResetModel()
+
+    def _detach(self):
+        if self._timeline is not None:
+            self._timeline.remove_listener(self._on_timeline_changed)
+            self._timeline = None
+        self._pending_rows = False
+
+    def _on_timeline_changed(self, kind, start, count):
+        if kind == CHANGE_APPENDED:
+            # rows are announced once per event-loop pass, not once per appended event
+            if not self._pending_rows:
+                self._pending_rows = True
+                QTimer.singleShot(0, self._flush_rows)
+        elif kind == CHANGE_INSERTED:
+            # rows appended before the late events are announced first, so row numbers agree
+            self._flush_rows(self._timeline.event_count() - count)
+            self.beginInsertRows(QModelIndex(), start, start + count - 1)
+            self._rows += count
+            self.endInsertRows()
+            if start > 0:
+                # the row before the inserted ones now ends earlier
+                cell = self.index(start - 1, 2)
+                self.dataChanged.emit(cell, cell)
+        elif kind == CHANGE_EVICTING:
+            self._flush_rows()
+            self._removing = min(count, self._rows)
+            if self._removing:
+                self.beginRemoveRows(QModelIndex(), 0, self._removing - 1)
+        elif kind == CHANGE_EVICTED:
+            if self._removing:
+                self._rows -= self._removing
+                self._removing = 0
+                self.endRemoveRows()
+        elif kind == CHANGE_RESET:
+            self.beginResetModel()
+            self._pending_rows = False
+            self._derived_base_time = None
+            self._rows = self._timeline.event_count()
+            self.endResetModel()
+
+    def _flush_rows(self, total=None):
+        self._pending_rows = False
+        if self._timeline is None:
+            return
+        if total is None:
+            total = self._timeline.event_count()
+        if total <= self._rows:
+            return
+        first = self._rows
+        self.beginInsertRows(QModelIndex(), first, total - 1)
+        self._rows = total
+        self.endInsertRows()
+        if first > 0:
+            # the previous last row now has a known duration
+            cell = self.index(first - 1, 2)
+            self.dataChanged.emit(cell, cell)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def _timestamp(self, row):
+        if self._timeline is not None:
+            return self._timeline.timestamp_at(row)
+        return self._events[row].timestamp
+
+    def _resolved_base_time(self):
+        if self._base_time is not None:
+            return self._base_time
+        if self._derived_base_time is None and self._rows:
+            self._derived_base_time = self._timestamp(0)
+        return self._derived_base_time
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.UserRole:
+            return row
+        if role != Qt.DisplayRole or row >= self._rows:
+            return None
+        return self.cell_text(row, index.column())
+
+    def cell_text(self, row, column):
+        if column == 0:
+            return format_timestamp(self._timestamp(row), mode=self._time_mode, base_time=self._resolved_base_time())
+        if column == 1:
+            if self._timeline is not None:
+                return str(self._timeline.state_id_at(row))
+            return str(self._events[row].state_id)
+        if column == 2:
+            duration = None
+            if row + 1 < self._rows:
+                duration = self._timestamp(row + 1) - self._timestamp(row)
+            return format_duration(duration)
+        if self._timeline is not None:
+            return self._timeline.extra_text(row)
+        return str(self._events[row].extra)
+
+
+class EventLogView(QTableView):
     locate_event = pyqtSignal(int)
 
+    _SIZE_SAMPLE = 64
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("psvEventLogView")
-        self.setColumnCount(4)
-        self.setHorizontalHeaderLabels(["Time", "State", "Duration", "Extra"])
+        self._table_model = EventTableModel(self)
+        self.setModel(self._table_model)
         self.verticalHeader().setVisible(False)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.setAlternatingRowColors(True)
+        self._columns_sized = False
+        self._perf = None
+        self._table_model.rowsInserted.connect(self._on_rows_inserted)
         self._update_palette()
 
+    @property
+    def table_model(self) -> EventTableModel:
+        return self._table_model
+
+    def set_perf_monitor(self, monitor):
+        self._perf = monitor
+
+    @property
+    def perf_monitor(self):
+        return self._perf
+
     def _update_palette(self):
         palette = self.palette()
         self.setPalette(palette)
@@ -29,32 +201,48 @@ class EventLogView(QTableWidget):
         super().changeEvent(event)
 
     def update_from_events(self, events, base_time=None, time_mode="auto"):
-        self.setRowCount(0)
-        if not events:
+        if isinstance(events, StateTimelineModel):
+            self.set_timeline_model(events, base_time=base_time, time_mode=time_mode)
             return
-        if base_time is None:
-            base_time = events[0].timestamp
-        self.setRowCount(len(events))
-        for idx, event in enumerate(events):
-            duration = None
-            if idx + 1 < len(events):
-                duration = events[idx + 1].timestamp - event.timestamp
-            time_item = QTableWidgetItem(format_timestamp(event.timestamp, mode=time_mode, base_time=base_time))
-            state_item = QTableWidgetItem(str(event.state_id))
-            dur_item = QTableWidgetItem(format_duration(duration))
-            extra_item = QTableWidgetItem(str(event.extra))
-
-            time_item.setData(Qt.UserRole, idx)
-            self.setItem(idx, 0, time_item)
-            self.setItem(idx, 1, state_item)
-            self.setItem(idx, 2, dur_item)
-            self.setItem(idx, 3, extra_item)
-        self.resizeColumnsToContents()
+        self._table_model.set_events(events, base_time=base_time, time_mode=time_mode)
+        self._size_columns()
+
+    def set_timeline_model(self, timeline: StateTimelineModel, base_time=None, time_mode="auto"):
+        self._table_model.set_timeline_model(timeline, base_time=base_time, time_mode=time_mode)
+        self._size_columns()
+
+    def paintEvent(self, event):
+        perf = self._perf
+        if perf is None:
+            super().paintEvent(event)
+            return
+        started = perf.clock()
+        super().paintEvent(event)
+        perf.add_duration("event_log.paint", perf.clock() - started)
+
+    def _on_rows_inserted(self, parent, first, last):
+        if self._perf is not None:
+            self._perf.add_count("event_log.rows", last - first + 1)
+        if not self._columns_sized:
+            self._size_columns()
+
+    def _size_columns(self):
+        rows = self._table_model.rowCount()
+        self._columns_sized = rows > 0
+        if not rows:
+            return
+        sample = min(rows, self._SIZE_SAMPLE)
+        sample_rows = sorted(set(range(sample // 2)) | set(range(rows - (sample - sample // 2), rows)))
+        metrics = self.fontMetrics()
+        header = self.horizontalHeader()
+        for column, title in enumerate(EventTableModel.HEADERS):
+            width = header.fontMetrics().horizontalAdvance(title)
+            for row in sample_rows:
+                width = max(width, metrics.horizontalAdvance(self._table_model.cell_text(row, column)))
+            self.setColumnWidth(column, min(width + 16, 600))
 
     def mouseDoubleClickEvent(self, event):
         index = self.indexAt(event.pos())
         if index.isValid():
-            item = self.item(index.row(), 0)
-            if item:
-                self.locate_event.emit(item.data(Qt.UserRole))
+            self.locate_event.emit(index.row())
         super().mouseDoubleClickEvent(event)
@@ -0,0 +1,385 @@
+import math
+from typing import Dict, List
+
+from PyQt5.QtCore import Qt, QEvent, QRect, QRectF, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter, QPalette, QRegion
+from PyQt5.QtWidgets import QSizePolicy, QToolTip, QWidget
+
+from ..utils.blink_clock import BlinkClock, shared_blink_clock
+from ..utils.style_table import StyleTable, shared_style_table
+
+
+class _Cell:
+    __slots__ = ("indicator_id", "label", "state_id", "flash", "blink", "rgba")
+
+    def __init__(self, indicator_id, label):
+        self.indicator_id = indicator_id
+        self.label = label
+        self.state_id = None
+        # flash is the caller's blink=; blink adds the alarm keywords of the style table
+        self.flash = False
+        self.blink = False
+        self.rgba = None
+
+
+class IndicatorBank(QWidget):
+    indicator_clicked = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cells: List[_Cell] = []
+        self._index: Dict[object, int] = {}
+        # cells currently blinking; only these are repainted on a blink phase change
+        self._blinking = set()
+        self._styles = None
+        self._perf = None
+        self._clock = shared_blink_clock()
+        self._subscribed = False
+        self._columns = 0
+        self._cell_size = QSize(96, 40)
+        self._spacing = 4
+        self._show_labels = True
+        self._background = None
+        self._blink_off = None
+        self._label_font = QFont("Consolas", 8)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+        self.setMouseTracking(True)
+        self.setObjectName("psvIndicatorBank")
+        self._update_palette()
+        self.set_style_table(shared_style_table())
+
+    def set_indicators(self, indicators):
+        # ids, or (id, label) pairs; states of ids that stay are kept
+        previous = {cell.indicator_id: cell for cell in self._cells}
+        self._cells = []
+        self._index = {}
+        for item in indicators:
+            indicator_id, label = item if isinstance(item, tuple) else (item, item)
+            cell = previous.get(indicator_id)
+            if cell is None:
+                cell = _Cell(indicator_id, label)
+            else:
+                cell.label = label
+            self._index[indicator_id] = len(self._cells)
+            self._cells.append(cell)
+        self._blinking = {index for index, cell in enumerate(self._cells) if cell.blink}
+        self._sync_clock()
+        self.updateGeometry()
+        self.update()
+
+    def add_indicator(self, indicator_id, label=None):
+        if indicator_id in self._index:
+            return
+        self.set_indicators([(cell.indicator_id, cell.label) for cell in self._cells] + [(indicator_id, label if label is not None else indicator_id)])
+
+    def remove_indicator(self, indicator_id):
+        if indicator_id in self._index:
+            self.set_indicators([(cell.indicator_id, cell.label) for cell in self._cells if cell.indicator_id != indicator_id])
+
+    def indicators(self) -> list:
+        return [cell.indicator_id for cell in self._cells]
+
+    def indicator_count(self) -> int:
+        return len(self._cells)
+
+    def state(self, indicator_id):
+        index = self._index.get(indicator_id)
+        return self._cells[index].state_id if index is not None else None
+
+    def states(self) -> dict:
+        return {cell.indicator_id: cell.state_id for cell in self._cells}
+
+    def set_state(self, indicator_id, state_id, blink=False):
+        region = QRegion()
+        self._apply(indicator_id, state_id, blink, region)
+        self._finish_update(region)
+
+    def set_states(self, states, blink=False):
+        # any number of changes end in one update() over the cells that actually changed
+        region = QRegion()
+        apply = self._apply
+        for indicator_id, state_id in states.items():
+            apply(indicator_id, state_id, blink, region)
+        self._finish_update(region)
+
+    def _apply(self, indicator_id, state_id, blink, region):
+        index = self._index.get(indicator_id)
+        if index is None:
+            index = self._index[indicator_id] = len(self._cells)
+            self._cells.append(_Cell(indicator_id, indicator_id))
+            self.updateGeometry()
+        cell = self._cells[index]
+        flash = bool(blink)
+        if cell.state_id == state_id and cell.flash == flash:
+            return
+        cell.state_id = state_id
+        cell.flash = flash
+        self._restyle(index, cell)
+        region += self.cell_rect(index)
+
+    def _restyle(self, index, cell) -> bool:
+        # derives blink and color from the style table; True when either changed
+        state_id = cell.state_id
+        if state_id is None:
+            blink = cell.flash
+            rgba = None
+        else:
+            style = self._styles.style(state_id)
+            blink = cell.flash or style.alarm
+            rgba = style.color.rgba()
+        if blink:
+            self._blinking.add(index)
+        else:
+            self._blinking.discard(index)
+        if blink == cell.blink and rgba == cell.rgba:
+            return False
+        cell.blink = blink
+        cell.rgba = rgba
+        return True
+
+    def _finish_update(self, region):
+        self._sync_clock()
+        if not region.isEmpty():
+            self.update(region)
+
+    def clear_states(self):
+        self.set_states({cell.indicator_id: None for cell in self._cells})
+
+    def set_columns(self, columns: int):
+        # 0 fits as many columns as the width allows
+        self._columns = max(0, int(columns))
+        self.updateGeometry()
+        self.update()
+
+    def set_cell_size(self, width: int, height: int):
+        self._cell_size = QSize(max(8, int(width)), max(8, int(height)))
+        self.updateGeometry()
+        self.update()
+
+    def set_spacing(self, spacing: int):
+        self._spacing = max(0, int(spacing))
+        self.updateGeometry()
+        self.update()
+
+    def set_show_labels(self, show: bool):
+        self._show_labels = bool(show)
+        self.update()
+
+    def set_color_map(self, color_map):
+        self._own_styles().set_color_map(color_map)
+
+    def set_alarm_keywords(self, alarm_keywords):
+        self._own_styles().set_alarm_keywords(alarm_keywords)
+
+    def set_style_table(self, styles: StyleTable):
+        if self._styles is not None:
+            self._styles.changed.disconnect(self._on_styles_changed)
+        self._styles = styles
+        styles.changed.connect(self._on_styles_changed)
+        self._on_styles_changed()
+
+    @property
+    def style_table(self) -> StyleTable:
+        return self._styles
+
+    def _own_styles(self) -> StyleTable:
+        # the shared default table is copied before this widget changes its colors
+        if self._styles is shared_style_table():
+            self.set_style_table(self._styles.copy(parent=self))
+        return self._styles
+
+    def _on_styles_changed(self):
+        # alarm keywords decide which cells blink; only cells whose blink or color changed repaint
+        region = QRegion()
+        restyle = self._restyle
+        for index, cell in enumerate(self._cells):
+            if restyle(index, cell):
+                region += self.cell_rect(index)
+        self._finish_update(region)
+
+    def set_blink_clock(self, clock: BlinkClock):
+        subscribed = self._subscribed
+        self._set_subscribed(False)
+        self._clock = clock
+        self._set_subscribed(subscribed)
+        self.update()
+
+    @property
+    def blink_clock(self) -> BlinkClock:
+        return self._clock
+
+    def set_perf_monitor(self, monitor):
+        self._perf = monitor
+
+    @property
+    def perf_monitor(self):
+        return self._perf
+
+    def _sync_clock(self):
+        self._set_subscribed(bool(self._blinking))
+
+    def _set_subscribed(self, subscribed: bool):
+        if subscribed == self._subscribed:
+            return
+        self._subscribed = subscribed
+        if subscribed:
+            self._clock.subscribe(self._on_blink_phase)
+        else:
+            self._clock.unsubscribe(self._on_blink_phase)
+
+    def _on_blink_phase(self, on):
+        if not self._blinking:
+            return
+        region = QRegion()
+        for index in self._blinking:
+            region += self.cell_rect(index)
+        self.update(region)
+
+    def _column_count(self) -> int:
+        if self._columns:
+            return self._columns
+        pitch = self._cell_size.width() + self._spacing
+        return max(1, (max(1, self.width()) - self._spacing) // pitch)
+
+    def cell_rect(self, index: int) -> QRect:
+        columns = self._column_count()
+        row, column = divmod(index, columns)
+        spacing = self._spacing
+        size = self._cell_size
+        return QRect(
+            spacing + column * (size.width() + spacing),
+            spacing + row * (size.height() + spacing),
+            size.width(),
+            size.height(),
+        )
+
+    def index_at(self, pos) -> int:
+        spacing = self._spacing
+        size = self._cell_size
+        column = (pos.x() - spacing) // (size.width() + spacing)
+        row = (pos.y() - spacing) // (size.height() + spacing)
+        columns = self._column_count()
+        if column < 0 or row < 0 or column >= columns:
+            return -1
+        index = row * columns + column
+        if index >= len(self._cells) or not self.cell_rect(index).contains(pos):
+            return -1
+        return index
+
+    def indicator_at(self, pos):
+        index = self.index_at(pos)
+        return self._cells[index].indicator_id if index >= 0 else None
+
+    def sizeHint(self):
+        columns = self._columns or max(1, min(len(self._cells), 10))
+        rows = max(1, math.ceil(len(self._cells) / columns))
+        spacing = self._spacing
+        return QSize(
+            spacing + columns * (self._cell_size.width() + spacing),
+            spacing + rows * (self._cell_size.height() + spacing),
+        )
+
+    def minimumSizeHint(self):
+        spacing = self._spacing
+        return QSize(self._cell_size.width() + 2 * spacing, self._cell_size.height() + 2 * spacing)
+
+    def hasHeightForWidth(self):
+        return self._columns == 0
+
+    def heightForWidth(self, width):
+        pitch = self._cell_size.width() + self._spacing
+        columns = max(1, (max(1, width) - self._spacing) // pitch)
+        rows = max(1, math.ceil(len(self._cells) / columns))
+        return self._spacing + rows * (self._cell_size.height() + self._spacing)
+
+    def _update_palette(self):
+        palette = self.palette()
+        self._background = palette.color(QPalette.Window)
+        self._blink_off = palette.color(QPalette.Base).darker(120)
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.PaletteChange, QEvent.StyleChange):
+            self._update_palette()
+            self.update()
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update()
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            index = self.index_at(event.pos())
+            if index < 0:
+                QToolTip.hideText()
+                event.ignore()
+                return True
+            cell = self._cells[index]
+            QToolTip.showText(event.globalPos(), f"{cell.label}: {cell.state_id if cell.state_id is not None else '-'}", self, self.cell_rect(index))
+            return True
+        return super().event(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            indicator_id = self.indicator_at(event.pos())
+            if indicator_id is not None:
+                self.indicator_clicked.emit(indicator_id)
+                event.accept()
+                return
+        super().mouseReleaseEvent(event)
+
+    def paintEvent(self, event):
+        perf = self._perf
+        if perf is None:
+            self._paint_cells(event)
+            return
+        started = perf.clock()
+        painted = self._paint_cells(event)
+        perf.add_duration("indicator_bank.paint", perf.clock() - started)
+        perf.add_count("indicator_bank.cells_painted", painted)
+
+    def _paint_cells(self, event) -> int:
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = event.rect()
+        painter.fillRect(rect, self._background)
+        if not self._cells:
+            return 0
+        spacing = self._spacing
+        size = self._cell_size
+        pitch_x = size.width() + spacing
+        pitch_y = size.height() + spacing
+        columns = self._column_count()
+        first_column = max(0, (rect.left() - spacing) // pitch_x)
+        last_column = min(columns - 1, max(0, rect.right() - spacing) // pitch_x)
+        first_row = max(0, (rect.top() - spacing) // pitch_y)
+        last_row = max(0, rect.bottom() - spacing) // pitch_y
+        region = event.region()
+        blink_on = self._clock.is_on()
+        style = self._styles.style
+        painter.setFont(self._label_font)
+        painted = 0
+        # only cells inside the update region are drawn
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                index = row * columns + column
+                if index >= len(self._cells):
+                    break
+                cell_rect = self.cell_rect(index)
+                if not region.intersects(cell_rect):
+                    continue
+                cell = self._cells[index]
+                painted += 1
+                if cell.state_id is None:
+                    color = QColor(self._blink_off)
+                elif cell.blink and not blink_on:
+                    color = self._blink_off
+                else:
+                    color = style(cell.state_id).color
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(color)
+                painter.drawRoundedRect(QRectF(cell_rect).adjusted(1, 1, -1, -1), 5, 5)
+                if self._show_labels:
+                    painter.setPen(Qt.black if color.lightness() > 140 else Qt.white)
+                    painter.drawText(cell_rect.adjusted(4, 2, -4, -2), Qt.AlignCenter | Qt.TextWordWrap, str(cell.label))
+        return painted
@@ -1,51 +1,100 @@
+from bisect import bisect_left
 from typing import Dict
 
 from PyQt5.QtCore import Qt, QEvent
 from PyQt5.QtGui import QColor, QPainter, QPalette
 from PyQt5.QtWidgets import QWidget
 
-from ..utils.color_map import state_color
+from ..timeline.vectorized import dwell_totals, state_columns
+from ..utils.style_table import StyleTable, shared_style_table
 
 
 class StateDistributionBar(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._state_durations: Dict[str, float] = {}
-        self._color_map = {}
+        self._styles = None
+        self._perf = None
         self._total = 0.0
+        self._statistics = None
+        self._window = (None, None)
+        self._statistics_dirty = False
         self._background = None
         self._text_color = None
         self.setMinimumHeight(28)
         self.setObjectName("psvStateDistribution")
         self._update_palette()
+        self.set_style_table(shared_style_table())
 
     def update_from_events(self, events, start_time=None, end_time=None):
-        self._state_durations.clear()
         if not events:
+            self._state_durations = {}
             self._total = 0.0
             self.update()
             return
+        timestamps, codes, states = state_columns(events)
         if start_time is None:
-            start_time = events[0].timestamp
+            start_time = timestamps[0]
         if end_time is None:
-            end_time = events[-1].timestamp
-        for idx, event in enumerate(events):
-            if event.timestamp < start_time:
-                continue
-            next_time = end_time
-            if idx + 1 < len(events):
-                next_time = events[idx + 1].timestamp
-            duration = max(0.0, min(next_time, end_time) - event.timestamp)
-            if duration <= 0:
-                continue
-            self._state_durations[event.state_id] = self._state_durations.get(event.state_id, 0.0) + duration
+            end_time = timestamps[-1]
+        # events before start_time are skipped rather than clipped, as before
+        lo = bisect_left(timestamps, start_time)
+        self._state_durations = dwell_totals(timestamps[lo:], codes[lo:], states, end_time=end_time)
         self._total = sum(self._state_durations.values())
         self.update()
 
+    def set_statistics(self, statistics, start_time=None, end_time=None):
+        if self._statistics is not None:
+            self._statistics.remove_listener(self._on_statistics_changed)
+        self._statistics = statistics
+        self._window = (start_time, end_time)
+        if statistics is not None:
+            statistics.add_listener(self._on_statistics_changed)
+            self._on_statistics_changed()
+
+    def set_window(self, start_time=None, end_time=None):
+        self._window = (start_time, end_time)
+        if self._statistics is not None:
+            self._on_statistics_changed()
+
+    def _on_statistics_changed(self):
+        # pulled lazily in paintEvent so any number of changes cost one query per repaint
+        self._statistics_dirty = True
+        self.update()
+
+    def _pull_statistics(self):
+        self._statistics_dirty = False
+        start_time, end_time = self._window
+        self._state_durations = self._statistics.distribution(start_time, end_time)
+        self._total = sum(self._state_durations.values())
+
     def set_color_map(self, color_map):
-        self._color_map = color_map
+        self._own_styles().set_color_map(color_map)
+
+    def set_style_table(self, styles: StyleTable):
+        if self._styles is not None:
+            self._styles.changed.disconnect(self.update)
+        self._styles = styles
+        styles.changed.connect(self.update)
         self.update()
 
+    @property
+    def style_table(self) -> StyleTable:
+        return self._styles
+
+    def _own_styles(self) -> StyleTable:
+        # the shared default table is copied before this widget changes its colors
+        if self._styles is shared_style_table():
+            self.set_style_table(self._styles.copy(parent=self))
+        return self._styles
+
+    def set_perf_monitor(self, monitor):
+        self._perf = monitor
+
+    @property
+    def perf_monitor(self):
+        return self._perf
+
     def _update_palette(self):
         palette = self.palette()
         self._background = palette.color(QPalette.Window)
@@ -58,6 +107,17 @@ class StateDistributionBar(QWidget):
         super().changeEvent(event)
 
     def paintEvent(self, event):
+        perf = self._perf
+        if perf is None:
+            self._paint_bar()
+            return
+        started = perf.clock()
+        self._paint_bar()
+        perf.add_duration("distribution.paint", perf.clock() - started)
+
+    def _paint_bar(self):
+        if self._statistics_dirty and self._statistics is not None:
+            self._pull_statistics()
         painter = QPainter(self)
         painter.fillRect(self.rect(), self._background)
         if self._total <= 0:
@@ -68,7 +128,7 @@ class StateDistributionBar(QWidget):
         for state_id, duration in self._state_durations.items():
             ratio = duration / self._total
             block_width = max(2, int(width * ratio))
-            painter.setBrush(state_color(state_id, self._color_map))
+            painter.setBrush(self._styles.brush(state_id))
             painter.setPen(Qt.NoPen)
             painter.drawRect(x, 4, block_width, height)
             x += block_width
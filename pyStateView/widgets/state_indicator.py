@@ -1,42 +1,85 @@
-from PyQt5.QtCore import Qt, QTimer, QEvent
+from PyQt5.QtCore import Qt, QEvent
 from PyQt5.QtGui import QColor, QPainter, QPalette
 from PyQt5.QtWidgets import QWidget
 
-from ..utils.color_map import state_color, is_alarm_state
+from ..utils.blink_clock import BlinkClock, shared_blink_clock
+from ..utils.style_table import StyleTable, shared_style_table
 
 
 class StateIndicator(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._state_id = None
-        self._color_map = {}
-        self._alarm_keywords = ["ALARM", "FAULT", "ERROR"]
+        self._styles = None
+        # flash is the caller's blink flag; alarm states blink on top of it
+        self._flash = False
         self._blink = False
-        self._blink_on = True
-        self._blink_timer = QTimer(self)
-        self._blink_timer.timeout.connect(self._toggle_blink)
+        # all indicators share one blink clock instead of a timer each
+        self._clock = shared_blink_clock()
+        self._subscribed = False
         self.setMinimumSize(90, 50)
         self.setObjectName("psvStateIndicator")
         self._background = None
         self._blink_off = None
         self._update_palette()
+        self.set_style_table(shared_style_table())
 
     def set_state(self, state_id, blink=False):
         self._state_id = state_id
-        self._blink = blink or is_alarm_state(state_id, self._alarm_keywords)
-        if self._blink:
-            self._blink_timer.start(400)
-        else:
-            self._blink_timer.stop()
-            self._blink_on = True
+        self._flash = blink
+        self._on_styles_changed()
+
+    def set_blink_clock(self, clock: BlinkClock):
+        subscribed = self._subscribed
+        self._set_subscribed(False)
+        self._clock = clock
+        self._set_subscribed(subscribed)
         self.update()
 
+    @property
+    def blink_clock(self) -> BlinkClock:
+        return self._clock
+
+    def _set_subscribed(self, subscribed: bool):
+        if subscribed == self._subscribed:
+            return
+        self._subscribed = subscribed
+        if subscribed:
+            self._clock.subscribe(self._on_blink_phase)
+        else:
+            self._clock.unsubscribe(self._on_blink_phase)
+
     def set_color_map(self, color_map):
-        self._color_map = color_map
+        self._own_styles().set_color_map(color_map)
+
+    def set_alarm_keywords(self, alarm_keywords):
+        self._own_styles().set_alarm_keywords(alarm_keywords)
+
+    def set_style_table(self, styles: StyleTable):
+        if self._styles is not None:
+            self._styles.changed.disconnect(self._on_styles_changed)
+        self._styles = styles
+        styles.changed.connect(self._on_styles_changed)
+        self._on_styles_changed()
+
+    @property
+    def style_table(self) -> StyleTable:
+        return self._styles
+
+    def _own_styles(self) -> StyleTable:
+        # the shared default table is copied before this widget changes its colors
+        if self._styles is shared_style_table():
+            self.set_style_table(self._styles.copy(parent=self))
+        return self._styles
+
+    def _on_styles_changed(self):
+        # alarm keywords decide whether the current state blinks
+        state_id = self._state_id
+        self._blink = self._flash or (state_id is not None and self._styles.is_alarm(state_id))
+        self._set_subscribed(self._blink)
         self.update()
 
-    def _toggle_blink(self):
-        self._blink_on = not self._blink_on
+    def _on_blink_phase(self, on):
         self.update()
 
     def _update_palette(self):
@@ -56,10 +99,10 @@ class StateIndicator(QWidget):
         painter.fillRect(self.rect(), self._background)
         if self._state_id is None:
             return
-        if self._blink and not self._blink_on:
+        if self._blink and not self._clock.is_on():
             color = self._blink_off
         else:
-            color = state_color(self._state_id, self._color_map, alarm_keywords=self._alarm_keywords)
+            color = self._styles.color(self._state_id)
         painter.setPen(Qt.NoPen)
         painter.setBrush(color)
         rect = self.rect().adjusted(8, 8, -8, -8)
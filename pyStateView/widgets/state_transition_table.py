@@ -1,7 +1,9 @@
-from PyQt5.QtCore import Qt, QEvent
+from PyQt5.QtCore import Qt, QEvent, QTimer
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem
 
+from ..timeline.vectorized import state_columns, transition_counts
+
 
 class StateTransitionTable(QTableWidget):
     def __init__(self, parent=None):
@@ -11,6 +13,9 @@ class StateTransitionTable(QTableWidget):
         self.verticalHeader().setVisible(False)
         self.setAlternatingRowColors(True)
         self.setObjectName("psvStateTransitionTable")
+        self._statistics = None
+        self._refresh_pending = False
+        self._perf = None
         self._update_palette()
 
     def _update_palette(self):
@@ -23,15 +28,43 @@ class StateTransitionTable(QTableWidget):
         super().changeEvent(event)
 
     def update_from_events(self, events):
-        transitions = {}
-        for idx in range(len(events) - 1):
-            src = events[idx].state_id
-            dst = events[idx + 1].state_id
-            key = (src, dst)
-            transitions[key] = transitions.get(key, 0) + 1
+        _, codes, states = state_columns(events)
+        self._show_transitions(transition_counts(codes, states))
+
+    def set_perf_monitor(self, monitor):
+        self._perf = monitor
+
+    @property
+    def perf_monitor(self):
+        return self._perf
+
+    def set_statistics(self, statistics):
+        if self._statistics is not None:
+            self._statistics.remove_listener(self._on_statistics_changed)
+        self._statistics = statistics
+        if statistics is not None:
+            statistics.add_listener(self._on_statistics_changed)
+            self._on_statistics_changed()
+
+    def _on_statistics_changed(self):
+        if self._refresh_pending:
+            return
+        self._refresh_pending = True
+        QTimer.singleShot(0, self._refresh_from_statistics)
+
+    def _refresh_from_statistics(self):
+        self._refresh_pending = False
+        if self._statistics is not None:
+            self._show_transitions(self._statistics.transition_counts())
+
+    def _show_transitions(self, transitions):
+        perf = self._perf
+        started = perf.clock() if perf is not None else 0.0
         self.setRowCount(len(transitions))
         for row, ((src, dst), count) in enumerate(transitions.items()):
             self.setItem(row, 0, QTableWidgetItem(str(src)))
             self.setItem(row, 1, QTableWidgetItem(str(dst)))
             self.setItem(row, 2, QTableWidgetItem(str(count)))
         self.resizeColumnsToContents()
+        if perf is not None:
+            perf.add_duration("transition_table.refresh", perf.clock() - started)
@@ -6,6 +6,7 @@ setup(
     version="1.0.0",
     description="Industrial discrete state timeline visualization widgets for PyQt5",
     packages=find_packages(),
-    install_requires=["PyQt5>=5.15"],
+    install_requires=[],
+    extras_require={"gui": ["PyQt5>=5.15"], "numpy": ["numpy>=1.20"]},
     include_package_data=True,
 )
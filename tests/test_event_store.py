@@ -0,0 +1,95 @@
+import pytest
+
+from pyStateView.timeline.event_store import ColumnarEventStore, ListEventStore
+
+
+SCHEMA = {"temperature": float, "operator": str}
+
+
+def make_stores():
+    return [ListEventStore(), ColumnarEventStore(), ColumnarEventStore(extra_schema=SCHEMA)]
+
+
+def rows(store):
+    return [(store.timestamp(i), store.state_id(i), dict(store.extra(i))) for i in range(len(store))]
+
+
+def extra_for(index):
+    if index % 3 == 0:
+        return None
+    if index % 3 == 1:
+        return {"temperature": index / 2.0, "operator": "op-%d" % (index % 4)}
+    # undeclared key and a value that does not fit its column
+    return {"temperature": "n/a", "source": "line-a"}
+
+
+def test_backends_store_the_same_events():
+    stores = make_stores()
+    for store in stores:
+        for index in range(50):
+            store.append(float(index), "S%d" % (index % 3), extra_for(index))
+        store.extend([50.0, 51.0], ["A", "B"], [{"temperature": 1.5}, None])
+    expected = rows(stores[0])
+    for store in stores[1:]:
+        assert rows(store) == expected
+        assert store.bisect_left(10.0) == 10
+        assert store.bisect_right(10.0) == 11
+
+
+def test_insert_keeps_order_and_extras():
+    stores = make_stores()
+    for store in stores:
+        for index in range(20):
+            store.append(float(index), "A", extra_for(index))
+        store.insert(5, 4.5, "LATE", {"temperature": 9.0, "operator": "late"})
+        store.insert(0, -1.0, "FIRST", None)
+    expected = rows(stores[0])
+    assert [row[0] for row in expected] == sorted(row[0] for row in expected)
+    for store in stores[1:]:
+        assert rows(store) == expected
+
+
+@pytest.mark.parametrize("store", make_stores(), ids=["list", "columnar", "schema"])
+def test_drop_front_keeps_the_live_range(store):
+    for index in range(10000):
+        store.append(float(index), "A", extra_for(index))
+    store.drop_front(6000)
+    assert len(store) == 4000
+    assert store.timestamp(0) == 6000.0
+    assert dict(store.extra(1)) == (extra_for(6001) or {})
+
+
+@pytest.mark.parametrize("schema", [None, SCHEMA], ids=["dicts", "schema"])
+def test_extra_follows_its_event_across_insert_and_eviction(schema):
+    store = ColumnarEventStore(extra_schema=schema)
+    events = [store.append(float(index), "A", {"temperature": float(index)}) for index in range(10000)]
+    store.insert(5000, 4999.5, "LATE", {"temperature": -1.0})
+    assert events[6000].extra == {"temperature": 6000.0}
+    assert store.extra(5000) == {"temperature": -1.0}
+    assert store.extra(5001) == {"temperature": 5000.0}
+    store.drop_front(8000)
+    assert events[9000].extra == {"temperature": 9000.0}
+    assert store.extra(0) == {"temperature": 7999.0}
+
+
+def test_evicted_extra_view_is_an_empty_mapping():
+    store = ColumnarEventStore(extra_schema=SCHEMA)
+    first = store.append(0.0, "A", {"temperature": 1.0, "source": "x"})
+    for index in range(1, 10000):
+        store.append(float(index), "A")
+    store.drop_front(9000)
+    extra = first.extra
+    assert dict(extra) == {}
+    assert "temperature" not in extra
+    assert len(extra) == 0
+    assert extra.get("temperature") is None
+    assert repr(extra) == "{}"
+
+
+def test_list_memory_usage_counts_only_live_events():
+    store = ListEventStore()
+    for index in range(10000):
+        store.append(float(index), "A", {"value": index})
+    before = store.memory_usage()
+    store.drop_front(4000)
+    assert store.memory_usage() < before * 0.7
@@ -0,0 +1,41 @@
+from pyStateView.timeline.reorder import ReorderBuffer
+from pyStateView.timeline.state_model import StateTimelineModel
+
+
+def timestamps_of(model):
+    return [model.timestamp_at(i) for i in range(model.event_count())]
+
+
+def test_events_inside_the_tolerance_are_committed_in_order():
+    model = StateTimelineModel("columnar")
+    buffer = ReorderBuffer(model, tolerance=2.0)
+    for timestamp in [1.0, 3.0, 2.0, 5.0, 4.0, 8.0]:
+        buffer.push(timestamp, "A")
+    assert timestamps_of(model) == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert len(buffer) == 1
+    assert buffer.late_count == 0
+    buffer.flush()
+    assert timestamps_of(model) == [1.0, 2.0, 3.0, 4.0, 5.0, 8.0]
+
+
+def test_events_behind_the_watermark_are_inserted():
+    model = StateTimelineModel("columnar")
+    buffer = ReorderBuffer(model, tolerance=1.0)
+    buffer.push_many(timestamps=[1.0, 2.0, 5.0], state_ids=["A", "B", "C"])
+    buffer.push(1.5, "LATE")
+    assert buffer.late_count == 1
+    assert timestamps_of(model) == [1.0, 1.5, 2.0]
+    buffer.clear()
+    assert buffer.late_count == 0
+
+
+def test_poll_commits_held_events_after_max_hold():
+    model = StateTimelineModel("columnar")
+    buffer = ReorderBuffer(model, tolerance=10.0, max_hold=0.5)
+    buffer.push(1.0, "A")
+    advanced = buffer._advanced_at
+    assert buffer.poll(advanced + 0.1) == 0
+    assert buffer.hold_remaining(advanced + 0.1) > 0
+    assert buffer.poll(advanced + 0.6) == 1
+    assert buffer.hold_remaining() is None
+    assert timestamps_of(model) == [1.0]
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from pyStateView.timeline.state_model import (
+    CHANGE_APPENDED,
+    CHANGE_EVICTED,
+    CHANGE_EVICTING,
+    CHANGE_INSERTED,
+    StateTimelineModel,
+)
+from pyStateView.timeline.statistics import TimelineStatistics
+
+
+STORAGES = [("list", None), ("columnar", None), ("columnar", {"value": int})]
+
+
+def models():
+    return [StateTimelineModel(storage, extra_schema=schema) for storage, schema in STORAGES]
+
+
+def snapshot(model):
+    store = model.store
+    return [(store.timestamp(i), store.state_id(i), dict(store.extra(i))) for i in range(len(store))]
+
+
+def shuffled_stream(seed, count):
+    rng = random.Random(seed)
+    timestamps = [float(index) for index in range(count)]
+    # small local disorder, as a network source delivers it
+    for index in range(0, count - 5, 7):
+        if rng.random() < 0.5:
+            timestamps[index], timestamps[index + 3] = timestamps[index + 3], timestamps[index]
+    states = [rng.choice("ABCD") for _ in range(count)]
+    extras = [{"value": index} if index % 4 == 0 else None for index in range(count)]
+    return timestamps, states, extras
+
+
+def test_storages_agree():
+    result = []
+    for model in models():
+        for index in range(200):
+            model.append_event(float(index), "ABCD"[index % 4], {"value": index} if index % 4 == 0 else None)
+        result.append(snapshot(model))
+        assert model.states() == ["A", "B", "C", "D"]
+        assert model.index_for_time(99.5) == 99
+    assert result[0] == result[1] == result[2]
+
+
+def test_storages_agree_on_late_inserts():
+    timestamps, states, extras = shuffled_stream(1, 2000)
+    result = []
+    for model in models():
+        for timestamp, state_id, extra in zip(timestamps, states, extras):
+            model.append_event(timestamp, state_id, extra)
+        result.append(snapshot(model))
+    assert result[0] == result[1] == result[2]
+    assert [row[0] for row in result[0]] == sorted(timestamps)
+
+
+def test_out_of_order_batch_matches_single_appends():
+    timestamps, states, extras = shuffled_stream(2, 1000)
+    single = StateTimelineModel("columnar")
+    for timestamp, state_id, extra in zip(timestamps, states, extras):
+        single.append_event(timestamp, state_id, extra)
+    for model in models():
+        model.append_events(timestamps=timestamps[:500], state_ids=states[:500], extras=extras[:500])
+        model.append_events(timestamps=timestamps[500:], state_ids=states[500:], extras=extras[500:])
+        assert snapshot(model) == snapshot(single)
+
+
+def test_insert_notifies_listeners():
+    model = StateTimelineModel("columnar")
+    model.append_events(timestamps=[1.0, 2.0, 3.0], state_ids=["A", "B", "C"])
+    changes = []
+    model.add_listener(lambda kind, start, count: changes.append((kind, start, count)))
+    model.append_event(1.5, "LATE")
+    model.append_event(4.0, "D")
+    assert changes == [(CHANGE_INSERTED, 1, 1), (CHANGE_APPENDED, 4, 1)]
+    assert model.state_id_at(1) == "LATE"
+
+
+@pytest.mark.parametrize("storage,schema", STORAGES, ids=["list", "columnar", "schema"])
+def test_retention_by_count(storage, schema):
+    model = StateTimelineModel(storage, extra_schema=schema)
+    model.set_retention(max_events=100)
+    changes = []
+    model.add_listener(lambda kind, start, count: changes.append(kind))
+    for index in range(10000):
+        model.append_event(float(index), "A" if index < 9950 else "B", {"value": index})
+    assert model.event_count() == 100
+    assert model.evicted_count == 9900
+    assert model.timestamp_at(0) == 9900.0
+    assert model.get_event(0).extra == {"value": 9900}
+    assert CHANGE_EVICTING in changes and CHANGE_EVICTED in changes
+
+
+def test_retention_by_age_keeps_the_active_event():
+    model = StateTimelineModel("columnar")
+    model.set_retention(max_age=10.0)
+    for index in range(100):
+        model.append_event(float(index), "A")
+    # the event active at the cutoff stays so the first segment still has its state
+    assert model.timestamp_at(0) == 89.0
+
+
+def test_evicted_states_leave_the_state_set():
+    model = StateTimelineModel("columnar")
+    model.append_events(timestamps=[0.0, 1.0, 2.0], state_ids=["OLD", "A", "B"])
+    model.set_retention(max_events=3)
+    model.append_event(3.0, "A")
+    assert set(model.states()) == {"A", "B"}
+    assert model.state_count() == 2
+    model.set_retention()
+    model.append_event(4.0, "C")
+    assert set(model.states()) == {"A", "B", "C"}
+
+
+def test_statistics_match_a_rebuild_after_late_inserts():
+    timestamps, states, _ = shuffled_stream(3, 3000)
+    model = StateTimelineModel("columnar")
+    statistics = TimelineStatistics(model)
+    for timestamp, state_id in zip(timestamps, states):
+        model.append_event(timestamp, state_id)
+    rebuilt = StateTimelineModel("columnar")
+    rebuilt.append_events(timestamps=sorted(timestamps), state_ids=[model.state_id_at(i) for i in range(model.event_count())])
+    reference = TimelineStatistics(rebuilt)
+    assert statistics.transition_counts() == reference.transition_counts()
+    dwell = statistics.dwell_totals()
+    for state_id, total in reference.dwell_totals().items():
+        assert dwell[state_id] == pytest.approx(total)
+    window = statistics.distribution(500.0, 1500.0)
+    for state_id, share in reference.distribution(500.0, 1500.0).items():
+        assert window[state_id] == pytest.approx(share)